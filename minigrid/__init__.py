@@ -1,13 +1,35 @@
 from __future__ import annotations
 
-from gymnasium.envs.registration import register
+import importlib
+
+from gymnasium.envs.registration import register, registry
 
-from minigrid import minigrid_env, wrappers
-from minigrid.core import roomgrid
 from minigrid.core.world_object import Wall
 
+# Submodules imported when first accessed as attributes of the package
+_LAZY_SUBMODULES = {
+    "benchmark": "minigrid.benchmark",
+    "envs": "minigrid.envs",
+    "manual_control": "minigrid.manual_control",
+    "minigrid_env": "minigrid.minigrid_env",
+    "roomgrid": "minigrid.core.roomgrid",
+    "vector_env": "minigrid.vector_env",
+    "wrappers": "minigrid.wrappers",
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_SUBMODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return importlib.import_module(_LAZY_SUBMODULES[name])
+
 
 def register_minigrid_envs():
+    # The environments may already have been registered, when loading the
+    # gymnasium plugin also imports this package
+    if "MiniGrid-Empty-5x5-v0" in registry:
+        return
+
     # BlockedUnlockPickup
     # ----------------------------------------
 
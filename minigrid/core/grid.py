@@ -1,12 +1,31 @@
 from __future__ import annotations
 
+import copy
 import math
-from typing import Any, Callable
+from collections import OrderedDict
+from itertools import chain
+from typing import Any, Callable, Iterable
 
 import numpy as np
 
-from minigrid.core.constants import OBJECT_TO_IDX, TILE_PIXELS
-from minigrid.core.world_object import Wall, WorldObj
+from minigrid.core.constants import (
+    COLOR_TO_IDX,
+    OBJECT_TO_IDX,
+    STATE_TO_IDX,
+    TILE_PIXELS,
+)
+from minigrid.core.world_object import (
+    Ball,
+    Box,
+    Door,
+    Fake_Lava,
+    Floor,
+    Goal,
+    Key,
+    Lava,
+    Wall,
+    WorldObj,
+)
 from minigrid.utils.rendering import (
     downsample,
     fill_coords,
@@ -16,14 +35,168 @@ from minigrid.utils.rendering import (
     rotate_fn,
 )
 
+# Encodings of an empty cell and of a plain (grey) wall
+EMPTY_ENCODING = (OBJECT_TO_IDX["empty"], 0, 0)
+WALL_ENCODING = Wall().encode()
+
+MASK64 = (1 << 64) - 1
+
+
+def mix64(x: int) -> int:
+    """
+    SplitMix64 finalizer, used to derive the Zobrist keys
+    """
+
+    x = (x + 0x9E3779B97F4A7C15) & MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK64
+    return x ^ (x >> 31)
+
+
+def zobrist_key(i: int, j: int, encoding: Iterable[int]) -> int:
+    """
+    64-bit Zobrist key of a cell holding an encoded object. Keys are
+    derived by hashing the cell and the encoding rather than drawn from a
+    table, so that they are the same for every grid size and process.
+    """
+
+    type_idx, color_idx, state = (int(v) for v in encoding)
+    return mix64(int(i) << 40 | int(j) << 24 | type_idx << 16 | color_idx << 8 | state)
+
+
+def zobrist_hash(encoding: np.ndarray) -> int:
+    """
+    Zobrist hash of a grid encoding, the XOR of the keys of its non-empty
+    cells
+    """
+
+    width, height, _ = encoding.shape
+    i, j = np.meshgrid(
+        np.arange(width, dtype=np.uint64), np.arange(height, dtype=np.uint64), indexing="ij"
+    )
+    code = encoding.astype(np.uint64)
+    x = (
+        (i << np.uint64(40))
+        | (j << np.uint64(24))
+        | (code[:, :, 0] << np.uint64(16))
+        | (code[:, :, 1] << np.uint64(8))
+        | code[:, :, 2]
+    )
+
+    # Vectorized mix64, uint64 arithmetic wraps around
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    x = x ^ (x >> np.uint64(31))
+
+    x[np.all(encoding == EMPTY_ENCODING, axis=2)] = 0
+    return int(np.bitwise_xor.reduce(x, axis=None))
+
+
+def flood_fill(crossable: np.ndarray, start: tuple[int, int]) -> np.ndarray:
+    """
+    Mask of the cells of a 2D grid reachable from `start` by moving between
+    horizontal and vertical neighbors. Only crossable cells are left, the
+    other cells are reached but block the way.
+
+    The grid is handled as a single bitset (bit i * (height + 1) + j is
+    cell (i, j), with a guard bit closing each column), and the reached
+    cells grow by one step in the four directions at each iteration.
+    """
+
+    width, height = crossable.shape
+    stride = height + 1
+    num_bytes = (width * stride + 7) // 8
+
+    padded = np.zeros((width, stride), dtype=bool)
+    padded[:, :height] = crossable
+    cross = int.from_bytes(np.packbits(padded, bitorder="little").tobytes(), "little")
+    padded[:, :height] = True
+    inside = int.from_bytes(np.packbits(padded, bitorder="little").tobytes(), "little")
+
+    reached = frontier = 1 << int(start[0] * stride + start[1])
+    while frontier:
+        src = frontier & cross
+        grow = (src << 1) | (src >> 1) | (src << stride) | (src >> stride)
+        frontier = grow & inside & ~reached
+        reached |= frontier
+
+    mask = np.unpackbits(
+        np.frombuffer(reached.to_bytes(num_bytes, "little"), dtype=np.uint8),
+        count=width * stride,
+        bitorder="little",
+    )
+
+    return mask.reshape(width, stride)[:, :height].astype(bool)
+
+
+class TileCache:
+    """
+    Cache of rendered tiles, evicting the least recently used tiles once
+    it holds `max_size` of them (no limit if None). Hits, misses and
+    evictions are counted.
+    """
+
+    def __init__(self, max_size: int | None = 1024):
+        self.max_size = max_size
+        self.tiles: OrderedDict[tuple[Any, ...], np.ndarray] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+    def __contains__(self, key: tuple[Any, ...]) -> bool:
+        return key in self.tiles
+
+    def get(self, key: tuple[Any, ...]) -> np.ndarray | None:
+        """
+        Get a tile, or None if it isn't cached
+        """
+
+        tile = self.tiles.get(key)
+        if tile is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.tiles.move_to_end(key)
+        return tile
+
+    def __setitem__(self, key: tuple[Any, ...], tile: np.ndarray):
+        self.tiles[key] = tile
+        self.tiles.move_to_end(key)
+
+        if self.max_size is not None:
+            while len(self.tiles) > self.max_size:
+                self.tiles.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        self.tiles.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self.tiles),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
 
 class Grid:
     """
     Represent a grid and operations on it
     """
 
-    # Static cache of pre-renderer tiles
-    tile_cache: dict[tuple[Any, ...], Any] = {}
+    # Static cache of pre-renderer tiles, can be replaced by another
+    # TileCache to change its size
+    tile_cache: TileCache = TileCache()
+
+    # Tile atlases, by tile size
+    tile_atlases: dict[int, TileAtlas] = {}
 
     def __init__(self, width: int, height: int):
         assert width >= 3
@@ -34,6 +207,36 @@ class Grid:
 
         self.grid: list[WorldObj | None] = [None] * (width * height)
 
+        # Cached encoding of the grid and of which cells can be seen
+        # through, built on the first call to encode() and then kept up
+        # to date by set()
+        self._encoding: np.ndarray | None = None
+        self._see_behind: np.ndarray | None = None
+
+        # Positions of objects whose encoding can change without going
+        # through set() (e.g. doors being opened)
+        self._dynamic: set[tuple[int, int]] = set()
+
+        # Zobrist hash of the encoding, computed by the first call to
+        # zobrist_hash() and then updated along with the encoding
+        self._hash: int | None = None
+
+        # Objects which fast_copy() has to copy, found on its first call
+        # and reset by set()
+        self._mutable: list[Any] | None = None
+
+        # Objects by type and color, then by position, built on the first
+        # call to find_objs() and then kept up to date by set(). Colors which
+        # are not names, such as the RGB arrays of FloorCustom, are indexed
+        # as None.
+        self._index: dict[
+            tuple[str, str | None], dict[tuple[int, int], WorldObj]
+        ] | None = None
+
+        # Indexed object at each position with the type and color it had
+        # when indexed, objects can change type or color in place
+        self._indexed: dict[tuple[int, int], tuple[WorldObj, str, Any]] = {}
+
     def __contains__(self, key: Any) -> bool:
         if isinstance(key, WorldObj):
             for e in self.grid:
@@ -62,6 +265,33 @@ class Grid:
 
         return deepcopy(self)
 
+    def fast_copy(self) -> Grid:
+        """
+        Copy the grid, sharing the objects which cannot change (walls,
+        floors, lava, goals, etc.) with this grid. Objects which can be
+        picked up or toggled are copied, as is the cached encoding.
+        """
+
+        self._update_encoding()
+        if self._mutable is None:
+            self._mutable = [
+                k for k, v in enumerate(self.grid) if v is not None and not _is_shared(v)
+            ]
+
+        grid = copy.copy(self)
+        grid.grid = self.grid.copy()
+        for k in self._mutable:
+            grid.grid[k] = _copy_obj(self.grid[k])
+        grid._copy_encoding(self)
+        grid._index = None
+        grid._indexed = {}
+        return grid
+
+    def _copy_encoding(self, other: Grid):
+        self._encoding = other._encoding.copy()
+        self._see_behind = other._see_behind.copy()
+        self._dynamic = set(other._dynamic)
+
     def set(self, i: int, j: int, v: WorldObj | None):
         assert (
             0 <= i < self.width
@@ -69,7 +299,25 @@ class Grid:
         assert (
             0 <= j < self.height
         ), f"row index {j} outside of grid of height {self.height}"
+        if self._index is not None:
+            self._update_index((i, j), v)
         self.grid[j * self.width + i] = v
+        self._mutable = None
+
+        if self._encoding is not None:
+            self._toggle_hash(i, j)
+            if v is None:
+                self._encoding[i, j] = EMPTY_ENCODING
+                self._see_behind[i, j] = True
+                self._dynamic.discard((i, j))
+            else:
+                self._encoding[i, j] = v.encode()
+                self._see_behind[i, j] = v.see_behind()
+                if _is_dynamic(v):
+                    self._dynamic.add((i, j))
+                else:
+                    self._dynamic.discard((i, j))
+            self._toggle_hash(i, j)
 
     def get(self, i: int, j: int) -> WorldObj | None:
         assert 0 <= i < self.width
@@ -77,6 +325,61 @@ class Grid:
         assert self.grid is not None
         return self.grid[j * self.width + i]
 
+    def find_objs(
+        self,
+        type: str | None = None,
+        color: str | None = None,
+        top: tuple[int, int] | None = None,
+        size: tuple[int, int] | None = None,
+    ) -> list[tuple[tuple[int, int], WorldObj]]:
+        """
+        Find the objects of the given type and color (any if None), inside
+        of the rectangle at `top` of the given size if there is one. Returns
+        (position, object) pairs in column-major order, the order in which
+        the cells are visited when scanning the grid.
+        """
+
+        if self._index is None:
+            self._index = {}
+            self._indexed = {}
+            for k, v in enumerate(self.grid):
+                if v is not None:
+                    self._update_index((k % self.width, k // self.width), v)
+        else:
+            # Re-index the objects which changed type or color in place
+            stale = [
+                (pos, v)
+                for pos, (v, obj_type, obj_color) in self._indexed.items()
+                if v.color is not obj_color or v.type is not obj_type
+            ]
+            for pos, v in stale:
+                self._update_index(pos, v)
+
+        found = []
+        for (obj_type, obj_color), objs in self._index.items():
+            if (type is None or obj_type == type) and (color is None or obj_color == color):
+                found.extend(objs.items())
+
+        if top is not None:
+            found = [(pos, v) for pos, v in found if _inside(pos, top, size)]
+
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def _update_index(self, pos: tuple[int, int], new: WorldObj | None):
+        # The previous object is removed under the key it was indexed with
+        old = self._indexed.pop(pos, None)
+        if old is not None:
+            key = _index_key(old[1], old[2])
+            objs = self._index[key]
+            del objs[pos]
+            if not objs:
+                del self._index[key]
+        if new is not None:
+            key = _index_key(new.type, new.color)
+            self._index.setdefault(key, {})[pos] = new
+            self._indexed[pos] = (new, new.type, new.color)
+
     def horz_wall(
         self,
         x: int,
@@ -167,10 +470,31 @@ class Grid:
 
         # Hash map lookup key for the cache
         key: tuple[Any, ...] = (agent_dir, highlight, tile_size)
-        key = obj.encode() + key if obj else key
+        key = obj.tile_key() + key if obj else key
 
-        if key in cls.tile_cache:
-            return cls.tile_cache[key]
+        img = cls.tile_cache.get(key)
+        if img is not None:
+            return img
+
+        img = cls.draw_tile(obj, agent_dir, highlight, tile_size, subdivs)
+        img = img.astype(np.uint8)
+
+        # Cache the rendered tile
+        cls.tile_cache[key] = img
+
+        return img
+
+    @staticmethod
+    def draw_tile(
+        obj: WorldObj | None,
+        agent_dir: int | None = None,
+        highlight: bool = False,
+        tile_size: int = TILE_PIXELS,
+        subdivs: int = 3,
+    ) -> np.ndarray:
+        """
+        Render a tile, without caching
+        """
 
         img = np.zeros(
             shape=(tile_size * subdivs, tile_size * subdivs, 3), dtype=np.uint8
@@ -202,9 +526,6 @@ class Grid:
         # Downsample the image to perform supersampling/anti-aliasing
         img = downsample(img, subdivs)
 
-        # Cache the rendered tile
-        cls.tile_cache[key] = img
-
         return img
 
     def render(
@@ -220,62 +541,191 @@ class Grid:
         :param tile_size: tile size in pixels
         """
 
-        if highlight_mask is None:
-            highlight_mask = np.zeros(shape=(self.width, self.height), dtype=bool)
-
-        # Compute the total grid size
-        width_px = self.width * tile_size
-        height_px = self.height * tile_size
-
-        img = np.zeros(shape=(height_px, width_px, 3), dtype=np.uint8)
-
-        # Render the grid
-        for j in range(0, self.height):
-            for i in range(0, self.width):
-                cell = self.get(i, j)
-
-                agent_here = np.array_equal(agent_pos, (i, j))
-                assert highlight_mask is not None
-                tile_img = Grid.render_tile(
-                    cell,
-                    agent_dir=agent_dir if agent_here else None,
-                    highlight=highlight_mask[i, j],
-                    tile_size=tile_size,
-                )
-
-                ymin = j * tile_size
-                ymax = (j + 1) * tile_size
-                xmin = i * tile_size
-                xmax = (i + 1) * tile_size
-                img[ymin:ymax, xmin:xmax, :] = tile_img
+        # Cells whose tile can't be drawn from their encoding alone
+        custom_tiles = self.custom_tiles()
+
+        encoding = self.encode()
+        for i, j, _ in custom_tiles:
+            encoding[i, j] = EMPTY_ENCODING
+
+        img = self.tile_atlas(tile_size).render(
+            encoding, agent_pos, agent_dir, highlight_mask
+        )
+
+        for i, j, cell in custom_tiles:
+            agent_here = np.array_equal(agent_pos, (i, j))
+            tile_img = Grid.render_tile(
+                cell,
+                agent_dir=agent_dir if agent_here else None,
+                highlight=highlight_mask is not None and highlight_mask[i, j],
+                tile_size=tile_size,
+            )
+
+            ymin = j * tile_size
+            ymax = (j + 1) * tile_size
+            xmin = i * tile_size
+            xmax = (i + 1) * tile_size
+            img[ymin:ymax, xmin:xmax, :] = tile_img
 
         return img
 
+    @classmethod
+    def tile_atlas(cls, tile_size: int) -> TileAtlas:
+        """
+        Get the tile atlas shared by all grids for a given tile size
+        """
+
+        if tile_size not in cls.tile_atlases:
+            cls.tile_atlases[tile_size] = TileAtlas(tile_size)
+        return cls.tile_atlases[tile_size]
+
+    @classmethod
+    def prewarm_tiles(cls, objs: Iterable[WorldObj | None], tile_size: int = TILE_PIXELS):
+        """
+        Render in advance the tiles of some objects, with and without
+        highlighting, so that they are cached when rendering grids
+        """
+
+        # Objects which look the same share their tiles
+        objs = {obj.tile_key() if obj else None: obj for obj in objs}.values()
+
+        encodings = []
+        for obj in objs:
+            if obj is None or type(obj) in TileAtlas.objects:
+                encodings.append(obj.encode() if obj else EMPTY_ENCODING)
+                continue
+            for highlight in (False, True):
+                cls.render_tile(obj, highlight=highlight, tile_size=tile_size)
+
+        cls.tile_atlas(tile_size).prewarm(np.array(encodings, dtype=np.uint8))
+
+    def custom_tiles(self) -> list[tuple[int, int, WorldObj]]:
+        """
+        List the objects which are not drawn from the tile atlas
+        """
+
+        return [
+            (k % self.width, k // self.width, v)
+            for k, v in enumerate(self.grid)
+            if v is not None and type(v) not in TileAtlas.objects
+        ]
+
     def encode(self, vis_mask: np.ndarray | None = None) -> np.ndarray:
         """
         Produce a compact numpy encoding of the grid
         """
 
+        self._update_encoding()
+
         if vis_mask is None:
-            vis_mask = np.ones((self.width, self.height), dtype=bool)
+            return self._encoding.copy()
+        return np.where(vis_mask[:, :, None], self._encoding, 0).astype(np.uint8)
 
-        array = np.zeros((self.width, self.height, 3), dtype="uint8")
+    def free_mask(self) -> np.ndarray:
+        """
+        Mask of the empty cells, read from the encoding which set() keeps
+        up to date
+        """
 
-        for i in range(self.width):
-            for j in range(self.height):
-                assert vis_mask is not None
-                if vis_mask[i, j]:
-                    v = self.get(i, j)
+        self._update_encoding()
+        return self._encoding[:, :, 0] == EMPTY_ENCODING[0]
+
+    def reachable_mask(self, start: tuple[int, int]) -> np.ndarray:
+        """
+        Mask of the cells reachable from `start` without moving any object,
+        going through empty cells and doors (even locked ones). Cells holding
+        other objects are reachable but cannot be crossed.
+        """
+
+        self._update_encoding()
+        types = self._encoding[:, :, 0]
+        crossable = (types == EMPTY_ENCODING[0]) | (types == OBJECT_TO_IDX["door"])
+        return flood_fill(crossable, start)
+
+    def zobrist_hash(self) -> int:
+        """
+        64-bit Zobrist hash of the grid encoding. It is computed once and
+        then updated incrementally by set() and when dynamic objects (e.g.
+        doors) change state, so this is O(1) in the size of the grid.
+        """
+
+        self._update_encoding()
+        if self._hash is None:
+            self._hash = zobrist_hash(self._encoding)
+        return self._hash
+
+    def _toggle_hash(self, i: int, j: int):
+        """
+        XOR the key of the current encoding of a cell into the hash
+        """
+
+        if self._hash is not None:
+            code = tuple(self._encoding[i, j].tolist())
+            if code != EMPTY_ENCODING:
+                self._hash ^= zobrist_key(i, j, code)
+
+    def gather(self, xs: np.ndarray, ys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the encoding and the see-behind mask of the cells at (xs, ys).
+        Cells outside of the grid are treated as walls, like in slice().
+        """
+
+        self._update_encoding()
+
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        xs = np.where(inside, xs, 0)
+        ys = np.where(inside, ys, 0)
+
+        encoding = self._encoding[xs, ys]
+        encoding[~inside] = WALL_ENCODING
+        see_behind = self._see_behind[xs, ys] & inside
+
+        return encoding, see_behind
 
-                    if v is None:
-                        array[i, j, 0] = OBJECT_TO_IDX["empty"]
-                        array[i, j, 1] = 0
-                        array[i, j, 2] = 0
+    def _update_encoding(self):
+        if self._encoding is None:
+            self._build_encoding()
+        else:
+            self._sync()
 
-                    else:
-                        array[i, j, :] = v.encode()
+    def _build_encoding(self):
+        codes = [EMPTY_ENCODING if v is None else v.encode() for v in self.grid]
+        flat = np.fromiter(
+            chain.from_iterable(codes), dtype=np.uint8, count=3 * len(codes)
+        )
+        self._encoding = np.ascontiguousarray(
+            flat.reshape(self.height, self.width, 3).transpose(1, 0, 2)
+        )
+        see_behind = np.fromiter(
+            (v is None or v.see_behind() for v in self.grid),
+            dtype=bool,
+            count=len(codes),
+        )
+        self._see_behind = np.ascontiguousarray(
+            see_behind.reshape(self.height, self.width).T
+        )
+        self._dynamic = {
+            (k % self.width, k // self.width)
+            for k, v in enumerate(self.grid)
+            if v is not None and _is_dynamic(v)
+        }
 
-        return array
+    def _sync(self):
+        """
+        Write the current state of the dynamic objects back into the encoding
+        """
+
+        for i, j in self._dynamic:
+            v = self.get(i, j)
+            if self._hash is None:
+                self._encoding[i, j] = v.encode()
+            else:
+                old = self._encoding[i, j].tolist()
+                self._encoding[i, j] = v.encode()
+                if self._encoding[i, j].tolist() != old:
+                    self._hash ^= zobrist_key(i, j, old)
+                    self._toggle_hash(i, j)
+            self._see_behind[i, j] = v.see_behind()
 
     @staticmethod
     def decode(array: np.ndarray) -> tuple[Grid, np.ndarray]:
@@ -299,40 +749,610 @@ class Grid:
         return grid, vis_mask
 
     def process_vis(self, agent_pos: tuple[int, int]) -> np.ndarray:
-        mask = np.zeros(shape=(self.width, self.height), dtype=bool)
+        self._update_encoding()
 
-        mask[agent_pos[0], agent_pos[1]] = True
+        mask = compute_vis_mask(self._see_behind, agent_pos)
 
-        for j in reversed(range(0, self.height)):
-            for i in range(0, self.width - 1):
-                if not mask[i, j]:
-                    continue
+        # Clear every cell which is not visible
+        for k in np.flatnonzero(~mask.T):
+            self.grid[k] = None
+        self._index = None
+        self._encoding[~mask] = EMPTY_ENCODING
+        self._see_behind[~mask] = True
+        self._dynamic = {pos for pos in self._dynamic if mask[pos]}
+        self._hash = None
 
-                cell = self.get(i, j)
-                if cell and not cell.see_behind() and not (i,j)==agent_pos:
-                    continue
+        return mask
 
-                mask[i + 1, j] = True
-                if j > 0:
-                    mask[i + 1, j - 1] = True
-                    mask[i, j - 1] = True
 
-            for i in reversed(range(1, self.width)):
-                if not mask[i, j]:
-                    continue
+class ArrayGrid(Grid):
+    """
+    Grid backed by a (width, height, 3) uint8 type/color/state tensor.
+
+    The tensor is the source of truth, so encoding, slicing and rotating
+    the grid are plain NumPy operations. WorldObj instances are only
+    created when a cell is accessed with `get()`. Objects placed with
+    `set()` are kept as-is, so that references held by the environment
+    (doors, boxes, carried objects, etc.) keep working.
+    """
+
+    def __init__(self, width: int, height: int):
+        assert width >= 3
+        assert height >= 3
+
+        self.width: int = width
+        self.height: int = height
 
-                cell = self.get(i, j)
-                if cell and not cell.see_behind() and not (i,j)==agent_pos:
+        self._encoding = np.empty((width, height, 3), dtype=np.uint8)
+        self._encoding[:, :] = EMPTY_ENCODING
+
+        self._see_behind = np.ones((width, height), dtype=bool)
+
+        # Materialized objects, keyed by position
+        self.objs: dict[tuple[int, int], WorldObj] = {}
+
+        self._dynamic: set[tuple[int, int]] = set()
+        self._hash: int | None = None
+        self._mutable: list[Any] | None = None
+
+    @classmethod
+    def from_grid(cls, grid: Grid) -> ArrayGrid:
+        """
+        Build an array-backed grid holding the same objects as `grid`.
+        Plain walls are stored in the tensor only, every other object is
+        kept so that its identity is preserved.
+        """
+
+        out = cls(grid.width, grid.height)
+        for j in range(grid.height):
+            for i in range(grid.width):
+                v = grid.get(i, j)
+                if v is None:
                     continue
+                if type(v) is Wall:
+                    out._encoding[i, j] = v.encode()
+                    out._see_behind[i, j] = False
+                else:
+                    out.set(i, j, v)
+        return out
+
+    @property
+    def grid(self) -> list[WorldObj | None]:
+        return [self.get(i, j) for j in range(self.height) for i in range(self.width)]
+
+    def fast_copy(self) -> ArrayGrid:
+        self._sync()
+        if self._mutable is None:
+            self._mutable = [pos for pos, v in self.objs.items() if not _is_shared(v)]
+
+        grid = copy.copy(self)
+        grid.objs = self.objs.copy()
+        for pos in self._mutable:
+            grid.objs[pos] = _copy_obj(self.objs[pos])
+        grid._copy_encoding(self)
+        return grid
+
+    def __contains__(self, key: Any) -> bool:
+        if isinstance(key, WorldObj):
+            return any(e is key for e in self.objs.values())
+        elif isinstance(key, tuple):
+            self._sync()
+            for e in self.objs.values():
+                if (e.color, e.type) == key:
+                    return True
+                if key[0] is None and key[1] == e.type:
+                    return True
+
+            # Cells which have not been materialized yet
+            lazy = np.ones((self.width, self.height), dtype=bool)
+            for pos in self.objs:
+                lazy[pos] = False
+            match = lazy & (self._encoding[:, :, 0] == OBJECT_TO_IDX.get(key[1], -1))
+            if key[0] is not None:
+                match &= self._encoding[:, :, 1] == COLOR_TO_IDX.get(key[0], -1)
+            return bool(match.any())
+        return False
+
+    def find_objs(
+        self,
+        type: str | None = None,
+        color: str | None = None,
+        top: tuple[int, int] | None = None,
+        size: tuple[int, int] | None = None,
+    ) -> list[tuple[tuple[int, int], WorldObj]]:
+        # The tensor indexes the cells by type, only the candidates are
+        # materialized
+        types = self._encoding[:, :, 0]
+        if type is None:
+            mask = types != OBJECT_TO_IDX["empty"]
+        else:
+            mask = types == OBJECT_TO_IDX.get(type, -1)
+        if top is not None:
+            (x0, y0), (w, h) = top, size
+            x1, y1 = x0 + w, y0 + h
+            x0, y0 = max(x0, 0), max(y0, 0)
+            region = np.zeros_like(mask)
+            region[x0:x1, y0:y1] = True
+            mask &= region
+
+        found = []
+        for i, j in zip(*(a.tolist() for a in np.nonzero(mask))):
+            v = self.get(i, j)
+            if (type is None or v.type == type) and (color is None or v.color == color):
+                found.append(((i, j), v))
+        return found
+
+    def set(self, i: int, j: int, v: WorldObj | None):
+        assert (
+            0 <= i < self.width
+        ), f"column index {j} outside of grid of width {self.width}"
+        assert (
+            0 <= j < self.height
+        ), f"row index {j} outside of grid of height {self.height}"
+
+        pos = (i, j)
+        self._toggle_hash(i, j)
+        if v is None:
+            self._encoding[i, j] = EMPTY_ENCODING
+            self._see_behind[i, j] = True
+            self.objs.pop(pos, None)
+            self._dynamic.discard(pos)
+        else:
+            self._store(pos, v)
+        self._toggle_hash(i, j)
+
+    def get(self, i: int, j: int) -> WorldObj | None:
+        assert 0 <= i < self.width
+        assert 0 <= j < self.height
+
+        pos = (i, j)
+        v = self.objs.get(pos)
+        if v is None:
+            type_idx, color_idx, state = self._encoding[i, j]
+            v = WorldObj.decode(type_idx, color_idx, state)
+            if v is not None:
+                self._store(pos, v)
+        return v
+
+    def _store(self, pos: tuple[int, int], v: WorldObj):
+        self._encoding[pos] = v.encode()
+        self._see_behind[pos] = v.see_behind()
+        self.objs[pos] = v
+        self._mutable = None
+        if _is_dynamic(v):
+            self._dynamic.add(pos)
+        else:
+            self._dynamic.discard(pos)
+
+    def horz_wall(
+        self,
+        x: int,
+        y: int,
+        length: int | None = None,
+        obj_type: Callable[[], WorldObj] = Wall,
+        variegate=np.array([0, 0]),
+    ):
+        if length is None:
+            length = self.width - x
+        if obj_type is not Wall or variegate.any():
+            return super().horz_wall(x, y, length, obj_type, variegate)
+
+        assert 0 <= x and x + length <= self.width and 0 <= y < self.height
+        self._fill_walls(slice(x, x + length), y)
+
+    def vert_wall(
+        self,
+        x: int,
+        y: int,
+        length: int | None = None,
+        obj_type: Callable[[], WorldObj] = Wall,
+        variegate=np.array([0, 0]),
+    ):
+        if length is None:
+            length = self.height - y
+        if obj_type is not Wall or variegate.any():
+            return super().vert_wall(x, y, length, obj_type, variegate)
 
-                mask[i - 1, j] = True
-                if j > 0:
-                    mask[i - 1, j - 1] = True
-                    mask[i, j - 1] = True
+        assert 0 <= x < self.width and 0 <= y and y + length <= self.height
+        self._fill_walls(x, slice(y, y + length))
 
-        for j in range(0, self.height):
-            for i in range(0, self.width):
-                if not mask[i, j]:
-                    self.set(i, j, None)
+    def _fill_walls(self, xs: int | slice, ys: int | slice):
+        self._encoding[xs, ys] = WALL_ENCODING
+        self._see_behind[xs, ys] = False
+
+        mask = np.zeros((self.width, self.height), dtype=bool)
+        mask[xs, ys] = True
+        for pos in [pos for pos in self.objs if mask[pos]]:
+            del self.objs[pos]
+            self._dynamic.discard(pos)
+        self._hash = None
+
+    def rotate_left(self) -> ArrayGrid:
+        """
+        Rotate the grid to the left (counter-clockwise)
+        """
+
+        self._sync()
+
+        grid = ArrayGrid(self.height, self.width)
+        grid._encoding = np.ascontiguousarray(np.rot90(self._encoding, k=-1))
+        grid._see_behind = np.ascontiguousarray(np.rot90(self._see_behind, k=-1))
+
+        for (i, j), v in self.objs.items():
+            grid.objs[j, grid.height - 1 - i] = v
+        grid._dynamic = {(j, grid.height - 1 - i) for i, j in self._dynamic}
+
+        return grid
+
+    def slice(self, topX: int, topY: int, width: int, height: int) -> ArrayGrid:
+        """
+        Get a subset of the grid
+        """
+
+        self._sync()
+
+        grid = ArrayGrid(width, height)
+        grid._encoding[:, :] = WALL_ENCODING
+        grid._see_behind[:, :] = False
+
+        # Part of the requested window which overlaps with this grid
+        x0, x1 = max(topX, 0), min(topX + width, self.width)
+        y0, y1 = max(topY, 0), min(topY + height, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return grid
+
+        dst = (slice(x0 - topX, x1 - topX), slice(y0 - topY, y1 - topY))
+        grid._encoding[dst] = self._encoding[x0:x1, y0:y1]
+        grid._see_behind[dst] = self._see_behind[x0:x1, y0:y1]
+
+        for (i, j), v in self.objs.items():
+            if x0 <= i < x1 and y0 <= j < y1:
+                pos = (i - topX, j - topY)
+                grid.objs[pos] = v
+                if (i, j) in self._dynamic:
+                    grid._dynamic.add(pos)
+
+        return grid
+
+    @staticmethod
+    def decode(array: np.ndarray) -> tuple[ArrayGrid, np.ndarray]:
+        """
+        Decode an array grid encoding back into a grid
+        """
+
+        width, height, channels = array.shape
+        assert channels == 3
+
+        vis_mask = array[:, :, 0] != OBJECT_TO_IDX["unseen"]
+
+        grid = ArrayGrid(width, height)
+        grid._encoding[vis_mask] = array[vis_mask]
+        grid._see_behind = see_behind_from_encoding(grid._encoding)
+
+        return grid, vis_mask
+
+    def process_vis(self, agent_pos: tuple[int, int]) -> np.ndarray:
+        self._sync()
+
+        mask = compute_vis_mask(self._see_behind, agent_pos)
+
+        self._encoding[~mask] = EMPTY_ENCODING
+        self._see_behind[~mask] = True
+        for pos in [pos for pos in self.objs if not mask[pos]]:
+            del self.objs[pos]
+            self._dynamic.discard(pos)
+        self._hash = None
 
         return mask
+
+    def custom_tiles(self) -> list[tuple[int, int, WorldObj]]:
+        # Cells which have not been materialized hold plain objects
+        return [
+            (i, j, v)
+            for (i, j), v in self.objs.items()
+            if type(v) not in TileAtlas.objects
+        ]
+
+
+class TileAtlas:
+    """
+    Rendered tiles of a given size, stored in a single array indexed by
+    (type, color, state, agent_dir, highlight), where agent_dir is 4 when
+    there is no agent on the tile. This allows rendering a whole grid from
+    its encoding by gathering the tiles of all cells at once.
+
+    Tiles are rendered the first time they are needed. Only objects whose
+    appearance is fully described by their encoding can be drawn this way.
+    """
+
+    # Objects which can be drawn from their encoding
+    objects = (Wall, Floor, Door, Key, Ball, Box, Goal, Lava, Fake_Lava)
+
+    def __init__(self, tile_size: int, subdivs: int = 3):
+        self.tile_size = tile_size
+        self.subdivs = subdivs
+
+        self.shape = (
+            max(OBJECT_TO_IDX.values()) + 1,
+            len(COLOR_TO_IDX),
+            len(STATE_TO_IDX),
+            5,
+            2,
+        )
+        self.tiles = np.zeros(self.shape + (tile_size, tile_size, 3), dtype=np.uint8)
+        self.rendered = np.zeros(self.shape, dtype=bool)
+
+    def render(
+        self,
+        encoding: np.ndarray,
+        agent_pos: tuple[int, int],
+        agent_dir: int | None = None,
+        highlight_mask: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """
+        Render a grid encoding, see `Grid.render`
+        """
+
+        width, height = encoding.shape[:2]
+        tile_size = self.tile_size
+
+        agent = np.full((width, height), 4)
+        if agent_dir is not None:
+            x, y = agent_pos
+            if 0 <= x < width and 0 <= y < height:
+                agent[x, y] = agent_dir
+
+        if highlight_mask is None:
+            highlight = np.zeros((width, height), dtype=np.int64)
+        else:
+            highlight = highlight_mask.astype(np.int64)
+
+        idx = np.ravel_multi_index(
+            (encoding[:, :, 0], encoding[:, :, 1], encoding[:, :, 2], agent, highlight),
+            self.shape,
+        )
+        self._render_missing(idx)
+
+        # (width, height, tile_size, tile_size, 3) tiles, laid out row by row
+        tiles = self.tiles.reshape((-1, tile_size, tile_size, 3))[idx]
+        return tiles.transpose(1, 2, 0, 3, 4).reshape(
+            height * tile_size, width * tile_size, 3
+        )
+
+    def prewarm(self, encodings: np.ndarray):
+        """
+        Render the tiles of a list of encodings, with and without
+        highlighting, without the agent
+        """
+
+        encodings = encodings.reshape(-1, 3)
+        idx = np.ravel_multi_index(
+            (
+                encodings[:, None, 0],
+                encodings[:, None, 1],
+                encodings[:, None, 2],
+                4,
+                np.arange(2),
+            ),
+            self.shape,
+        )
+        self._render_missing(idx)
+
+    def _render_missing(self, idx: np.ndarray):
+        rendered = self.rendered.reshape(-1)
+        tiles = self.tiles.reshape((-1, self.tile_size, self.tile_size, 3))
+
+        needed = np.unique(idx)
+        for k in needed[~rendered[needed]]:
+            type_idx, color_idx, state, agent_dir, highlight = np.unravel_index(
+                k, self.shape
+            )
+            tiles[k] = Grid.draw_tile(
+                self._decode(type_idx, color_idx, state),
+                agent_dir=None if agent_dir == 4 else int(agent_dir),
+                highlight=bool(highlight),
+                tile_size=self.tile_size,
+                subdivs=self.subdivs,
+            )
+            rendered[k] = True
+
+    @staticmethod
+    def _decode(type_idx: int, color_idx: int, state: int) -> WorldObj | None:
+        # Lava and fake lava share their encoding and are drawn the same way
+        if type_idx == OBJECT_TO_IDX["lava"]:
+            return Lava()
+        return WorldObj.decode(type_idx, color_idx, state)
+
+
+# Whether the objects of each type can be shared, see _is_shared()
+_shared_types: dict[type, bool] = {}
+
+
+def _is_shared(v: WorldObj) -> bool:
+    """
+    Objects which cannot be picked up or toggled never change, and can be
+    shared between grid copies
+    """
+
+    cls = type(v)
+    shared = _shared_types.get(cls)
+    if shared is None:
+        shared = cls.toggle is WorldObj.toggle and not v.can_pickup()
+        _shared_types[cls] = shared
+    return shared
+
+
+def _inside(pos: tuple[int, int], top: tuple[int, int], size: tuple[int, int]) -> bool:
+    return 0 <= pos[0] - top[0] < size[0] and 0 <= pos[1] - top[1] < size[1]
+
+
+def _index_key(obj_type: str, color: Any) -> tuple[str, str | None]:
+    # Colors which are not names, such as RGB arrays, can't be hashed
+    return obj_type, color if isinstance(color, str) else None
+
+
+def _copy_obj(v: WorldObj | None) -> WorldObj | None:
+    """
+    Copy an object if it can change, see Grid.fast_copy()
+    """
+
+    if v is None or _is_shared(v):
+        return v
+
+    v = copy.copy(v)
+    if isinstance(v, Box):
+        v.contains = _copy_obj(v.contains)
+    return v
+
+
+def _is_dynamic(v: WorldObj) -> bool:
+    """
+    Objects overriding encode() may change their encoding in place
+    """
+
+    return type(v).encode is not WorldObj.encode
+
+
+def see_behind_from_encoding(array: np.ndarray) -> np.ndarray:
+    """
+    Compute which cells can be seen through from a grid encoding, or from
+    a stack of grid encodings
+    """
+
+    types = array[..., 0]
+    opaque = types == OBJECT_TO_IDX["wall"]
+    opaque |= (types == OBJECT_TO_IDX["door"]) & (array[..., 2] != STATE_TO_IDX["open"])
+    return ~opaque
+
+
+def compute_vis_mask(see_behind: np.ndarray, agent_pos: tuple[int, int]) -> np.ndarray:
+    """
+    Compute which cells of an agent view are visible, given which cells
+    can be seen through. This follows the same propagation as
+    `Grid.process_vis`, the agent's own cell never blocks the view.
+
+    Each row is handled as a bitset (bit i is column i), and visibility is
+    spread along a row with a logarithmic number of shifts.
+    """
+
+    width, height = see_behind.shape
+    ax, ay = agent_pos
+
+    full = (1 << width) - 1
+    num_bytes = (width + 7) // 8
+    packed = np.packbits(see_behind, axis=0, bitorder="little").T.tobytes()
+    if num_bytes == 1:
+        rows_see_behind = list(packed)
+    else:
+        bounds = range(0, (height + 1) * num_bytes, num_bytes)
+        rows_see_behind = [
+            int.from_bytes(packed[start:end], "little")
+            for start, end in zip(bounds, bounds[1:])
+        ]
+    rows_see_behind[ay] |= 1 << ax
+
+    rows = [0] * height
+    rows[ay] = 1 << ax
+
+    for j in reversed(range(0, height)):
+        row = rows[j]
+        row_see_behind = rows_see_behind[j]
+
+        # Left to right: a cell is visible if the cell before it is visible
+        # and can be seen through
+        left = row | (_fill(row & row_see_behind, row_see_behind, width, 1) << 1)
+        left &= full
+
+        # Right to left
+        right = left | (_fill(left & row_see_behind, row_see_behind, width, -1) >> 1)
+        rows[j] = right
+
+        if j > 0:
+            from_left = left & row_see_behind & (full >> 1)
+            from_right = right & row_see_behind & (full - 1)
+            rows[j - 1] |= from_left | (from_left << 1) | from_right | (from_right >> 1)
+
+    packed = b"".join(row.to_bytes(num_bytes, "little") for row in rows)
+    mask = np.unpackbits(
+        np.frombuffer(packed, dtype=np.uint8).reshape(height, num_bytes),
+        axis=1,
+        count=width,
+        bitorder="little",
+    )
+
+    return mask.T.astype(bool)
+
+
+def _fill(gen: int, pro: int, width: int, step: int) -> int:
+    """
+    Extend the bits of `gen` through the runs of bits of `pro`, towards
+    higher bits if step is 1 and towards lower bits if step is -1
+    """
+
+    shift = 1
+    while shift < width:
+        if step > 0:
+            gen |= pro & (gen << shift)
+            pro &= pro << shift
+        else:
+            gen |= pro & (gen >> shift)
+            pro &= pro >> shift
+        shift *= 2
+    return gen
+
+
+def compute_vis_masks(see_behind: np.ndarray, agent_pos: tuple[int, int]) -> np.ndarray:
+    """
+    Batched version of `compute_vis_mask`, for a (N, width, height) array
+    of see-behind masks of agent views sharing the same agent position.
+
+    Visibility is propagated row by row, starting from the agent's row.
+    Within a row, a cell is reached from the left (resp. right) if some
+    visible cell before it can be seen through, along with every cell in
+    between, which is computed with cumulative maximums over cell indices.
+    """
+
+    num_views, width, height = see_behind.shape
+    ax, ay = agent_pos
+
+    see_behind = see_behind.copy()
+    see_behind[:, ax, ay] = True
+
+    mask = np.zeros(shape=see_behind.shape, dtype=bool)
+    mask[:, ax, ay] = True
+
+    for j in reversed(range(0, height)):
+        row_see_behind = see_behind[:, :, j]
+
+        # Left to right, then right to left
+        left = _propagate_row(mask[:, :, j], row_see_behind)
+        right = _propagate_row(left[:, ::-1], row_see_behind[:, ::-1])[:, ::-1]
+        mask[:, :, j] = right
+
+        if j > 0:
+            left = left[:, :-1] & row_see_behind[:, :-1]
+            right = right[:, 1:] & row_see_behind[:, 1:]
+            above = mask[:, :, j - 1]
+            above[:, :-1] |= left | right
+            above[:, 1:] |= left | right
+
+    return mask
+
+
+def _propagate_row(row_mask: np.ndarray, row_see_behind: np.ndarray) -> np.ndarray:
+    """
+    Propagate visibility from left to right along (N, width) rows
+    """
+
+    idx = np.arange(row_mask.shape[1])
+
+    # Index of the last visible cell at or before each cell
+    last_visible = np.maximum.accumulate(np.where(row_mask, idx, -1), axis=1)
+
+    # Index of the last cell blocking the view strictly before each cell
+    last_blocking = np.maximum.accumulate(np.where(row_see_behind, -1, idx), axis=1)
+    last_blocking = np.concatenate(
+        [np.full((row_mask.shape[0], 1), -1), last_blocking[:, :-1]], axis=1
+    )
+
+    return last_visible > last_blocking
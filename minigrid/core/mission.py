@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from collections import OrderedDict
+from itertools import chain
 from typing import Any, Callable
 
 from gymnasium import spaces
@@ -25,6 +27,9 @@ class MissionSpace(spaces.Space[str]):
             "Get the ball."
     """
 
+    # Number of strings whose membership is kept in the cache of contains()
+    contains_cache_size: int = 1024
+
     def __init__(
         self,
         mission_func: Callable[..., str],
@@ -55,6 +60,12 @@ class MissionSpace(spaces.Space[str]):
         self.ordered_placeholders = ordered_placeholders
         self.mission_func = mission_func
 
+        # All the placeholders, looked up in the strings checked by contains()
+        self._placeholders = set(chain.from_iterable(ordered_placeholders or []))
+
+        # Membership of recently checked strings, least recently used first
+        self._contains_cache: OrderedDict[Any, bool] = OrderedDict()
+
         super().__init__(dtype=str, seed=seed)
 
         # Check that mission_func returns a string
@@ -78,25 +89,35 @@ class MissionSpace(spaces.Space[str]):
 
     def contains(self, x: Any) -> bool:
         """Return boolean specifying if x is a valid member of this space."""
+        # The same missions are checked over and over, answer them from a
+        # LRU cache
+        try:
+            contained = self._contains_cache.get(x)
+        except TypeError:
+            return self._contains(x)
+
+        if contained is None:
+            contained = self._contains(x)
+            self._contains_cache[x] = contained
+            if len(self._contains_cache) > self.contains_cache_size:
+                self._contains_cache.popitem(last=False)
+        else:
+            self._contains_cache.move_to_end(x)
+        return contained
+
+    def _contains(self, x: Any) -> bool:
         # Store a list of all the placeholders from self.ordered_placeholders that appear in x
         if self.ordered_placeholders is not None:
-            check_placeholder_list = []
-            for placeholder_list in self.ordered_placeholders:
-                for placeholder in placeholder_list:
-                    if placeholder in x:
-                        check_placeholder_list.append(placeholder)
-
-            # Remove duplicates from the list
-            check_placeholder_list = list(set(check_placeholder_list))
+            check_placeholder_list = [
+                placeholder for placeholder in self._placeholders if placeholder in x
+            ]
 
             start_id_placeholder = []
             end_id_placeholder = []
             # Get the starting and ending id of the identified placeholders with possible duplicates
             new_check_placeholder_list = []
             for placeholder in check_placeholder_list:
-                new_start_id_placeholder = [
-                    i for i in range(len(x)) if x.startswith(placeholder, i)
-                ]
+                new_start_id_placeholder = _find_all(x, placeholder)
                 new_check_placeholder_list += [placeholder] * len(
                     new_start_id_placeholder
                 )
@@ -195,3 +216,16 @@ class MissionSpace(spaces.Space[str]):
 
         # If none of the statements above return then False
         return False
+
+
+def _find_all(x: str, sub: str) -> list[int]:
+    """Starting indices of all the (possibly overlapping) occurrences of sub in x"""
+    if not sub:
+        return list(range(len(x)))
+
+    starts = []
+    start = x.find(sub)
+    while start != -1:
+        starts.append(start)
+        start = x.find(sub, start + 1)
+    return starts
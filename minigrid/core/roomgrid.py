@@ -3,11 +3,12 @@ from __future__ import annotations
 import numpy as np
 
 from minigrid.core.constants import COLOR_NAMES
-from minigrid.core.grid import Grid
+from minigrid.core.grid import Grid, flood_fill
 from minigrid.core.world_object import Ball, Box, Door, Key, WorldObj
-from minigrid.minigrid_env import MiniGridEnv
+from minigrid.minigrid_env import MiniGridEnv, vectorized_reject_fn
 
 
+@vectorized_reject_fn
 def reject_next_to(env: MiniGridEnv, pos: tuple[int, int]):
     """
     Function to filter out object positions that are right next to
@@ -341,22 +342,26 @@ class RoomGrid(MiniGridEnv):
         starting position
         """
 
-        start_room = self.room_from_pos(*self.agent_pos)
+        # Position of the starting room in the grid of rooms
+        start_i = self.agent_pos[0] // (self.room_size - 1)
+        start_j = self.agent_pos[1] // (self.room_size - 1)
 
         added_doors = []
 
         def find_reach():
-            reach = set()
-            stack = [start_room]
-            while len(stack) > 0:
-                room = stack.pop()
-                if room in reach:
-                    continue
-                reach.add(room)
-                for i in range(0, 4):
-                    if room.doors[i]:
-                        stack.append(room.neighbors[i])
-            return reach
+            # Flood fill of a lattice with the rooms at even coordinates and
+            # the walls between them at odd ones, crossable where there is a
+            # door
+            lattice = np.zeros((2 * self.num_cols - 1, 2 * self.num_rows - 1), bool)
+            lattice[::2, ::2] = True
+            for j in range(self.num_rows):
+                for i in range(self.num_cols):
+                    room = self.room_grid[j][i]
+                    if room.doors[0]:
+                        lattice[2 * i + 1, 2 * j] = True
+                    if room.doors[1]:
+                        lattice[2 * i, 2 * j + 1] = True
+            return flood_fill(lattice, (2 * start_i, 2 * start_j))[::2, ::2]
 
         num_itrs = 0
 
@@ -369,7 +374,7 @@ class RoomGrid(MiniGridEnv):
 
             # If all rooms are reachable, stop
             reach = find_reach()
-            if len(reach) == self.num_rows * self.num_cols:
+            if reach.all():
                 break
 
             # Pick a random room and door position
@@ -67,6 +67,10 @@ class WorldObj:
         """Encode the a description of this object as a 3-tuple of integers"""
         return (OBJECT_TO_IDX[self.type], COLOR_TO_IDX[self.color], 0)
 
+    def tile_key(self) -> tuple:
+        """Key identifying the appearance of this object, for tile caching"""
+        return self.encode()
+
     @staticmethod
     def decode(type_idx: int, color_idx: int, state: int) -> WorldObj | None:
         """Create an object from a 3-tuple state description"""
@@ -125,6 +129,9 @@ class Goal_invisible(WorldObj):
     def can_overlap(self):
         return True
 
+    def tile_key(self):
+        return ("goal_invisible",)
+
     def render(self, img):
         pass
 
@@ -166,6 +173,9 @@ class FloorCustom(WorldObj):
     def encode(self):
         return (OBJECT_TO_IDX[self.type], self.color.mean()+10, 0)
 
+    def tile_key(self):
+        return ("floor_custom",) + tuple(self.color.tolist())
+
 
 class Lava(WorldObj):
     def __init__(self):
@@ -235,6 +245,9 @@ class WallCustom(WorldObj):
     def render(self, img):
         fill_coords(img, point_in_rect(0, 1, 0, 1), COLORS[self.color]+self.add)
 
+    def tile_key(self):
+        return ("wall_custom", self.color) + tuple(np.asarray(self.add).tolist())
+
 
 class Gates(WorldObj):
     def __init__(self, color: str = "blue"):
@@ -248,6 +261,10 @@ class Gates(WorldObj):
     def can_overlap(self):
         return True
 
+    def tile_key(self):
+        # Gates are encoded as open doors, but are drawn as closed ones
+        return ("gates", self.color)
+
     def render(self, img):
         c = COLORS[self.color]
 
@@ -40,7 +40,7 @@ class Alternation_Env(MiniGridEnv):
     def _gen_mission():
         return "go around in clockwise and counterclockwise circles, alternating between the two"
 
-    def _gen_grid(self, width, height):
+    def _gen_static_grid(self, width, height):
         # Create an empty grid
         self.grid = Grid(width, height)
         
@@ -66,6 +66,7 @@ class Alternation_Env(MiniGridEnv):
         self.place_shape('plus',plusloc,'red')
         self.place_shape('x',xloc,'yellow')
 
+    def _gen_grid(self, width, height):
         # Place the agent
         if self.agent_start_pos is not None:
             self.agent_pos = self.agent_start_pos
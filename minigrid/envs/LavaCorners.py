@@ -52,7 +52,7 @@ class Lava_Corners(MiniGridEnv):
     def _gen_mission():
         return "avoid the real lava and get to the fake lava square"
 
-    def _gen_grid(self, width, height):
+    def _gen_static_grid(self, width, height):
         # Create an empty grid
         self.grid = Grid(width, height)
         
@@ -92,7 +92,8 @@ class Lava_Corners(MiniGridEnv):
         self.target_pos = (1, height-2)
         self.put_obj(Fake_Lava(), *self.target_pos)
         self.put_obj(Lava(), self.width-2, 1)
-        
+
+    def _gen_grid(self, width, height):
         # Place the agent
         if self.agent_start_pos is not None:
             self.agent_pos = self.agent_start_pos
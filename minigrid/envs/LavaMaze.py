@@ -36,7 +36,6 @@ class Lava_Maze(MiniGridEnv):
         self.order = order
         self.neg=neg
         self.curtains=curtains
-        self.regenerate=True
         
         mission_space = MissionSpace(mission_func=self._gen_mission)
         
@@ -55,83 +54,70 @@ class Lava_Maze(MiniGridEnv):
     def _gen_mission():
         return "avoid the real lava and get to the fake lava square"
 
-    def _gen_grid(self, width, height):
-        if self.regenerate:
-            # Create an empty grid
-            self.grid = Grid(width, height)
-            
-            # Generate the surrounding walls
-            #Consider: walls at -1, rather than 0
-            self.grid.horz_wall(0,0)
-            self.grid.vert_wall(0,0)
-            self.grid.horz_wall(0,height-1)
-            self.grid.vert_wall(width-1,0)
-
-            loc = [(width/3-4,height/3-4), (2*width/3-1,height/3-1), (width/3,height/3), (2*width/3-2,2*height/3-2)]
-
-            shapes = {}
-
-            shapes['T'] = {'name': 'triangle', 'color': self.tri_color}
-            shapes['P'] = {'name': 'plus', 'color': self.plus_color}
-            shapes['X'] = {'name': 'x', 'color': self.x_color}
-            shapes['D'] = {'name': 'dash', 'color': self.tri_color}
-
-            # Create dictionary 
-
-            for idx, char in enumerate(self.order):
-                self.place_shape(shapes[char]['name'], loc[idx], shapes[char]['color'])
-
-            #Adding shapes
-            self.place_shape('plus', (width/3-1,height/3-5), self.x_color)
-            self.place_shape('plus', (width/3,height/3-5), self.x_color)
-            self.place_shape('plus', (width/3+1,height/3-5), self.x_color)
-            self.place_shape('plus', (width/3-2,height/3-5), self.x_color)
-            self.place_shape('plus', (width/3-3,height/3+4), self.plus_color)
-            self.place_shape('plus', (width/3-2,height/3+4), self.plus_color)
-            self.place_shape('plus', (width/3-1,height/3+4), self.plus_color)
-            self.place_shape('plus', (width/3,height/3+4), self.plus_color)
-
-            #Adding the walls in the center
-            self.grid.horz_wall(0, int(height/3), length=int(width/3)+1)
-            self.grid.horz_wall(int(width/6)+1, height-height//3-1, length=int(width/6))
-            self.grid.horz_wall(int(5*width/6), int(height/3), length=int(width/6))
-            self.grid.vert_wall(width-width//3-1, 0, length=int(2*height/3))
-            self.grid.vert_wall(int(width/3), int(2*height/3), length=int(height/3))
-
-            #Adding the curtains
-            if self.curtains:
-                for i in range(int(width/6)):
-                    self.grid.set(int(i+1), height-height//3-1, Gates())
-                    self.grid.set(int(5*width/6)-1-i, int(height/3), Gates())
-
-
-            # Place lava
-            self.target_pos = (int(width/3)-1, height-2)
-            self.put_obj(Fake_Lava(), *self.target_pos)
-            self.put_obj(Lava(), self.width-2, height//3-1)
-            
-            # Place the agent
-            if self.agent_start_pos is not None:
-                self.agent_pos = self.agent_start_pos
-                self.agent_dir = self.agent_start_dir
-            else:
-                self.agent_pos = (-1, -1)
-                pos = self.place_obj(None)
-                self.agent_pos = pos
-                self.agent_dir = self._rand_int(0, 4)
-            
-            self.regenerate=False
+    def _gen_static_grid(self, width, height):
+        # Create an empty grid
+        self.grid = Grid(width, height)
+        
+        # Generate the surrounding walls
+        #Consider: walls at -1, rather than 0
+        self.grid.horz_wall(0,0)
+        self.grid.vert_wall(0,0)
+        self.grid.horz_wall(0,height-1)
+        self.grid.vert_wall(width-1,0)
+
+        loc = [(width/3-4,height/3-4), (2*width/3-1,height/3-1), (width/3,height/3), (2*width/3-2,2*height/3-2)]
+
+        shapes = {}
+
+        shapes['T'] = {'name': 'triangle', 'color': self.tri_color}
+        shapes['P'] = {'name': 'plus', 'color': self.plus_color}
+        shapes['X'] = {'name': 'x', 'color': self.x_color}
+        shapes['D'] = {'name': 'dash', 'color': self.tri_color}
+
+        # Create dictionary 
+
+        for idx, char in enumerate(self.order):
+            self.place_shape(shapes[char]['name'], loc[idx], shapes[char]['color'])
+
+        #Adding shapes
+        self.place_shape('plus', (width/3-1,height/3-5), self.x_color)
+        self.place_shape('plus', (width/3,height/3-5), self.x_color)
+        self.place_shape('plus', (width/3+1,height/3-5), self.x_color)
+        self.place_shape('plus', (width/3-2,height/3-5), self.x_color)
+        self.place_shape('plus', (width/3-3,height/3+4), self.plus_color)
+        self.place_shape('plus', (width/3-2,height/3+4), self.plus_color)
+        self.place_shape('plus', (width/3-1,height/3+4), self.plus_color)
+        self.place_shape('plus', (width/3,height/3+4), self.plus_color)
+
+        #Adding the walls in the center
+        self.grid.horz_wall(0, int(height/3), length=int(width/3)+1)
+        self.grid.horz_wall(int(width/6)+1, height-height//3-1, length=int(width/6))
+        self.grid.horz_wall(int(5*width/6), int(height/3), length=int(width/6))
+        self.grid.vert_wall(width-width//3-1, 0, length=int(2*height/3))
+        self.grid.vert_wall(int(width/3), int(2*height/3), length=int(height/3))
+
+        #Adding the curtains
+        if self.curtains:
+            for i in range(int(width/6)):
+                self.grid.set(int(i+1), height-height//3-1, Gates())
+                self.grid.set(int(5*width/6)-1-i, int(height/3), Gates())
+
+
+        # Place lava
+        self.target_pos = (int(width/3)-1, height-2)
+        self.put_obj(Fake_Lava(), *self.target_pos)
+        self.put_obj(Lava(), self.width-2, height//3-1)
 
+    def _gen_grid(self, width, height):
+        # Place the agent
+        if self.agent_start_pos is not None:
+            self.agent_pos = self.agent_start_pos
+            self.agent_dir = self.agent_start_dir
         else:
-            # Place the agent
-            if self.agent_start_pos is not None:
-                self.agent_pos = self.agent_start_pos
-                self.agent_dir = self.agent_start_dir
-            else:
-                self.agent_pos = (-1, -1)
-                pos = self.place_obj(None)
-                self.agent_pos = pos
-                self.agent_dir = self._rand_int(0, 4)
+            self.agent_pos = (-1, -1)
+            pos = self.place_obj(None)
+            self.agent_pos = pos
+            self.agent_dir = self._rand_int(0, 4)
 
     
     def step(self, action):
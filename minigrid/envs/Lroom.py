@@ -41,7 +41,7 @@ class L_Env(MiniGridEnv):
     def _gen_mission():
         return "reach the goal"
 
-    def _gen_grid(self, width, height):
+    def _gen_static_grid(self, width, height):
         # Create an empty grid
         self.grid = Grid(width, height)
         
@@ -53,7 +53,8 @@ class L_Env(MiniGridEnv):
         self.grid.vert_wall(width-1,0)
         for i in range(self.Lheight+1,height-1):
             self.grid.horz_wall(self.Lwidth+1, i, length=width-self.Lwidth-1)
-        
+
+    def _gen_grid(self, width, height):
         # Place the agent
         if self.agent_start_pos is not None:
             self.agent_pos = self.agent_start_pos
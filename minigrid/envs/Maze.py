@@ -5,7 +5,7 @@ from gymnasium import spaces
 from minigrid.core.grid import Grid
 from minigrid.core.mission import MissionSpace
 from minigrid.core.world_object import Floor, Gates, Lava, Fake_Lava
-from minigrid.minigrid_env import MiniGridEnv
+from minigrid.minigrid_env import MiniGridEnv, vectorized_reject_fn
 from minigrid.core.constants import PATTERNS, IDX_TO_COLOR
 
 class Maze(MiniGridEnv):
@@ -58,7 +58,7 @@ class Maze(MiniGridEnv):
     def _gen_mission():
         return "goof around, have a nice life"
 
-    def _gen_grid(self, width, height):
+    def _gen_static_grid(self, width, height):
         # Create an empty grid
         self.grid = Grid(width, height)
         
@@ -103,7 +103,8 @@ class Maze(MiniGridEnv):
             self.grid.vert_wall(width-width//3-1, 0, length=int(2*height/3))
         if self.wall_four:
             self.grid.horz_wall(0, int(height/3), length=int(width/3)+1)
-        
+
+    def _gen_grid(self, width, height):
         # Place the agent
         if self.agent_start_pos is not None:
             self.agent_pos = self.agent_start_pos
@@ -111,7 +112,7 @@ class Maze(MiniGridEnv):
         else:
             self.agent_pos = (-1, -1)
             if self.wall_one and self.wall_two:
-                pos = self.place_obj(None, reject_fn=lambda env, pos: (pos[0] < env.width/3 and pos[1] > 2*env.height/3))
+                pos = self.place_obj(None, reject_fn=vectorized_reject_fn(lambda env, pos: (pos[0] < env.width/3) & (pos[1] > 2*env.height/3)))
             else:
                 pos = self.place_obj(None)
             self.agent_pos = pos
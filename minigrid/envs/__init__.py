@@ -1,36 +1,103 @@
 from __future__ import annotations
 
-from minigrid.envs.blockedunlockpickup import BlockedUnlockPickupEnv
-from minigrid.envs.crossing import CrossingEnv
-from minigrid.envs.distshift import DistShiftEnv
-from minigrid.envs.donut import SquareDonutEnv_16, SquareDonutEnv_17, SquareDonutEnv_18, SquareDonutEnv_20
-from minigrid.envs.donutLava import LavaDonutEnv_16, LavaDonutEnv_17, LavaDonutEnv_18, LavaDonutEnv_20
-from minigrid.envs.donutLavaLong import Lava_Donut_Long_Env
-from minigrid.envs.LavaCorners import Lava_Corners
-from minigrid.envs.LavaMaze import Lava_Maze
-from minigrid.envs.AlternationRoom import Alternation_Env
-from minigrid.envs.doorkey import DoorKeyEnv
-from minigrid.envs.dynamicobstacles import DynamicObstaclesEnv
-from minigrid.envs.empty import EmptyEnv
-from minigrid.envs.fakelava import FakeLavaEnv
-from minigrid.envs.fetch import FetchEnv
-from minigrid.envs.fourrooms import FourRoomsEnv
-from minigrid.envs.gotodoor import GoToDoorEnv
-from minigrid.envs.gotoobject import GoToObjectEnv
-from minigrid.envs.keycorridor import KeyCorridorEnv
-from minigrid.envs.lavagap import LavaGapEnv
-from minigrid.envs.lockedroom import LockedRoom, LockedRoomEnv
-from minigrid.envs.Lroom import LEnv_16, LEnv_18, LEnv_20
-from minigrid.envs.Maze import Maze
-from minigrid.envs.memory import MemoryEnv
-from minigrid.envs.multiroom import MultiRoom, MultiRoomEnv
-from minigrid.envs.obstructedmaze import (
-    ObstructedMaze_1Dlhb,
-    ObstructedMaze_Full,
-    ObstructedMazeEnv,
-)
-from minigrid.envs.playground import PlaygroundEnv
-from minigrid.envs.putnear import PutNearEnv
-from minigrid.envs.redbluedoors import RedBlueDoorEnv
-from minigrid.envs.unlock import UnlockEnv
-from minigrid.envs.unlockpickup import UnlockPickupEnv
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from minigrid.envs.blockedunlockpickup import BlockedUnlockPickupEnv
+    from minigrid.envs.crossing import CrossingEnv
+    from minigrid.envs.distshift import DistShiftEnv
+    from minigrid.envs.donut import SquareDonutEnv_16, SquareDonutEnv_17, SquareDonutEnv_18, SquareDonutEnv_20
+    from minigrid.envs.donutLava import LavaDonutEnv_16, LavaDonutEnv_17, LavaDonutEnv_18, LavaDonutEnv_20
+    from minigrid.envs.donutLavaLong import Lava_Donut_Long_Env
+    from minigrid.envs.LavaCorners import Lava_Corners
+    from minigrid.envs.LavaMaze import Lava_Maze
+    from minigrid.envs.AlternationRoom import Alternation_Env
+    from minigrid.envs.doorkey import DoorKeyEnv
+    from minigrid.envs.dynamicobstacles import DynamicObstaclesEnv
+    from minigrid.envs.empty import EmptyEnv
+    from minigrid.envs.fakelava import FakeLavaEnv
+    from minigrid.envs.fetch import FetchEnv
+    from minigrid.envs.fourrooms import FourRoomsEnv
+    from minigrid.envs.gotodoor import GoToDoorEnv
+    from minigrid.envs.gotoobject import GoToObjectEnv
+    from minigrid.envs.keycorridor import KeyCorridorEnv
+    from minigrid.envs.lavagap import LavaGapEnv
+    from minigrid.envs.lockedroom import LockedRoom, LockedRoomEnv
+    from minigrid.envs.Lroom import LEnv_16, LEnv_18, LEnv_20
+    from minigrid.envs.Maze import Maze
+    from minigrid.envs.memory import MemoryEnv
+    from minigrid.envs.multiroom import MultiRoom, MultiRoomEnv
+    from minigrid.envs.obstructedmaze import (
+        ObstructedMaze_1Dlhb,
+        ObstructedMaze_Full,
+        ObstructedMazeEnv,
+    )
+    from minigrid.envs.playground import PlaygroundEnv
+    from minigrid.envs.putnear import PutNearEnv
+    from minigrid.envs.redbluedoors import RedBlueDoorEnv
+    from minigrid.envs.unlock import UnlockEnv
+    from minigrid.envs.unlockpickup import UnlockPickupEnv
+
+# Module defining each environment class. Modules are only imported when
+# one of their classes is first accessed, e.g. by `gym.make`
+_ENV_MODULES = {
+    "BlockedUnlockPickupEnv": "blockedunlockpickup",
+    "CrossingEnv": "crossing",
+    "DistShiftEnv": "distshift",
+    "SquareDonutEnv_16": "donut",
+    "SquareDonutEnv_17": "donut",
+    "SquareDonutEnv_18": "donut",
+    "SquareDonutEnv_20": "donut",
+    "LavaDonutEnv_16": "donutLava",
+    "LavaDonutEnv_17": "donutLava",
+    "LavaDonutEnv_18": "donutLava",
+    "LavaDonutEnv_20": "donutLava",
+    "Lava_Donut_Long_Env": "donutLavaLong",
+    "Lava_Corners": "LavaCorners",
+    "Lava_Maze": "LavaMaze",
+    "Alternation_Env": "AlternationRoom",
+    "DoorKeyEnv": "doorkey",
+    "DynamicObstaclesEnv": "dynamicobstacles",
+    "EmptyEnv": "empty",
+    "FakeLavaEnv": "fakelava",
+    "FetchEnv": "fetch",
+    "FourRoomsEnv": "fourrooms",
+    "GoToDoorEnv": "gotodoor",
+    "GoToObjectEnv": "gotoobject",
+    "KeyCorridorEnv": "keycorridor",
+    "LavaGapEnv": "lavagap",
+    "LockedRoom": "lockedroom",
+    "LockedRoomEnv": "lockedroom",
+    "LEnv_16": "Lroom",
+    "LEnv_18": "Lroom",
+    "LEnv_20": "Lroom",
+    "Maze": "Maze",
+    "MemoryEnv": "memory",
+    "MultiRoom": "multiroom",
+    "MultiRoomEnv": "multiroom",
+    "ObstructedMaze_1Dlhb": "obstructedmaze",
+    "ObstructedMaze_Full": "obstructedmaze",
+    "ObstructedMazeEnv": "obstructedmaze",
+    "PlaygroundEnv": "playground",
+    "PutNearEnv": "putnear",
+    "RedBlueDoorEnv": "redbluedoors",
+    "UnlockEnv": "unlock",
+    "UnlockPickupEnv": "unlockpickup",
+}
+
+__all__ = list(_ENV_MODULES)
+
+
+def __getattr__(name: str):
+    if name not in _ENV_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module = importlib.import_module(f"{__name__}.{_ENV_MODULES[name]}")
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,53 +1,118 @@
 from __future__ import annotations
 
-from minigrid.envs.babyai.goto import (
-    GoTo,
-    GoToDoor,
-    GoToImpUnlock,
-    GoToLocal,
-    GoToObj,
-    GoToObjDoor,
-    GoToRedBall,
-    GoToRedBallGrey,
-    GoToRedBallNoDists,
-    GoToRedBlueBall,
-    GoToSeq,
-)
-from minigrid.envs.babyai.open import (
-    Open,
-    OpenDoor,
-    OpenDoorsOrder,
-    OpenRedDoor,
-    OpenTwoDoors,
-)
-from minigrid.envs.babyai.other import (
-    ActionObjDoor,
-    FindObjS5,
-    KeyCorridor,
-    MoveTwoAcross,
-    OneRoomS8,
-)
-from minigrid.envs.babyai.pickup import (
-    Pickup,
-    PickupAbove,
-    PickupDist,
-    PickupLoc,
-    UnblockPickup,
-)
-from minigrid.envs.babyai.putnext import PutNext, PutNextLocal
-from minigrid.envs.babyai.synth import (
-    BossLevel,
-    BossLevelNoUnlock,
-    MiniBossLevel,
-    Synth,
-    SynthLoc,
-    SynthSeq,
-)
-from minigrid.envs.babyai.unlock import (
-    BlockedUnlockPickup,
-    KeyInBox,
-    Unlock,
-    UnlockLocal,
-    UnlockPickup,
-    UnlockToUnlock,
-)
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from minigrid.envs.babyai.goto import (
+        GoTo,
+        GoToDoor,
+        GoToImpUnlock,
+        GoToLocal,
+        GoToObj,
+        GoToObjDoor,
+        GoToRedBall,
+        GoToRedBallGrey,
+        GoToRedBallNoDists,
+        GoToRedBlueBall,
+        GoToSeq,
+    )
+    from minigrid.envs.babyai.open import (
+        Open,
+        OpenDoor,
+        OpenDoorsOrder,
+        OpenRedDoor,
+        OpenTwoDoors,
+    )
+    from minigrid.envs.babyai.other import (
+        ActionObjDoor,
+        FindObjS5,
+        KeyCorridor,
+        MoveTwoAcross,
+        OneRoomS8,
+    )
+    from minigrid.envs.babyai.pickup import (
+        Pickup,
+        PickupAbove,
+        PickupDist,
+        PickupLoc,
+        UnblockPickup,
+    )
+    from minigrid.envs.babyai.putnext import PutNext, PutNextLocal
+    from minigrid.envs.babyai.synth import (
+        BossLevel,
+        BossLevelNoUnlock,
+        MiniBossLevel,
+        Synth,
+        SynthLoc,
+        SynthSeq,
+    )
+    from minigrid.envs.babyai.unlock import (
+        BlockedUnlockPickup,
+        KeyInBox,
+        Unlock,
+        UnlockLocal,
+        UnlockPickup,
+        UnlockToUnlock,
+    )
+
+# Module defining each environment class. Modules are only imported when
+# one of their classes is first accessed, e.g. by `gym.make`
+_ENV_MODULES = {
+    "GoTo": "goto",
+    "GoToDoor": "goto",
+    "GoToImpUnlock": "goto",
+    "GoToLocal": "goto",
+    "GoToObj": "goto",
+    "GoToObjDoor": "goto",
+    "GoToRedBall": "goto",
+    "GoToRedBallGrey": "goto",
+    "GoToRedBallNoDists": "goto",
+    "GoToRedBlueBall": "goto",
+    "GoToSeq": "goto",
+    "Open": "open",
+    "OpenDoor": "open",
+    "OpenDoorsOrder": "open",
+    "OpenRedDoor": "open",
+    "OpenTwoDoors": "open",
+    "ActionObjDoor": "other",
+    "FindObjS5": "other",
+    "KeyCorridor": "other",
+    "MoveTwoAcross": "other",
+    "OneRoomS8": "other",
+    "Pickup": "pickup",
+    "PickupAbove": "pickup",
+    "PickupDist": "pickup",
+    "PickupLoc": "pickup",
+    "UnblockPickup": "pickup",
+    "PutNext": "putnext",
+    "PutNextLocal": "putnext",
+    "BossLevel": "synth",
+    "BossLevelNoUnlock": "synth",
+    "MiniBossLevel": "synth",
+    "Synth": "synth",
+    "SynthLoc": "synth",
+    "SynthSeq": "synth",
+    "BlockedUnlockPickup": "unlock",
+    "KeyInBox": "unlock",
+    "Unlock": "unlock",
+    "UnlockLocal": "unlock",
+    "UnlockPickup": "unlock",
+    "UnlockToUnlock": "unlock",
+}
+
+__all__ = list(_ENV_MODULES)
+
+
+def __getattr__(name: str):
+    if name not in _ENV_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module = importlib.import_module(f"{__name__}.{_ENV_MODULES[name]}")
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable
+
+import gymnasium as gym
+import numpy as np
+
+
+class LevelBank:
+    """
+    Levels of a BabyAI environment generated ahead of time, one record per
+    seed, stored in a .npy file which is memory-mapped when loaded.
+
+    A record holds the grid encoding, the agent start, the random number
+    generator state and the instructions of the level generated by
+    `reset(seed=seed)`, see RoomGridLevel.gen_level(). Environments created
+    with `level_bank=` load these levels instead of generating them, which
+    gives the same episodes as live generation. A bank is only valid for the
+    environment id and arguments it was generated with.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.records: np.ndarray = np.load(path, mmap_mode="r")
+        self.seeds: np.ndarray = self.records["seed"]
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __contains__(self, seed: Any) -> bool:
+        return self._index(seed) is not None
+
+    def __getitem__(self, seed: int) -> np.ndarray:
+        index = self._index(seed)
+        if index is None:
+            raise KeyError(seed)
+        return self.records[index]
+
+    def _index(self, seed: Any) -> int | None:
+        if not isinstance(seed, (int, np.integer)):
+            return None
+        index = int(np.searchsorted(self.seeds, seed))
+        if index < len(self.seeds) and self.seeds[index] == seed:
+            return index
+        return None
+
+    @classmethod
+    def generate(
+        cls,
+        env_id: str,
+        seeds: Iterable[int],
+        path: str,
+        num_workers: int | None = None,
+        chunk_size: int = 256,
+        **env_kwargs,
+    ) -> LevelBank:
+        """
+        Generate the levels of `env_id` for the given seeds over a pool of
+        processes, write them to `path` and return the loaded bank
+        """
+
+        seeds = np.unique(np.fromiter(seeds, dtype=np.int64))
+        env = gym.make(env_id, disable_env_checker=True, **env_kwargs).unwrapped
+        dtype = env.level_dtype
+
+        records = np.lib.format.open_memmap(
+            path, mode="w+", dtype=dtype, shape=(len(seeds),)
+        )
+        bounds = [*range(0, len(seeds), chunk_size), len(seeds)]
+        chunks = [seeds[start:end] for start, end in zip(bounds, bounds[1:])]
+        with ProcessPoolExecutor(num_workers) as executor:
+            start = 0
+            for data in executor.map(
+                _gen_levels, [(env_id, env_kwargs, chunk) for chunk in chunks]
+            ):
+                chunk = np.frombuffer(data, dtype=dtype)
+                end = start + len(chunk)
+                records[start:end] = chunk
+                start = end
+        records.flush()
+        del records
+
+        return cls(path)
+
+
+def _gen_levels(args: tuple[str, dict, np.ndarray]) -> bytes:
+    env_id, env_kwargs, seeds = args
+    env = gym.make(env_id, disable_env_checker=True, **env_kwargs).unwrapped
+    records = np.stack([env.gen_level(int(seed)) for seed in seeds])
+    return records.tobytes()
@@ -56,6 +56,9 @@ class LevelGen(RoomGridLevel):
         )
 
     def gen_mission(self):
+        # The locked room of the previous episode must not constrain this one
+        self.locked_room = None
+
         if self._rand_float(0, 1) < self.locked_room_prob:
             self.add_locked_room()
 
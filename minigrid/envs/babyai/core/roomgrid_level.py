@@ -3,7 +3,14 @@ Copied and adapted from https://github.com/mila-iqia/babyai
 """
 from __future__ import annotations
 
+import json
+
+import gymnasium as gym
+import numpy as np
+
+from minigrid.core.constants import OBJECT_TO_IDX
 from minigrid.core.roomgrid import RoomGrid
+from minigrid.envs.babyai.core.level_bank import LevelBank
 from minigrid.envs.babyai.core.verifier import (
     ActionInstr,
     AfterInstr,
@@ -11,8 +18,13 @@ from minigrid.envs.babyai.core.verifier import (
     BeforeInstr,
     PutNextInstr,
     SeqInstr,
+    get_verifier_state,
+    instr_from_list,
+    instr_to_list,
+    set_verifier_state,
+    verifier_state_fields,
 )
-from minigrid.minigrid_env import MissionSpace
+from minigrid.minigrid_env import MiniGridEnv, MissionSpace
 
 
 class RejectSampling(Exception):
@@ -50,7 +62,17 @@ class RoomGridLevel(RoomGrid):
     of approximately similar difficulty.
     """
 
-    def __init__(self, room_size=8, max_steps: int | None = None, **kwargs):
+    # Attributes referring to objects of the grid which are used after the
+    # level is generated, and are saved along with the level in level banks
+    level_objs: tuple[str, ...] = ()
+
+    def __init__(
+        self,
+        room_size=8,
+        max_steps: int | None = None,
+        level_bank: LevelBank | str | None = None,
+        **kwargs,
+    ):
         mission_space = BabyAIMissionSpace()
 
         # If `max_steps` arg is passed it will be fixed for every episode,
@@ -67,11 +89,27 @@ class RoomGridLevel(RoomGrid):
             **kwargs,
         )
 
+        # Pre-generated levels, loaded by reset(seed=...)
+        if isinstance(level_bank, str):
+            level_bank = LevelBank(level_bank)
+        if level_bank is not None and level_bank.records.dtype != self.level_dtype:
+            raise ValueError(
+                f"Level bank {level_bank.path} was not generated for {type(self).__name__}"
+            )
+        self.level_bank = level_bank
+        self._level_seed = None
+
+        # Ids of the objects moved since the positions tracked by the
+        # verifier were last updated, None when they are unknown
+        self._moved_objs: set[int] | None = None
+
     def reset(self, **kwargs):
+        self._level_seed = kwargs.get("seed")
         obs = super().reset(**kwargs)
 
         # Recreate the verifier
         self.instrs.reset_verifier(self)
+        self._moved_objs = set()
 
         # Compute the time step limit based on the maze size and instructions
         nav_time_room = self.room_size**2
@@ -84,8 +122,26 @@ class RoomGridLevel(RoomGrid):
         return obs
 
     def step(self, action):
+        # Only these actions move objects, either the carried one or the one
+        # in front of the agent
+        moves_objs = action in (
+            self.actions.pickup,
+            self.actions.drop,
+            self.actions.toggle,
+        )
+        if moves_objs:
+            before = (self.carrying, self.grid.get(*self.front_pos))
+
         obs, reward, terminated, truncated, info = super().step(action)
 
+        if moves_objs and self._moved_objs is not None:
+            after = (self.carrying, self.grid.get(*self.front_pos))
+            for old, new in zip(before, after):
+                if old is not new:
+                    self._moved_objs.update(
+                        id(obj) for obj in (old, new) if obj is not None
+                    )
+
         # If we drop an object, we need to update its position in the environment
         if action == self.actions.drop:
             self.update_objs_poss()
@@ -102,10 +158,23 @@ class RoomGridLevel(RoomGrid):
 
         return obs, reward, terminated, truncated, info
 
+    def _state_fields(self):
+        return super()._state_fields() + verifier_state_fields(self.width, self.height)
+
+    def _write_state(self, state):
+        super()._write_state(state)
+        get_verifier_state(self.instrs, state)
+
+    def _read_state(self, state):
+        super()._read_state(state)
+        set_verifier_state(self.instrs, state)
+        self._moved_objs = None
+
     def update_objs_poss(self, instr=None):
         if instr is None:
-            instr = self.instrs
-        if (
+            self.update_objs_poss(self.instrs)
+            self._moved_objs = set()
+        elif (
             isinstance(instr, BeforeInstr)
             or isinstance(instr, AndInstr)
             or isinstance(instr, AfterInstr)
@@ -113,9 +182,14 @@ class RoomGridLevel(RoomGrid):
             self.update_objs_poss(instr.instr_a)
             self.update_objs_poss(instr.instr_b)
         else:
-            instr.update_objs_poss()
+            instr.update_objs_poss(self._moved_objs)
 
     def _gen_grid(self, width, height):
+        seed, self._level_seed = self._level_seed, None
+        if self.level_bank is not None and seed in self.level_bank:
+            self._load_level(self.level_bank[seed])
+            return
+
         # We catch RecursionError to deal with rare cases where
         # rejection sampling gets stuck in an infinite loop
         while True:
@@ -142,6 +216,75 @@ class RoomGridLevel(RoomGrid):
         self.surface = self.instrs.surface(self)
         self.mission = self.surface
 
+    @property
+    def level_dtype(self) -> np.dtype:
+        """
+        Dtype of the records of level banks, see gen_level()
+        """
+
+        return np.dtype(
+            [
+                ("seed", np.int64),
+                ("level", "S64"),
+                *MiniGridEnv._state_fields(self),
+                ("instrs", "S1024"),
+                ("surface", "S1024"),
+                ("objs", np.int64, (len(self.level_objs), 2)),
+            ]
+        )
+
+    def gen_level(self, seed: int) -> np.ndarray:
+        """
+        Generate the level of `seed` as reset(seed=seed) does, and return it
+        as a record of a level bank
+        """
+
+        gym.Env.reset(self, seed=seed)
+        self.agent_pos = (-1, -1)
+        self.agent_dir = -1
+        self._gen_grid(self.width, self.height)
+        self.carrying = None
+        self.step_count = 0
+
+        level = np.zeros((), dtype=self.level_dtype)
+        MiniGridEnv._write_state(self, level)
+        level["seed"] = seed
+        level["level"] = self._encode_str(type(self).__name__, level.dtype["level"])
+        level["instrs"] = self._encode_str(
+            json.dumps(instr_to_list(self.instrs)), level.dtype["instrs"]
+        )
+        level["surface"] = self._encode_str(self.surface, level.dtype["surface"])
+        for k, name in enumerate(self.level_objs):
+            level["objs"][k] = getattr(self, name).cur_pos
+        return level
+
+    @staticmethod
+    def _encode_str(value: str, dtype: np.dtype) -> bytes:
+        data = value.encode()
+        if len(data) > dtype.itemsize:
+            raise ValueError(f"Cannot save {value!r} in a level bank, it is too long")
+        return data
+
+    def _load_level(self, level: np.ndarray):
+        if level["level"].decode() != type(self).__name__:
+            raise ValueError(f"Level bank was generated for {level['level'].decode()}")
+
+        # The grid of the previous episode is updated in place, as done by
+        # set_state(). Rooms are laid out the same way for every level, but
+        # their doors and objects are only kept up to date while generating.
+        if not hasattr(self, "room_grid"):
+            RoomGrid._gen_grid(self, self.width, self.height)
+        MiniGridEnv._read_state(self, level)
+
+        self.instrs = instr_from_list(json.loads(level["instrs"]))
+        self.surface = level["surface"].decode()
+        self.mission = self.surface
+
+        for name, pos in zip(self.level_objs, level["objs"].tolist()):
+            obj = self.grid.get(*pos)
+            obj.init_pos = obj.cur_pos = tuple(pos)
+            setattr(self, name, obj)
+
     def validate_instrs(self, instr):
         """
         Perform some validation on the generated instructions
@@ -246,6 +389,16 @@ class RoomGridLevel(RoomGrid):
                     if door:
                         door.is_open = True
 
+    def unreachable_objs(self) -> np.ndarray:
+        """
+        Mask of the objects (other than walls) which cannot be reached from
+        the agent's starting position without moving any other object
+        """
+
+        types = self.grid.encode()[:, :, 0]
+        objs = (types != OBJECT_TO_IDX["empty"]) & (types != OBJECT_TO_IDX["wall"])
+        return objs & ~self.grid.reachable_mask(self.agent_pos)
+
     def check_objs_reachable(self, raise_exc=True):
         """
         Check that all objects are reachable from the agent's starting
@@ -253,49 +406,12 @@ class RoomGridLevel(RoomGrid):
         (without unblocking)
         """
 
-        # Reachable positions
-        reachable = set()
-
-        # Work list
-        stack = [self.agent_pos]
-
-        while len(stack) > 0:
-            i, j = stack.pop()
-
-            if i < 0 or i >= self.grid.width or j < 0 or j >= self.grid.height:
-                continue
-
-            if (i, j) in reachable:
-                continue
-
-            # This position is reachable
-            reachable.add((i, j))
-
-            cell = self.grid.get(i, j)
-
-            # If there is something other than a door in this cell, it
-            # blocks reachability
-            if cell and cell.type != "door":
-                continue
-
-            # Visit the horizontal and vertical neighbors
-            stack.append((i + 1, j))
-            stack.append((i - 1, j))
-            stack.append((i, j + 1))
-            stack.append((i, j - 1))
-
-        # Check that all objects are reachable
-        for i in range(self.grid.width):
-            for j in range(self.grid.height):
-                cell = self.grid.get(i, j)
-
-                if not cell or cell.type == "wall":
-                    continue
-
-                if (i, j) not in reachable:
-                    if not raise_exc:
-                        return False
-                    raise RejectSampling("unreachable object at " + str((i, j)))
+        unreachable = np.argwhere(self.unreachable_objs())
+        if len(unreachable) > 0:
+            if not raise_exc:
+                return False
+            i, j = unreachable[0].tolist()
+            raise RejectSampling("unreachable object at " + str((i, j)))
 
         # All objects reachable
         return True
@@ -24,6 +24,24 @@ LOC_NAMES = ["left", "right", "front", "behind"]
 # used by the verifier
 use_done_actions = os.environ.get("BABYAI_DONE_ACTIONS", False)
 
+# Attributes of action instructions holding object descriptions
+OBJ_DESC_ATTRS = ("desc", "desc_move", "desc_fixed")
+
+# Instruction trees hold at most three sequencing instructions and four
+# action instructions, each with at most two object descriptions
+MAX_SEQ_INSTRS = 3
+MAX_ACTION_INSTRS = 4
+MAX_OBJ_DESCS = 2 * MAX_ACTION_INSTRS
+
+# Values of the progress flags of sequencing instructions
+DONE_VALUES = (False, "continue", "success", "failure", None)
+
+# Stands for a previously carried object no instruction refers to
+OTHER_OBJ = object()
+
+# Direction vectors as tuples, cheaper to add to positions than arrays
+DIR_TUPLES = [tuple(int(x) for x in vec) for vec in DIR_TO_VEC]
+
 
 def dot_product(v1, v2):
     """
@@ -112,59 +130,52 @@ class ObjDesc:
         if use_location:
             self.obj_set = []
             # otherwise we keep the same obj_set
+        else:
+            tracked = {id(obj) for obj in self.obj_set}
 
         self.obj_poss = []
 
         agent_room = env.room_from_pos(*env.agent_pos)
 
-        for i in range(env.grid.width):
-            for j in range(env.grid.height):
-                cell = env.grid.get(i, j)
-                if cell is None:
-                    continue
-
-                if not use_location:
-                    # we should keep tracking the same objects initially tracked only
-                    already_tracked = any([cell is obj for obj in self.obj_set])
-                    if not already_tracked:
-                        continue
-
-                # Check if object's type matches description
-                if self.type is not None and cell.type != self.type:
-                    continue
+        # Locations apply only to objects in the same room the agent
+        # starts in
+        use_loc = use_location and self.loc in ["left", "right", "front", "behind"]
+        if use_loc:
+            candidates = env.grid.find_objs(
+                self.type, self.color, agent_room.top, agent_room.size
+            )
+        else:
+            candidates = env.grid.find_objs(self.type, self.color)
 
-                # Check if object's color matches description
-                if self.color is not None and cell.color != self.color:
+        for (i, j), cell in candidates:
+            if not use_location:
+                # we should keep tracking the same objects initially tracked only
+                if id(cell) not in tracked:
                     continue
 
-                # Check if object's position matches description
-                if use_location and self.loc in ["left", "right", "front", "behind"]:
-                    # Locations apply only to objects in the same room
-                    # the agent starts in
-                    if not agent_room.pos_inside(i, j):
-                        continue
-
-                    # Direction from the agent to the object
-                    v = (i - env.agent_pos[0], j - env.agent_pos[1])
+            # Check if object's position matches description
+            if use_loc:
+                # Direction from the agent to the object
+                v = (i - env.agent_pos[0], j - env.agent_pos[1])
 
-                    # (d1, d2) is an oriented orthonormal basis
-                    d1 = DIR_TO_VEC[env.agent_dir]
-                    d2 = (-d1[1], d1[0])
+                # (d1, d2) is an oriented orthonormal basis
+                d1 = DIR_TO_VEC[env.agent_dir]
+                d2 = (-d1[1], d1[0])
 
-                    # Check if object's position matches with location
-                    pos_matches = {
-                        "left": dot_product(v, d2) < 0,
-                        "right": dot_product(v, d2) > 0,
-                        "front": dot_product(v, d1) > 0,
-                        "behind": dot_product(v, d1) < 0,
-                    }
+                # Check if object's position matches with location
+                pos_matches = {
+                    "left": dot_product(v, d2) < 0,
+                    "right": dot_product(v, d2) > 0,
+                    "front": dot_product(v, d1) > 0,
+                    "behind": dot_product(v, d1) < 0,
+                }
 
-                    if not (pos_matches[self.loc]):
-                        continue
+                if not (pos_matches[self.loc]):
+                    continue
 
-                if use_location:
-                    self.obj_set.append(cell)
-                self.obj_poss.append((i, j))
+            if use_location:
+                self.obj_set.append(cell)
+            self.obj_poss.append((i, j))
 
         return self.obj_set, self.obj_poss
 
@@ -202,14 +213,18 @@ class Instr(ABC):
 
         raise NotImplementedError
 
-    def update_objs_poss(self):
+    def update_objs_poss(self, moved=None):
         """
-        Update the position of objects present in the instruction if needed
+        Update the position of objects present in the instruction if needed.
+        `moved` holds the ids of the objects which may have moved since the
+        last update, only the descriptions tracking one of them are updated.
+        All of them are updated when it is None.
         """
-        potential_objects = ("desc", "desc_move", "desc_fixed")
-        for attr in potential_objects:
+        for attr in OBJ_DESC_ATTRS:
             if hasattr(self, attr):
-                getattr(self, attr).find_matching_objs(self.env, use_location=False)
+                desc = getattr(self, attr)
+                if moved is None or any(id(obj) in moved for obj in desc.obj_set):
+                    desc.find_matching_objs(self.env, use_location=False)
 
 
 class ActionInstr(Instr, ABC):
@@ -295,6 +310,10 @@ class GoToInstr(ActionInstr):
         super().__init__()
         self.desc = obj_desc
 
+        # Set of the object positions, rebuilt when they are updated
+        self._poss = None
+        self._poss_set = set()
+
     def surface(self, env):
         return "go to " + self.desc.surface(env)
 
@@ -305,11 +324,15 @@ class GoToInstr(ActionInstr):
         self.desc.find_matching_objs(env)
 
     def verify_action(self, action):
-        # For each object position
-        for pos in self.desc.obj_poss:
-            # If the agent is next to (and facing) the object
-            if np.array_equal(pos, self.env.front_pos):
-                return "success"
+        if self._poss is not self.desc.obj_poss:
+            self._poss = self.desc.obj_poss
+            self._poss_set = set(self._poss)
+
+        # If the agent is next to (and facing) one of the objects
+        x, y = self.env.agent_pos
+        dx, dy = DIR_TUPLES[self.env.agent_dir]
+        if (x + dx, y + dy) in self._poss_set:
+            return "success"
 
         return "continue"
 
@@ -564,3 +587,157 @@ class AndInstr(SeqInstr):
             return "success"
 
         return "continue"
+
+
+def instr_nodes(instr: Instr) -> tuple[list[SeqInstr], list[ActionInstr]]:
+    """
+    Sequencing and action instructions of an instruction tree, in
+    depth-first order
+    """
+
+    seq_instrs, action_instrs = [], []
+
+    def visit(node):
+        if isinstance(node, SeqInstr):
+            seq_instrs.append(node)
+            visit(node.instr_a)
+            visit(node.instr_b)
+        else:
+            action_instrs.append(node)
+
+    visit(instr)
+    return seq_instrs, action_instrs
+
+
+def verifier_state_fields(width: int, height: int) -> list[tuple]:
+    """
+    Fields of the verifier state, see MiniGridEnv.state_dtype
+    """
+
+    return [
+        ("verifier_done", np.uint8, (MAX_SEQ_INSTRS, 2)),
+        ("verifier_match", np.bool_, (MAX_ACTION_INSTRS,)),
+        # Index of the previously carried object in the first object
+        # description, -1 for none and -2 for another object
+        ("verifier_carrying", np.int8, (MAX_ACTION_INSTRS,)),
+        ("verifier_poss", np.bool_, (MAX_OBJ_DESCS, width, height)),
+    ]
+
+
+def _obj_descs(action_instrs: list[ActionInstr]) -> list[ObjDesc]:
+    return [
+        getattr(instr, attr)
+        for instr in action_instrs
+        for attr in OBJ_DESC_ATTRS
+        if hasattr(instr, attr)
+    ]
+
+
+def get_verifier_state(instr: Instr, state: np.ndarray):
+    """
+    Write the progress of the verification of an instruction into a state
+    """
+
+    seq_instrs, action_instrs = instr_nodes(instr)
+    descs = _obj_descs(action_instrs)
+    if len(seq_instrs) > MAX_SEQ_INSTRS or len(action_instrs) > MAX_ACTION_INSTRS:
+        raise ValueError(f"Instruction tree is too large to be saved: {instr}")
+
+    for k, seq_instr in enumerate(seq_instrs):
+        state["verifier_done"][k] = (
+            DONE_VALUES.index(seq_instr.a_done),
+            DONE_VALUES.index(seq_instr.b_done),
+        )
+
+    for k, action_instr in enumerate(action_instrs):
+        state["verifier_match"][k] = action_instr.lastStepMatch
+
+        pre_carrying = getattr(action_instr, "preCarrying", None)
+        if pre_carrying is None:
+            state["verifier_carrying"][k] = -1
+        else:
+            obj_set = _obj_descs([action_instr])[0].obj_set
+            index = [i for i, obj in enumerate(obj_set) if obj is pre_carrying]
+            state["verifier_carrying"][k] = index[0] if index else -2
+
+    for k, desc in enumerate(descs):
+        if desc.obj_poss:
+            xs, ys = zip(*desc.obj_poss)
+            state["verifier_poss"][k][xs, ys] = True
+
+
+def set_verifier_state(instr: Instr, state: np.ndarray):
+    """
+    Restore the progress of the verification of an instruction, the
+    objects tracked by the instruction being kept
+    """
+
+    seq_instrs, action_instrs = instr_nodes(instr)
+
+    for k, seq_instr in enumerate(seq_instrs):
+        a_done, b_done = state["verifier_done"][k]
+        seq_instr.a_done = DONE_VALUES[a_done]
+        seq_instr.b_done = DONE_VALUES[b_done]
+
+    for k, action_instr in enumerate(action_instrs):
+        action_instr.lastStepMatch = bool(state["verifier_match"][k])
+
+        if hasattr(action_instr, "preCarrying"):
+            index = int(state["verifier_carrying"][k])
+            if index == -1:
+                action_instr.preCarrying = None
+            elif index == -2:
+                action_instr.preCarrying = OTHER_OBJ
+            else:
+                obj_set = _obj_descs([action_instr])[0].obj_set
+                action_instr.preCarrying = obj_set[index]
+
+    for k, desc in enumerate(_obj_descs(action_instrs)):
+        xs, ys = np.nonzero(state["verifier_poss"][k])
+        desc.obj_poss = list(zip(xs.tolist(), ys.tolist()))
+
+
+def instr_to_list(instr: Instr) -> list:
+    """
+    Plain list representation of an instruction tree, which can be saved
+    as JSON. Object descriptions are stored as [type, color, loc].
+    """
+
+    if isinstance(instr, SeqInstr):
+        args = [instr_to_list(instr.instr_a), instr_to_list(instr.instr_b)]
+    else:
+        args = [[desc.type, desc.color, desc.loc] for desc in _obj_descs([instr])]
+
+    return [type(instr).__name__, args, getattr(instr, "strict", None)]
+
+
+def instr_from_list(data: list) -> Instr:
+    """
+    Rebuild an instruction tree from instr_to_list()
+    """
+
+    name, args, strict = data
+    cls = INSTR_CLASSES[name]
+
+    if issubclass(cls, SeqInstr):
+        args = [instr_from_list(arg) for arg in args]
+    else:
+        args = [ObjDesc(*arg) for arg in args]
+
+    if strict is None:
+        return cls(*args)
+    return cls(*args, strict=strict)
+
+
+INSTR_CLASSES = {
+    cls.__name__: cls
+    for cls in [
+        OpenInstr,
+        GoToInstr,
+        PickupInstr,
+        PutNextInstr,
+        BeforeInstr,
+        AfterInstr,
+        AndInstr,
+    ]
+}
@@ -27,6 +27,8 @@ class GoToRedBallGrey(RoomGridLevel):
 
         for dist in dists:
             dist.color = "grey"
+            # Re-set the object so that the grid encoding picks up the new color
+            self.grid.set(*dist.cur_pos, dist)
 
         # Make sure no unblocking is required
         self.check_objs_reachable()
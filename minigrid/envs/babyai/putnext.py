@@ -36,6 +36,8 @@ class PutNext(RoomGridLevel):
     instructions.
     """
 
+    level_objs = ("obj_a",)
+
     def __init__(
         self,
         room_size,
@@ -52,7 +52,7 @@ class Square_Donut_Env(MiniGridEnv):
     def _gen_mission():
         return "just fool around buddy"
 
-    def _gen_grid(self, width, height):
+    def _gen_static_grid(self, width, height):
         # Create an empty grid
         self.grid = Grid(width, height)
         
@@ -72,9 +72,8 @@ class Square_Donut_Env(MiniGridEnv):
         # for i in range(int(height/2)-y_diam,int(height/2)+y_diam):
         for i in range(int(height/2)-3,int(height/2)+4):
             self.grid.horz_wall(int(self.Lwidth/2), i, length=x_diam)
-        
 
-        
+    def _gen_grid(self, width, height):
         # Place the agent
         if self.agent_start_pos is not None:
             self.agent_pos = self.agent_start_pos
@@ -7,17 +7,18 @@ from scipy.spatial.distance import cityblock
 from minigrid.core.grid import Grid
 from minigrid.core.mission import MissionSpace
 from minigrid.core.world_object import Floor, Gates, Lava, Fake_Lava
-from minigrid.minigrid_env import MiniGridEnv
+from minigrid.minigrid_env import MiniGridEnv, vectorized_reject_fn
 from minigrid.core.constants import PATTERNS, IDX_TO_COLOR
 
 
+@vectorized_reject_fn
 def reject_lava_rooms(env, pos):
     """
     Function to filter out object positions that are in the lava rooms
     """
     x, y = pos
-    valid = x <= env.Lwidth/2 or y <= int(env.grid.height/2)-3 or x>= env.Lwidth/2 + 6 or y >= int(env.grid.height/2)+3
-    return (not valid)
+    valid = (x <= env.Lwidth/2) | (y <= int(env.grid.height/2)-3) | (x >= env.Lwidth/2 + 6) | (y >= int(env.grid.height/2)+3)
+    return np.logical_not(valid)
 
 class Lava_Donut_Env(MiniGridEnv):
 
@@ -65,7 +66,7 @@ class Lava_Donut_Env(MiniGridEnv):
     def _gen_mission():
         return "avoid the real lava and get to the fake lava square"
 
-    def _gen_grid(self, width, height):
+    def _gen_static_grid(self, width, height):
         # Create an empty grid
         self.grid = Grid(width, height)
         
@@ -128,7 +129,8 @@ class Lava_Donut_Env(MiniGridEnv):
         # self.put_obj(Lava(), int(self.Lwidth/2)+4, int(height/2))
         self.put_obj(Fake_Lava(), self.target_pos[0], self.target_pos[1])
         self.put_obj(Lava(), self.lava_pos[0], self.lava_pos[1])
-        
+
+    def _gen_grid(self, width, height):
         # Place the agent
         if self.agent_start_pos is not None:
             self.agent_pos = self.agent_start_pos
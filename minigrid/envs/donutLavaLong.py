@@ -5,17 +5,18 @@ from gymnasium import spaces
 from minigrid.core.grid import Grid
 from minigrid.core.mission import MissionSpace
 from minigrid.core.world_object import Floor, Gates, Lava, Fake_Lava
-from minigrid.minigrid_env import MiniGridEnv
+from minigrid.minigrid_env import MiniGridEnv, vectorized_reject_fn
 from minigrid.core.constants import PATTERNS, IDX_TO_COLOR
 
 
+@vectorized_reject_fn
 def reject_lava_rooms(env, pos):
     """
     Function to filter out object positions that are in the lava rooms
     """
     x, y = pos
-    valid = x <= int(env.width/2)-4 or y <= int(env.height/2)-2 or x>= int(env.width/2)+4 or y >= int(env.grid.height/2)+2
-    return (not valid)
+    valid = (x <= int(env.width/2)-4) | (y <= int(env.height/2)-2) | (x >= int(env.width/2)+4) | (y >= int(env.grid.height/2)+2)
+    return np.logical_not(valid)
 
 class Lava_Donut_Long_Env(MiniGridEnv):
 
@@ -44,7 +45,6 @@ class Lava_Donut_Long_Env(MiniGridEnv):
         self.shuffle_indices = [0,1,2]
         self.order = order
         self.neg=neg
-        self.regenerate=True
         self.targets = targets
         
         mission_space = MissionSpace(mission_func=self._gen_mission)
@@ -64,98 +64,85 @@ class Lava_Donut_Long_Env(MiniGridEnv):
     def _gen_mission():
         return "avoid the real lava and get to the fake lava square"
 
-    def _gen_grid(self, width, height):
-        if self.regenerate:
-            # Create an empty grid
-            self.grid = Grid(width, height)
-            
-            # Generate the surrounding walls
-            #Consider: walls at -1, rather than 0
-            self.grid.horz_wall(0,0)
-            self.grid.vert_wall(0,0)
-            self.grid.horz_wall(0,height-1)
-            self.grid.vert_wall(width-1,0)
-
-            loc = [(width/3-4,height/3-4), (2*width/3-1,height/3-1), (width/3-3,2*height/3-2), (2*width/3-2,2*height/3-2)]
-
-            shapes = {}
-
-            shapes['T'] = {'name': 'triangle', 'color': self.tri_color}
-            shapes['P'] = {'name': 'plus', 'color': self.plus_color}
-            shapes['X'] = {'name': 'x', 'color': self.x_color}
-            shapes['D'] = {'name': 'dash', 'color': self.tri_color}
-
-            # Create dictionary 
-
-            for idx, char in enumerate(self.order):
-                self.place_shape(shapes[char]['name'], loc[idx], shapes[char]['color'])
-
-            #Adding shapes on the bottom and top of the map
-            self.place_shape('plus', (width/3-1,height/3-5), self.x_color)
-            self.place_shape('plus', (width/3,height/3-5), self.x_color)
-            self.place_shape('plus', (width/3+1,height/3-5), self.x_color)
-            self.place_shape('plus', (width/3+2,height/3-5), self.x_color)
-            self.place_shape('plus', (width/3-3,height/3+4), self.plus_color)
-            self.place_shape('plus', (width/3-2,height/3+4), self.plus_color)
-            self.place_shape('plus', (width/3-1,height/3+4), self.plus_color)
-            self.place_shape('plus', (width/3,height/3+4), self.plus_color)
-
-            #Adding the central rooms
-            self.grid.horz_wall(int(self.width/2)-4, int(height/2)-2, length=9)
-            self.grid.horz_wall(int(self.width/2)-4, int(height/2)+2, length=9)
-            self.grid.vert_wall(int(self.width/2)-4, int(height/2)-2, length=5)
-            self.grid.vert_wall(int(self.width/2), int(height/2)-2, length=5)
-            self.grid.vert_wall(int(self.width/2)+4, int(height/2)-2, length=5)
-
-            self.grid.set(int(self.width/2)+1, int(height/2)-2, Gates())
-            self.grid.set(int(self.width/2)+2, int(height/2)-2, Gates())
-            self.grid.set(int(self.width/2)+3, int(height/2)-2, Gates())
-            self.grid.set(int(self.width/2)+1, int(height/2)+2, Gates())
-            self.grid.set(int(self.width/2)+2, int(height/2)+2, Gates())
-            self.grid.set(int(self.width/2)+3, int(height/2)+2, Gates())
-            self.grid.set(int(self.width/2)-1, int(height/2)-2, Gates())
-            self.grid.set(int(self.width/2)-2, int(height/2)-2, Gates())
-            self.grid.set(int(self.width/2)-3, int(height/2)-2, Gates())
-            self.grid.set(int(self.width/2)-1, int(height/2)+2, Gates())
-            self.grid.set(int(self.width/2)-2, int(height/2)+2, Gates())
-            self.grid.set(int(self.width/2)-3, int(height/2)+2, Gates())
-            self.grid.set(int(self.width/2), int(height/2)-1, Gates())
-            self.grid.set(int(self.width/2), int(height/2), Gates())
-            self.grid.set(int(self.width/2), int(height/2)+1, Gates())
-            self.grid.set(int(self.width/2)+4, int(height/2)-1, Gates())
-            self.grid.set(int(self.width/2)+4, int(height/2), Gates())
-            self.grid.set(int(self.width/2)+4, int(height/2)+1, Gates())
-            self.grid.set(int(self.width/2)-4, int(height/2)-1, Gates())
-            self.grid.set(int(self.width/2)-4, int(height/2), Gates())
-            self.grid.set(int(self.width/2)-4, int(height/2)+1, Gates())
-
-            # Place lava
-            self.target_pos = (int(self.width/2)-2, int(height/2))
-            self.put_obj(Fake_Lava(), *self.target_pos)
-            self.put_obj(Lava(), int(self.width/2)+2, int(height/2))
-            
-            # Place the agent
-            if self.agent_start_pos is not None:
-                self.agent_pos = self.agent_start_pos
-                self.agent_dir = self.agent_start_dir
-            else:
-                self.agent_pos = (-1, -1)
-                pos = self.place_obj(None, reject_fn=reject_lava_rooms)
-                self.agent_pos = pos
-                self.agent_dir = self._rand_int(0, 4)
-            
-            self.regenerate=False
+    def _gen_static_grid(self, width, height):
+        # Create an empty grid
+        self.grid = Grid(width, height)
+        
+        # Generate the surrounding walls
+        #Consider: walls at -1, rather than 0
+        self.grid.horz_wall(0,0)
+        self.grid.vert_wall(0,0)
+        self.grid.horz_wall(0,height-1)
+        self.grid.vert_wall(width-1,0)
+
+        loc = [(width/3-4,height/3-4), (2*width/3-1,height/3-1), (width/3-3,2*height/3-2), (2*width/3-2,2*height/3-2)]
+
+        shapes = {}
+
+        shapes['T'] = {'name': 'triangle', 'color': self.tri_color}
+        shapes['P'] = {'name': 'plus', 'color': self.plus_color}
+        shapes['X'] = {'name': 'x', 'color': self.x_color}
+        shapes['D'] = {'name': 'dash', 'color': self.tri_color}
+
+        # Create dictionary 
+
+        for idx, char in enumerate(self.order):
+            self.place_shape(shapes[char]['name'], loc[idx], shapes[char]['color'])
+
+        #Adding shapes on the bottom and top of the map
+        self.place_shape('plus', (width/3-1,height/3-5), self.x_color)
+        self.place_shape('plus', (width/3,height/3-5), self.x_color)
+        self.place_shape('plus', (width/3+1,height/3-5), self.x_color)
+        self.place_shape('plus', (width/3+2,height/3-5), self.x_color)
+        self.place_shape('plus', (width/3-3,height/3+4), self.plus_color)
+        self.place_shape('plus', (width/3-2,height/3+4), self.plus_color)
+        self.place_shape('plus', (width/3-1,height/3+4), self.plus_color)
+        self.place_shape('plus', (width/3,height/3+4), self.plus_color)
+
+        #Adding the central rooms
+        self.grid.horz_wall(int(self.width/2)-4, int(height/2)-2, length=9)
+        self.grid.horz_wall(int(self.width/2)-4, int(height/2)+2, length=9)
+        self.grid.vert_wall(int(self.width/2)-4, int(height/2)-2, length=5)
+        self.grid.vert_wall(int(self.width/2), int(height/2)-2, length=5)
+        self.grid.vert_wall(int(self.width/2)+4, int(height/2)-2, length=5)
+
+        self.grid.set(int(self.width/2)+1, int(height/2)-2, Gates())
+        self.grid.set(int(self.width/2)+2, int(height/2)-2, Gates())
+        self.grid.set(int(self.width/2)+3, int(height/2)-2, Gates())
+        self.grid.set(int(self.width/2)+1, int(height/2)+2, Gates())
+        self.grid.set(int(self.width/2)+2, int(height/2)+2, Gates())
+        self.grid.set(int(self.width/2)+3, int(height/2)+2, Gates())
+        self.grid.set(int(self.width/2)-1, int(height/2)-2, Gates())
+        self.grid.set(int(self.width/2)-2, int(height/2)-2, Gates())
+        self.grid.set(int(self.width/2)-3, int(height/2)-2, Gates())
+        self.grid.set(int(self.width/2)-1, int(height/2)+2, Gates())
+        self.grid.set(int(self.width/2)-2, int(height/2)+2, Gates())
+        self.grid.set(int(self.width/2)-3, int(height/2)+2, Gates())
+        self.grid.set(int(self.width/2), int(height/2)-1, Gates())
+        self.grid.set(int(self.width/2), int(height/2), Gates())
+        self.grid.set(int(self.width/2), int(height/2)+1, Gates())
+        self.grid.set(int(self.width/2)+4, int(height/2)-1, Gates())
+        self.grid.set(int(self.width/2)+4, int(height/2), Gates())
+        self.grid.set(int(self.width/2)+4, int(height/2)+1, Gates())
+        self.grid.set(int(self.width/2)-4, int(height/2)-1, Gates())
+        self.grid.set(int(self.width/2)-4, int(height/2), Gates())
+        self.grid.set(int(self.width/2)-4, int(height/2)+1, Gates())
+
+        # Place lava
+        self.target_pos = (int(self.width/2)-2, int(height/2))
+        self.put_obj(Fake_Lava(), *self.target_pos)
+        self.put_obj(Lava(), int(self.width/2)+2, int(height/2))
 
+    def _gen_grid(self, width, height):
+        # Place the agent
+        if self.agent_start_pos is not None:
+            self.agent_pos = self.agent_start_pos
+            self.agent_dir = self.agent_start_dir
         else:
-            # Place the agent
-            if self.agent_start_pos is not None:
-                self.agent_pos = self.agent_start_pos
-                self.agent_dir = self.agent_start_dir
-            else:
-                self.agent_pos = (-1, -1)
-                pos = self.place_obj(None, reject_fn=reject_lava_rooms)
-                self.agent_pos = pos
-                self.agent_dir = self._rand_int(0, 4)
+            self.agent_pos = (-1, -1)
+            pos = self.place_obj(None, reject_fn=reject_lava_rooms)
+            self.agent_pos = pos
+            self.agent_dir = self._rand_int(0, 4)
 
     
     def step(self, action):
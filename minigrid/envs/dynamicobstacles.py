@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from operator import add
 
+import numpy as np
 from gymnasium.spaces import Discrete
 
 from minigrid.core.grid import Grid
@@ -133,6 +134,19 @@ class DynamicObstaclesEnv(MiniGridEnv):
 
         self.mission = "get to the green goal square"
 
+    def _state_fields(self):
+        return super()._state_fields() + [
+            ("obstacles", np.int64, (self.n_obstacles, 2))
+        ]
+
+    def _write_state(self, state):
+        super()._write_state(state)
+        state["obstacles"] = [obst.cur_pos for obst in self.obstacles]
+
+    def _read_state(self, state):
+        super()._read_state(state)
+        self.obstacles = [self.grid.get(*pos) for pos in state["obstacles"].tolist()]
+
     def step(self, action):
         # Invalid action
         if action >= self.action_space.n:
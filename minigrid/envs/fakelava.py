@@ -6,7 +6,7 @@ from gymnasium import spaces
 from minigrid.core.grid import Grid
 from minigrid.core.mission import MissionSpace
 from minigrid.core.world_object import Gates, Lava, Fake_Lava, Floor, FloorCustom, WallCustom
-from minigrid.minigrid_env import MiniGridEnv
+from minigrid.minigrid_env import MiniGridEnv, vectorized_reject_fn
 from minigrid.core.constants import PATTERNS, IDX_TO_COLOR
 
 patterns = [
@@ -20,23 +20,25 @@ patterns = [
 gen = np.random.default_rng(seed=42)
 wall_colors = gen.choice(100, (500,3))
 
+@vectorized_reject_fn
 def reject_nonmarked_rooms(env: MiniGridEnv, pos: tuple[int, int]):
     """
     Function to filter out object positions that are not in the unique rooms
     """
     x, y = pos
-    marked = x <= env.roomsize or y <= env.roomsize or x>= (env.width - env.roomsize - 1) or y >= (env.height - env.roomsize - 1)
-    return (not marked)
+    marked = (x <= env.roomsize) | (y <= env.roomsize) | (x >= (env.width - env.roomsize - 1)) | (y >= (env.height - env.roomsize - 1))
+    return np.logical_not(marked)
 
 
+@vectorized_reject_fn
 def reject_nontarget_rooms(env: MiniGridEnv, pos: tuple[int, int]):
     """
     Function to filter out object positions that are not in the unique rooms
     """
     x, y = pos
     xt, yt = env.goalpos
-    target = x <= (xt + env.halfsize) and y <= (yt + env.halfsize) and x >= (xt - env.halfsize) and y >= (yt - env.halfsize)
-    return (not target)
+    target = (x <= (xt + env.halfsize)) & (y <= (yt + env.halfsize)) & (x >= (xt - env.halfsize)) & (y >= (yt - env.halfsize))
+    return np.logical_not(target)
 
 
 class FakeLavaEnv(MiniGridEnv):
@@ -114,7 +116,6 @@ class FakeLavaEnv(MiniGridEnv):
         self.targetstart = target_start
         self.gates = gates
         self.neg = neg
-        self.regenerate=True
 
 
         randgen = np.random.default_rng(seed=seed)
@@ -146,197 +147,180 @@ class FakeLavaEnv(MiniGridEnv):
     def _gen_mission():
         return "avoid the real lava and get to the fake lava square"
 
-    def _gen_grid(self, width, height):
-        if self.regenerate:
-            assert width >= 17 and height >= 13
-
-            # Create an empty grid
-            self.grid = Grid(width, height)
-
-            # Generate rooms
+    def _gen_static_grid(self, width, height):
+        assert width >= 17 and height >= 13
+
+        # Create an empty grid
+        self.grid = Grid(width, height)
+
+        # Generate rooms
+        for i in range(self.roomsh-2):
+            for j in range(self.roomsv-2):
+                self.grid.wall_rect(
+                                    (i+1)*(self.roomsize+1),
+                                    (j+1)*(self.roomsize+1),
+                                    self.roomsize+2,
+                                    self.roomsize+2,
+                                    # Gates
+                                    )
+        # for i in range(self.roomsh):
+        #     for j in range(self.roomsv):
+        #         self.grid.wall_rect(
+        #                             i*(self.roomsize+1),
+        #                             j*(self.roomsize+1),
+        #                             self.roomsize+2,
+        #                             self.roomsize+2,
+        #                             # Gates
+        #                             )
+
+        # Generate the surrounding walls
+        # self.grid.wall_rect(0, 0, width, height, WallCustom, wall_colors)
+        self.grid.wall_rect(0, 0, width, height)
+        self.grid.set(1,1,WallCustom(add=wall_colors[1]))
+
+        # Generate gates
+        if self.gates:
+            for i in range(self.roomsh-2):
+                for j in range(self.roomsv-2):
+                    self.grid.set((i+1)*(self.roomsize+1), (j+1)*(self.roomsize+1)+self.halfsize-1, Gates())
+                    self.grid.set((i+1)*(self.roomsize+1), (j+1)*(self.roomsize+1)+self.halfsize, Gates())
+                    self.grid.set((i+1)*(self.roomsize+1), (j+1)*(self.roomsize+1)+self.halfsize+1, Gates())
+                    self.grid.set((i+2)*(self.roomsize+1), (j+1)*(self.roomsize+1)+self.halfsize-1, Gates())
+                    self.grid.set((i+2)*(self.roomsize+1), (j+1)*(self.roomsize+1)+self.halfsize, Gates())
+                    self.grid.set((i+2)*(self.roomsize+1), (j+1)*(self.roomsize+1)+self.halfsize+1, Gates())
+                    self.grid.set((i+1)*(self.roomsize+1)+self.halfsize-1, (j+1)*(self.roomsize+1), Gates())
+                    self.grid.set((i+1)*(self.roomsize+1)+self.halfsize, (j+1)*(self.roomsize+1), Gates())
+                    self.grid.set((i+1)*(self.roomsize+1)+self.halfsize+1, (j+1)*(self.roomsize+1), Gates())
+                    self.grid.set((i+1)*(self.roomsize+1)+self.halfsize-1, (j+2)*(self.roomsize+1), Gates())
+                    self.grid.set((i+1)*(self.roomsize+1)+self.halfsize, (j+2)*(self.roomsize+1), Gates())
+                    self.grid.set((i+1)*(self.roomsize+1)+self.halfsize+1, (j+2)*(self.roomsize+1), Gates())
+        # for i in range(self.roomsh-1):
+        #     self.grid.set((i+1)*(self.roomsize+1), height-self.halfsize, Gates())
+        #     self.grid.set((i+1)*(self.roomsize+1), height-self.halfsize-1, Gates())
+        #     self.grid.set((i+1)*(self.roomsize+1), height-self.halfsize-2, Gates())
+        #     for j in range(self.roomsv-1):
+        #         self.grid.set((i+1)*(self.roomsize+1), (j+1)*(self.roomsize+1)-self.halfsize-1, Gates())
+        #         self.grid.set((i+1)*(self.roomsize+1), (j+1)*(self.roomsize+1)-self.halfsize, Gates())
+        #         self.grid.set((i+1)*(self.roomsize+1), (j+1)*(self.roomsize+1)-self.halfsize+1, Gates())
+        #         self.grid.set((i+1)*(self.roomsize+1)-self.halfsize-1, (j+1)*(self.roomsize+1), Gates())
+        #         self.grid.set((i+1)*(self.roomsize+1)-self.halfsize, (j+1)*(self.roomsize+1), Gates())
+        #         self.grid.set((i+1)*(self.roomsize+1)-self.halfsize+1, (j+1)*(self.roomsize+1), Gates())
+        # for j in range(self.roomsv-1):
+        #     self.grid.set(width-self.halfsize, (j+1)*(self.roomsize+1), Gates())
+        #     self.grid.set(width-self.halfsize-1, (j+1)*(self.roomsize+1), Gates())
+        #     self.grid.set(width-self.halfsize-2, (j+1)*(self.roomsize+1), Gates())
+
+        # Place lava
+        if self.roomsv<5:
+            self.goalpos = None
             for i in range(self.roomsh-2):
                 for j in range(self.roomsv-2):
-                    self.grid.wall_rect(
-                                        (i+1)*(self.roomsize+1),
-                                        (j+1)*(self.roomsize+1),
-                                        self.roomsize+2,
-                                        self.roomsize+2,
-                                        # Gates
-                                        )
-            # for i in range(self.roomsh):
-            #     for j in range(self.roomsv):
-            #         self.grid.wall_rect(
-            #                             i*(self.roomsize+1),
-            #                             j*(self.roomsize+1),
-            #                             self.roomsize+2,
-            #                             self.roomsize+2,
-            #                             # Gates
-            #                             )
-
-            # Generate the surrounding walls
-            # self.grid.wall_rect(0, 0, width, height, WallCustom, wall_colors)
-            self.grid.wall_rect(0, 0, width, height)
-            self.grid.set(1,1,WallCustom(add=wall_colors[1]))
-
-            # Generate gates
-            if self.gates:
-                for i in range(self.roomsh-2):
-                    for j in range(self.roomsv-2):
-                        self.grid.set((i+1)*(self.roomsize+1), (j+1)*(self.roomsize+1)+self.halfsize-1, Gates())
-                        self.grid.set((i+1)*(self.roomsize+1), (j+1)*(self.roomsize+1)+self.halfsize, Gates())
-                        self.grid.set((i+1)*(self.roomsize+1), (j+1)*(self.roomsize+1)+self.halfsize+1, Gates())
-                        self.grid.set((i+2)*(self.roomsize+1), (j+1)*(self.roomsize+1)+self.halfsize-1, Gates())
-                        self.grid.set((i+2)*(self.roomsize+1), (j+1)*(self.roomsize+1)+self.halfsize, Gates())
-                        self.grid.set((i+2)*(self.roomsize+1), (j+1)*(self.roomsize+1)+self.halfsize+1, Gates())
-                        self.grid.set((i+1)*(self.roomsize+1)+self.halfsize-1, (j+1)*(self.roomsize+1), Gates())
-                        self.grid.set((i+1)*(self.roomsize+1)+self.halfsize, (j+1)*(self.roomsize+1), Gates())
-                        self.grid.set((i+1)*(self.roomsize+1)+self.halfsize+1, (j+1)*(self.roomsize+1), Gates())
-                        self.grid.set((i+1)*(self.roomsize+1)+self.halfsize-1, (j+2)*(self.roomsize+1), Gates())
-                        self.grid.set((i+1)*(self.roomsize+1)+self.halfsize, (j+2)*(self.roomsize+1), Gates())
-                        self.grid.set((i+1)*(self.roomsize+1)+self.halfsize+1, (j+2)*(self.roomsize+1), Gates())
-            # for i in range(self.roomsh-1):
-            #     self.grid.set((i+1)*(self.roomsize+1), height-self.halfsize, Gates())
-            #     self.grid.set((i+1)*(self.roomsize+1), height-self.halfsize-1, Gates())
-            #     self.grid.set((i+1)*(self.roomsize+1), height-self.halfsize-2, Gates())
-            #     for j in range(self.roomsv-1):
-            #         self.grid.set((i+1)*(self.roomsize+1), (j+1)*(self.roomsize+1)-self.halfsize-1, Gates())
-            #         self.grid.set((i+1)*(self.roomsize+1), (j+1)*(self.roomsize+1)-self.halfsize, Gates())
-            #         self.grid.set((i+1)*(self.roomsize+1), (j+1)*(self.roomsize+1)-self.halfsize+1, Gates())
-            #         self.grid.set((i+1)*(self.roomsize+1)-self.halfsize-1, (j+1)*(self.roomsize+1), Gates())
-            #         self.grid.set((i+1)*(self.roomsize+1)-self.halfsize, (j+1)*(self.roomsize+1), Gates())
-            #         self.grid.set((i+1)*(self.roomsize+1)-self.halfsize+1, (j+1)*(self.roomsize+1), Gates())
-            # for j in range(self.roomsv-1):
-            #     self.grid.set(width-self.halfsize, (j+1)*(self.roomsize+1), Gates())
-            #     self.grid.set(width-self.halfsize-1, (j+1)*(self.roomsize+1), Gates())
-            #     self.grid.set(width-self.halfsize-2, (j+1)*(self.roomsize+1), Gates())
-
-            # Place lava
-            if self.roomsv<5:
-                self.goalpos = None
-                for i in range(self.roomsh-2):
-                    for j in range(self.roomsv-2):
-                        pos = ((i+1)*(self.roomsize+1)+self.halfsize, (j+1)*(self.roomsize+1)+self.halfsize)
-                        if not self.goalpos:
-                            obj = Fake_Lava()
-                            self.goalpos = pos
-                        else:
-                            obj = Lava()
-                        self.put_obj(obj, *pos)
-
-            # Place the agent
-            if self.targetstart:
-                self.agent_pos = (-1, -1)
-                pos = self.place_obj(None, reject_fn=reject_nontarget_rooms)
-                self.agent_pos = pos
-                self.agent_dir = self._rand_int(0, 4)
-
-            else:
-                self.agent_pos = (-1, -1)
-                pos = self.place_obj(None, reject_fn=reject_nonmarked_rooms)
-                self.agent_pos = pos
-                self.agent_dir = self._rand_int(0, 4)
-
-            # Generate marks
-            for y in range(1,5):
-                self.put_obj(Floor('blue'), 1, y)
-            for y in range(1,6):
-                self.put_obj(Floor('blue'), 2, y)
-            for y in range(1,7):
-                self.put_obj(Floor('blue'), 3, y)
+                    pos = ((i+1)*(self.roomsize+1)+self.halfsize, (j+1)*(self.roomsize+1)+self.halfsize)
+                    if not self.goalpos:
+                        obj = Fake_Lava()
+                        self.goalpos = pos
+                    else:
+                        obj = Lava()
+                    self.put_obj(obj, *pos)
+
+        # Generate marks
+        for y in range(1,5):
+            self.put_obj(Floor('blue'), 1, y)
+        for y in range(1,6):
+            self.put_obj(Floor('blue'), 2, y)
+        for y in range(1,7):
+            self.put_obj(Floor('blue'), 3, y)
+        for y in range(self.height-5,self.height-2):
+            self.put_obj(Floor('yellow'), 2, y)
+        for y in range(self.height-10,self.height-6):
+            self.put_obj(Floor('yellow'), 3, y)
+        for x in range(self.width-self.roomsize-6,self.width-self.roomsize-1):
+            self.put_obj(Floor('yellow'), x, 1)
+        for x in range(self.width-self.roomsize-6,self.width-self.roomsize-1):
+            self.put_obj(Floor('yellow'), x, 2)
+        for x in range(self.width-self.roomsize-6,self.width-self.roomsize-1):
+            self.put_obj(Floor('yellow'), x, 3)
+        for x in range(self.width-4,self.width-1):
+            self.put_obj(Floor('red'), x, self.roomsize+2)
+        for x in range(self.width-4,self.width-1):
+            self.put_obj(Floor('red'), x, self.roomsize+3)
+        for x in range(self.width-self.roomsize-10,self.width-self.roomsize-5):
+            self.put_obj(Floor('red'), x, self.height-3)
+        for x in range(self.width-self.roomsize-10,self.width-self.roomsize-5):
+            self.put_obj(Floor('red'), x, self.height-4)
+        for x in range(self.width-self.roomsize-10,self.width-self.roomsize-5):
+            self.put_obj(Floor('red'), x, self.height-5)
+        for x in range(self.width-5,self.width-2):
             for y in range(self.height-5,self.height-2):
-                self.put_obj(Floor('yellow'), 2, y)
-            for y in range(self.height-10,self.height-6):
-                self.put_obj(Floor('yellow'), 3, y)
-            for x in range(self.width-self.roomsize-6,self.width-self.roomsize-1):
-                self.put_obj(Floor('yellow'), x, 1)
-            for x in range(self.width-self.roomsize-6,self.width-self.roomsize-1):
-                self.put_obj(Floor('yellow'), x, 2)
-            for x in range(self.width-self.roomsize-6,self.width-self.roomsize-1):
-                self.put_obj(Floor('yellow'), x, 3)
-            for x in range(self.width-4,self.width-1):
-                self.put_obj(Floor('red'), x, self.roomsize+2)
-            for x in range(self.width-4,self.width-1):
-                self.put_obj(Floor('red'), x, self.roomsize+3)
-            for x in range(self.width-self.roomsize-10,self.width-self.roomsize-5):
-                self.put_obj(Floor('red'), x, self.height-3)
-            for x in range(self.width-self.roomsize-10,self.width-self.roomsize-5):
-                self.put_obj(Floor('red'), x, self.height-4)
-            for x in range(self.width-self.roomsize-10,self.width-self.roomsize-5):
-                self.put_obj(Floor('red'), x, self.height-5)
-            for x in range(self.width-5,self.width-2):
-                for y in range(self.height-5,self.height-2):
-                    self.put_obj(Floor('blue'), x, y)
-                
-            # n=0
-            # for i in range(self.roomsh):
-            #     for j in range(self.roomsv):
-            #         n_shape = self.marks[n]//5
-            #         n_color = self.marks[n]%5
-            #         if i==0:
-            #             n+=1
-            #             self.place_shape(
-            #                 PATTERNS[patterns[n_shape]][:self.roomsize-2,:self.roomsize],
-            #                 (i*(self.roomsize+1)+1, j*(self.roomsize+1)+1),
-            #                 IDX_TO_COLOR[n_color]
-            #             )
-            #         elif i==self.roomsh-1:
-            #             n+=1
-            #             self.place_shape(
-            #                 np.vstack((np.zeros((2,self.roomsize)),
-            #                            PATTERNS[patterns[n_shape]][:self.roomsize-2,:self.roomsize])
-            #                            ),
-            #                 (i*(self.roomsize+1)+1, j*(self.roomsize+1)+1),
-            #                 IDX_TO_COLOR[n_color]
-            #                 )
-            #         elif j==0:
-            #             n+=1
-            #             self.place_shape(
-            #                 PATTERNS[patterns[n_shape]][:self.roomsize-2,:self.roomsize].T,
-            #                 (i*(self.roomsize+1)+1, j*(self.roomsize+1)+1),
-            #                 IDX_TO_COLOR[n_color]
-            #                 )
-            #         elif j==self.roomsv-1:
-            #             n+=1
-            #             self.place_shape(
-            #                 np.hstack((np.zeros((self.roomsize,2)),
-            #                            PATTERNS[patterns[n_shape]][:self.roomsize-2,:self.roomsize].T)),
-            #                 (i*(self.roomsize+1)+1, j*(self.roomsize+1)+1),
-            #                 IDX_TO_COLOR[n_color]
-            #                 )
-
-            # Colorize the rest of the floor
-            # n = 0
-            # for i in range(self.width):
-            #     for j in range(self.height):
-            #         if self.grid.get(i,j) is not None:
-            #             continue
-            #         else:
-            #             self.grid.set(i, j, FloorCustom(floor_colors[n]))
-            #             n+=1
-
-                        
-
-            # Place the agent in the top-left corner
-            # self.place_agent()
-
-            self.mission = (
-                "avoid the real lava and get to the fake lava square"
-            )
-            self.regenerate=False
+                self.put_obj(Floor('blue'), x, y)
+            
+        # n=0
+        # for i in range(self.roomsh):
+        #     for j in range(self.roomsv):
+        #         n_shape = self.marks[n]//5
+        #         n_color = self.marks[n]%5
+        #         if i==0:
+        #             n+=1
+        #             self.place_shape(
+        #                 PATTERNS[patterns[n_shape]][:self.roomsize-2,:self.roomsize],
+        #                 (i*(self.roomsize+1)+1, j*(self.roomsize+1)+1),
+        #                 IDX_TO_COLOR[n_color]
+        #             )
+        #         elif i==self.roomsh-1:
+        #             n+=1
+        #             self.place_shape(
+        #                 np.vstack((np.zeros((2,self.roomsize)),
+        #                            PATTERNS[patterns[n_shape]][:self.roomsize-2,:self.roomsize])
+        #                            ),
+        #                 (i*(self.roomsize+1)+1, j*(self.roomsize+1)+1),
+        #                 IDX_TO_COLOR[n_color]
+        #                 )
+        #         elif j==0:
+        #             n+=1
+        #             self.place_shape(
+        #                 PATTERNS[patterns[n_shape]][:self.roomsize-2,:self.roomsize].T,
+        #                 (i*(self.roomsize+1)+1, j*(self.roomsize+1)+1),
+        #                 IDX_TO_COLOR[n_color]
+        #                 )
+        #         elif j==self.roomsv-1:
+        #             n+=1
+        #             self.place_shape(
+        #                 np.hstack((np.zeros((self.roomsize,2)),
+        #                            PATTERNS[patterns[n_shape]][:self.roomsize-2,:self.roomsize].T)),
+        #                 (i*(self.roomsize+1)+1, j*(self.roomsize+1)+1),
+        #                 IDX_TO_COLOR[n_color]
+        #                 )
+
+        # Colorize the rest of the floor
+        # n = 0
+        # for i in range(self.width):
+        #     for j in range(self.height):
+        #         if self.grid.get(i,j) is not None:
+        #             continue
+        #         else:
+        #             self.grid.set(i, j, FloorCustom(floor_colors[n]))
+        #             n+=1
+
+        # Place the agent in the top-left corner
+        # self.place_agent()
+
+    def _gen_grid(self, width, height):
+        # Place the agent
+        if self.targetstart:
+            self.agent_pos = (-1, -1)
+            pos = self.place_obj(None, reject_fn=reject_nontarget_rooms)
+            self.agent_pos = pos
+            self.agent_dir = self._rand_int(0, 4)
+
         else:
+            self.agent_pos = (-1, -1)
+            pos = self.place_obj(None, reject_fn=reject_nonmarked_rooms)
+            self.agent_pos = pos
+            self.agent_dir = self._rand_int(0, 4)
 
-            # Place the agent
-            if self.targetstart:
-                self.agent_pos = (-1, -1)
-                pos = self.place_obj(None, reject_fn=reject_nontarget_rooms)
-                self.agent_pos = pos
-                self.agent_dir = self._rand_int(0, 4)
-
-            else:
-                self.agent_pos = (-1, -1)
-                pos = self.place_obj(None, reject_fn=reject_nonmarked_rooms)
-                self.agent_pos = pos
-                self.agent_dir = self._rand_int(0, 4)
+        self.mission = (
+            "avoid the real lava and get to the fake lava square"
+        )
 
     
     def step(self, action):
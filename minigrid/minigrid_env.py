@@ -1,23 +1,161 @@
 from __future__ import annotations
 
-import hashlib
 import math
 from abc import abstractmethod
 from enum import IntEnum
-from typing import Iterable, TypeVar
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterable, TypeVar
 
 import gymnasium as gym
 import numpy as np
 from gymnasium import spaces
 
-from minigrid.core.constants import COLOR_NAMES, DIR_TO_VEC, TILE_PIXELS
-from minigrid.core.grid import Grid
+from minigrid.core.constants import (
+    COLOR_NAMES,
+    DIR_TO_VEC,
+    OBJECT_TO_IDX,
+    STATE_TO_IDX,
+    TILE_PIXELS,
+)
+from minigrid.core.grid import (
+    EMPTY_ENCODING,
+    ArrayGrid,
+    Grid,
+    TileAtlas,
+    compute_vis_mask,
+    mix64,
+)
 from minigrid.core.mission import MissionSpace
-from minigrid.core.world_object import Point, WorldObj
-from minigrid.utils.window import Window
+from minigrid.core.world_object import Door, Point, WorldObj
+
+if TYPE_CHECKING:
+    from minigrid.utils.window import Window
 
 T = TypeVar("T")
 
+# Tags of the Zobrist keys of the agent and of the carried object, which
+# keep them apart from the keys of the grid cells
+AGENT_KEY = 1 << 60
+CARRYING_KEY = 2 << 60
+
+# Number of positions place_obj() tries with free_cell_placement before
+# sampling from the set of free cells
+FREE_CELL_TRIES = 3
+
+
+@lru_cache(maxsize=None)
+def view_offsets(agent_view_size: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Offsets from the agent position of every cell of its view, as two
+    (4, agent_view_size, agent_view_size) arrays of x and y offsets
+    indexed by agent direction and view coordinates.
+    """
+
+    sz = agent_view_size
+    hs = agent_view_size // 2
+    vis_i, vis_j = np.meshgrid(np.arange(sz), np.arange(sz), indexing="ij")
+
+    dx = np.empty((4, sz, sz), dtype=np.int64)
+    dy = np.empty((4, sz, sz), dtype=np.int64)
+    for agent_dir, (fx, fy) in enumerate(DIR_TO_VEC):
+        # Right vector, as in MiniGridEnv.right_vec
+        rx, ry = -fy, fx
+        dx[agent_dir] = fx * (sz - 1 - vis_j) + rx * (vis_i - hs)
+        dy[agent_dir] = fy * (sz - 1 - vis_j) + ry * (vis_i - hs)
+
+    dx.flags.writeable = False
+    dy.flags.writeable = False
+    return dx, dy
+
+
+def vectorized_reject_fn(reject_fn):
+    """
+    Mark a place_obj() filter as accepting arrays of positions. Besides
+    single positions, such filters are called with the (xs, ys) coordinate
+    arrays of every cell of the placement rectangle and return the mask of
+    the rejected cells, so that free_cell_placement samples among the
+    accepted cells directly.
+    """
+
+    reject_fn.vectorized = True
+    return reject_fn
+
+
+def _get_rng_state(rng: np.random.Generator) -> list[int]:
+    state = rng.bit_generator.state
+    if state["bit_generator"] != "PCG64":
+        raise ValueError(
+            f"Only PCG64 random number generators can be saved, got {state['bit_generator']}"
+        )
+
+    mask = (1 << 64) - 1
+    pcg_state, inc = state["state"]["state"], state["state"]["inc"]
+    return [
+        pcg_state & mask,
+        pcg_state >> 64,
+        inc & mask,
+        inc >> 64,
+        state["has_uint32"],
+        state["uinteger"],
+    ]
+
+
+def _set_rng_state(rng: np.random.Generator, array: np.ndarray):
+    state_lo, state_hi, inc_lo, inc_hi, has_uint32, uinteger = array.tolist()
+    rng.bit_generator.state = {
+        "bit_generator": "PCG64",
+        "state": {"state": state_hi << 64 | state_lo, "inc": inc_hi << 64 | inc_lo},
+        "has_uint32": has_uint32,
+        "uinteger": uinteger,
+    }
+
+
+def _encode(obj: WorldObj | None) -> tuple[int, int, int]:
+    """
+    Encoding of an object which may be missing, as stored in states
+    """
+
+    if obj is None:
+        return (0, 0, 0)
+    return tuple(int(v) for v in obj.encode())
+
+
+def _matches(obj: WorldObj | None, encoding: np.ndarray) -> bool:
+    """
+    Check if an object has the type and color of an encoding, the state
+    (of doors) being updated in place
+    """
+
+    return _encode(obj)[:2] == (int(encoding[0]), int(encoding[1]))
+
+
+def _set_obj_state(obj: WorldObj, state: int):
+    if isinstance(obj, Door):
+        obj.is_open = bool(state == STATE_TO_IDX["open"])
+        obj.is_locked = bool(state == STATE_TO_IDX["locked"])
+
+
+def _release(pool: dict[tuple[int, int], list[WorldObj]], obj: WorldObj | None):
+    if obj is not None:
+        pool.setdefault(_encode(obj)[:2], []).append(obj)
+
+
+def _take(
+    pool: dict[tuple[int, int], list[WorldObj]], encoding: np.ndarray
+) -> WorldObj | None:
+    """
+    Get an object matching an encoding, reusing one from the pool if possible
+    """
+
+    type_idx, color_idx, state = (int(v) for v in encoding)
+    objs = pool.get((type_idx, color_idx))
+    if not objs:
+        return WorldObj.decode(type_idx, color_idx, state)
+
+    obj = objs.pop()
+    _set_obj_state(obj, state)
+    return obj
+
 
 class MiniGridEnv(gym.Env):
     """
@@ -58,6 +196,9 @@ class MiniGridEnv(gym.Env):
         highlight: bool = True,
         tile_size: int = TILE_PIXELS,
         agent_pov: bool = False,
+        array_grid: bool = False,
+        prewarm_tiles: bool = False,
+        free_cell_placement: bool = False,
     ):
         # Initialize mission
         self.mission = mission_space.sample()
@@ -126,6 +267,25 @@ class MiniGridEnv(gym.Env):
         self.tile_size = tile_size
         self.agent_pov = agent_pov
 
+        # Store the grid as a NumPy tensor after it has been generated
+        self.array_grid = array_grid
+
+        # Render the tiles of the objects of the environment in advance,
+        # once the first grid has been generated
+        self.prewarm_tiles = prewarm_tiles
+        self._tiles_prewarmed = False
+
+        # Sample the positions of place_obj() among the free cells instead of
+        # rejection sampling them. This draws from the random number
+        # generator differently, so the layouts generated for a seed change.
+        self.free_cell_placement = free_cell_placement
+
+        # Template of the static part of the grid, see _gen_static_grid()
+        self._static_grid: Grid | None = None
+
+        # Built on first use by the state_dtype property
+        self._state_dtype: np.dtype | None = None
+
     def reset(self, *, seed=None, options=None):
         super().reset(seed=seed)
 
@@ -133,9 +293,15 @@ class MiniGridEnv(gym.Env):
         self.agent_pos = (-1, -1)
         self.agent_dir = -1
 
-        # Generate a new random grid at the start of each episode
+        # Generate a new random grid at the start of each episode, starting
+        # from a copy of the static part of the grid if there is one
+        if type(self)._gen_static_grid is not MiniGridEnv._gen_static_grid:
+            self.grid = self._static_grid_copy()
         self._gen_grid(self.width, self.height)
 
+        if self.array_grid and not isinstance(self.grid, ArrayGrid):
+            self.grid = ArrayGrid.from_grid(self.grid)
+
         # These fields should be defined by _gen_grid
         assert (
             self.agent_pos >= (0, 0)
@@ -147,6 +313,10 @@ class MiniGridEnv(gym.Env):
         start_cell = self.grid.get(*self.agent_pos)
         assert start_cell is None or start_cell.can_overlap()
 
+        if self.prewarm_tiles and not self._tiles_prewarmed:
+            Grid.prewarm_tiles(self.grid.grid, self.tile_size)
+            self._tiles_prewarmed = True
+
         # Item picked up, being carried, initially nothing
         self.carrying = None
 
@@ -163,15 +333,166 @@ class MiniGridEnv(gym.Env):
 
     def hash(self, size=16):
         """Compute a hash that uniquely identifies the current state of the environment.
-        :param size: Size of the hashing
+        :param size: Size of the hashing, in hexadecimal digits (at most 16)
+
+        The hash is a prefix of the 64-bit zobrist_hash(), it is not the
+        SHA-256 prefix of previous versions and also covers the carried
+        object, so the values differ from the ones computed before.
+        """
+
+        if size > 16:
+            raise ValueError(f"hash size must be at most 16 hex digits, got {size}")
+        return f"{self.zobrist_hash():016x}"[:size]
+
+    def zobrist_hash(self) -> int:
+        """
+        64-bit Zobrist hash of the current state: the hash of the grid,
+        which the grid keeps up to date as it changes, combined with the
+        keys of the agent and of the carried object.
         """
-        sample_hash = hashlib.sha256()
 
-        to_encode = [self.grid.encode().tolist(), self.agent_pos, self.agent_dir]
-        for item in to_encode:
-            sample_hash.update(str(item).encode("utf8"))
+        x, y = self.agent_pos
+        agent_key = mix64(AGENT_KEY | int(x) << 40 | int(y) << 24 | int(self.agent_dir))
+        if self.carrying is None:
+            return self.grid.zobrist_hash() ^ agent_key
 
-        return sample_hash.hexdigest()[:size]
+        type_idx, color_idx, state = (int(v) for v in self.carrying.encode())
+        carrying_key = mix64(CARRYING_KEY | type_idx << 16 | color_idx << 8 | state)
+        return self.grid.zobrist_hash() ^ agent_key ^ carrying_key
+
+    @property
+    def state_dtype(self) -> np.dtype:
+        """
+        Structured dtype of the states returned by get_state(). Its size
+        only depends on the environment configuration, so that states can
+        be stored in preallocated arrays or hashed as raw bytes.
+        """
+
+        if self._state_dtype is None:
+            self._state_dtype = np.dtype(self._state_fields())
+        return self._state_dtype
+
+    def _state_fields(self) -> list[tuple]:
+        """
+        Fields of the state dtype. Environments with additional episode
+        state extend this list and override _write_state() and _read_state().
+        """
+
+        return [
+            ("agent_pos", np.int64, (2,)),
+            ("agent_dir", np.int64),
+            ("step_count", np.int64),
+            ("max_steps", np.int64),
+            ("rng", np.uint64, (6,)),
+            # Carried object and its contents, zeros when there is none
+            ("carrying", np.uint8, (2, 3)),
+            ("grid", np.uint8, (self.width, self.height, 3)),
+            # Contents of the boxes of the grid
+            ("contents", np.uint8, (self.width, self.height, 3)),
+        ]
+
+    def get_state(self) -> np.ndarray:
+        """
+        Snapshot of the current episode: the grid encoding, the agent, the
+        carried object, the step count and the state of the random number
+        generator, as a 0-d array of dtype `state_dtype`.
+
+        The mission is not part of the state, it is kept as-is by set_state().
+        """
+
+        state = np.zeros((), dtype=self.state_dtype)
+        self._write_state(state)
+        return state
+
+    def set_state(self, state: np.ndarray | bytes):
+        """
+        Restore a state returned by get_state(), or its raw bytes.
+
+        Objects of the current grid are reused wherever they match the
+        state, so that references to them (e.g. held by the verifier of
+        BabyAI levels) stay valid when restoring a state of the episode.
+        """
+
+        if isinstance(state, (bytes, bytearray, memoryview)):
+            state = np.frombuffer(state, dtype=self.state_dtype).reshape(())
+        elif state.dtype != self.state_dtype:
+            raise ValueError(
+                f"State of dtype {state.dtype} does not match {self.state_dtype}"
+            )
+        self._read_state(state)
+
+    def _write_state(self, state: np.ndarray):
+        state["agent_pos"] = self.agent_pos
+        state["agent_dir"] = self.agent_dir
+        state["step_count"] = self.step_count
+        state["max_steps"] = self.max_steps
+        state["rng"] = _get_rng_state(self.np_random)
+
+        encoding = self.grid.encode()
+        state["grid"] = encoding
+        contents = state["contents"]
+        for i, j in zip(*np.nonzero(encoding[:, :, 0] == OBJECT_TO_IDX["box"])):
+            contents[i, j] = _encode(self.grid.get(i, j).contains)
+
+        if self.carrying is not None:
+            state["carrying"] = (
+                _encode(self.carrying),
+                _encode(getattr(self.carrying, "contains", None)),
+            )
+
+    def _read_state(self, state: np.ndarray):
+        self.agent_pos = tuple(int(v) for v in state["agent_pos"])
+        self.agent_dir = int(state["agent_dir"])
+        self.step_count = int(state["step_count"])
+        self.max_steps = int(state["max_steps"])
+        _set_rng_state(self.np_random, state["rng"])
+
+        grid = self.grid
+        encoding = state["grid"]
+        carrying = state["carrying"]
+
+        # Objects which are not where the state has them, by type and color
+        pool: dict[tuple[int, int], list[WorldObj]] = {}
+        missing = []
+
+        for i, j in zip(*np.nonzero(np.any(grid.encode() != encoding, axis=2))):
+            obj = grid.get(i, j)
+            if _matches(obj, encoding[i, j]):
+                # Doors being opened, closed or unlocked
+                _set_obj_state(obj, encoding[i, j, 2])
+                grid.set(i, j, obj)
+            else:
+                _release(pool, obj)
+                missing.append((i, j))
+
+        carried_missing = not _matches(self.carrying, carrying[0])
+        if carried_missing:
+            _release(pool, self.carrying)
+
+        for i, j in missing:
+            obj = _take(pool, encoding[i, j])
+            grid.set(i, j, obj)
+            if obj is not None:
+                obj.cur_pos = (i, j)
+
+        if carried_missing:
+            self.carrying = _take(pool, carrying[0])
+            if self.carrying is not None:
+                self.carrying.cur_pos = np.array([-1, -1])
+
+        # Box contents are not part of the grid encoding
+        contents = state["contents"]
+        boxes = [
+            (grid.get(i, j), contents[i, j].tolist())
+            for i, j in zip(*np.nonzero(encoding[:, :, 0] == OBJECT_TO_IDX["box"]))
+        ]
+        if carrying[0, 0] == OBJECT_TO_IDX["box"]:
+            boxes.append((self.carrying, carrying[1].tolist()))
+        boxes = [(box, enc) for box, enc in boxes if list(_encode(box.contains)) != enc]
+        for box, _ in boxes:
+            _release(pool, box.contains)
+        for box, enc in boxes:
+            box.contains = _take(pool, enc)
 
     @property
     def steps_remaining(self):
@@ -235,6 +556,24 @@ class MiniGridEnv(gym.Env):
     def _gen_grid(self, width, height):
         pass
 
+    def _gen_static_grid(self, width: int, height: int):
+        """
+        Generate the part of the grid which is the same in every episode,
+        without using the random number generator. Environments overriding
+        this have it generated once, and _gen_grid() then starts from a
+        copy of this grid in self.grid to add the parts which change.
+        """
+
+        raise NotImplementedError
+
+    def _static_grid_copy(self) -> Grid:
+        if self._static_grid is None:
+            self._gen_static_grid(self.width, self.height)
+            self._static_grid = self.grid
+            if self.array_grid:
+                self._static_grid = ArrayGrid.from_grid(self.grid)
+        return self._static_grid.fast_copy()
+
     def _reward(self) -> float:
         """
         Compute the reward to be given upon success
@@ -332,6 +671,20 @@ class MiniGridEnv(gym.Env):
         if size is None:
             size = (self.grid.width, self.grid.height)
 
+        if self.free_cell_placement:
+            pos = self._sample_free_cell(top, size, reject_fn)
+        else:
+            pos = self._rejection_sample_cell(top, size, reject_fn, max_tries)
+
+        self.grid.set(pos[0], pos[1], obj)
+
+        if obj is not None:
+            obj.init_pos = pos
+            obj.cur_pos = pos
+
+        return pos
+
+    def _rejection_sample_cell(self, top, size, reject_fn, max_tries):
         num_tries = 0
 
         while True:
@@ -359,15 +712,52 @@ class MiniGridEnv(gym.Env):
             if reject_fn and reject_fn(self, pos):
                 continue
 
-            break
-
-        self.grid.set(pos[0], pos[1], obj)
+            return pos
 
-        if obj is not None:
-            obj.init_pos = pos
-            obj.cur_pos = pos
+    def _sample_free_cell(self, top, size, reject_fn):
+        """
+        Sample a position uniformly among the free cells of the rectangle
+        which are not rejected, without unbounded rejection sampling
+        """
 
-        return pos
+        x0, y0 = top
+        x1 = min(top[0] + size[0], self.grid.width)
+        y1 = min(top[1] + size[1], self.grid.height)
+        agent_pos = tuple(self.agent_pos)
+
+        # Rejection sampling is the cheapest on sparse grids, so it is
+        # tried a few times before drawing from the set of free cells
+        if x0 < x1 and y0 < y1:
+            for _ in range(FREE_CELL_TRIES):
+                pos = (self._rand_int(x0, x1), self._rand_int(y0, y1))
+                if (
+                    self.grid.get(*pos) is None
+                    and pos != agent_pos
+                    and not (reject_fn and reject_fn(self, pos))
+                ):
+                    return pos
+
+        allowed = self.grid.free_mask()[x0:x1, y0:y1]
+        ax, ay = agent_pos
+        if x0 <= ax < x1 and y0 <= ay < y1:
+            allowed[ax - x0, ay - y0] = False
+        if getattr(reject_fn, "vectorized", False):
+            allowed &= np.logical_not(reject_fn(self, tuple(np.mgrid[x0:x1, y0:y1])))
+            reject_fn = None
+        xs, ys = np.nonzero(allowed)
+        xs, ys = (xs + x0).tolist(), (ys + y0).tolist()
+
+        # Draw the candidates without replacement until one is accepted
+        while xs:
+            k = self._rand_int(0, len(xs))
+            pos = (xs[k], ys[k])
+            if not (reject_fn and reject_fn(self, pos)):
+                return pos
+            xs[k], ys[k] = xs[-1], ys[-1]
+            xs.pop()
+            ys.pop()
+
+        raise RecursionError("no free cell to sample in place_obj")
 
     def put_obj(self, obj: WorldObj, i: int, j: int):
         """
@@ -627,15 +1017,51 @@ class MiniGridEnv(gym.Env):
 
         return grid, vis_mask
 
+    def gen_obs_encoding(self, agent_view_size=None):
+        """
+        Generate the encoding of the sub-grid observed by the agent, along
+        with its visibility mask. This gives the same result as encoding the
+        grid returned by gen_obs_grid, but gathers the view directly from the
+        encoding of the full grid instead of building intermediate grids.
+        if agent_view_size is None, self.agent_view_size is used
+        """
+
+        # Subclasses customizing the observed sub-grid use the slow path
+        if type(self).gen_obs_grid is not MiniGridEnv.gen_obs_grid:
+            grid, vis_mask = self.gen_obs_grid(agent_view_size)
+            return grid.encode(vis_mask), vis_mask
+
+        agent_view_size = agent_view_size or self.agent_view_size
+
+        dx, dy = view_offsets(agent_view_size)
+        image, see_behind = self.grid.gather(
+            self.agent_pos[0] + dx[self.agent_dir],
+            self.agent_pos[1] + dy[self.agent_dir],
+        )
+
+        agent_pos = (agent_view_size // 2, agent_view_size - 1)
+        if not self.see_through_walls:
+            vis_mask = compute_vis_mask(see_behind, agent_pos)
+        else:
+            vis_mask = np.ones(shape=see_behind.shape, dtype=bool)
+
+        # Make it so the agent sees what it's carrying
+        if self.carrying:
+            image[agent_pos] = self.carrying.encode()
+        else:
+            image[agent_pos] = EMPTY_ENCODING
+
+        image[~vis_mask] = 0
+
+        return image, vis_mask
+
     def gen_obs(self):
         """
         Generate the agent's view (partially observable, low-resolution encoding)
         """
 
-        grid, vis_mask = self.gen_obs_grid()
-
         # Encode the partially observable view into a numpy array
-        image = grid.encode(vis_mask)
+        image, _ = self.gen_obs_encoding()
 
         # Observations are dictionaries containing:
         # - an image (partially observable view of the environment)
@@ -649,6 +1075,20 @@ class MiniGridEnv(gym.Env):
         """
         Render an agent's POV observation for visualization
         """
+
+        # Draw the view from its encoding when every object can be
+        if type(self).gen_obs_grid is MiniGridEnv.gen_obs_grid and not (
+            self.grid.custom_tiles()
+            or (self.carrying and type(self.carrying) not in TileAtlas.objects)
+        ):
+            image, vis_mask = self.gen_obs_encoding()
+            return Grid.tile_atlas(tile_size).render(
+                image,
+                agent_pos=(self.agent_view_size // 2, self.agent_view_size - 1),
+                agent_dir=3,
+                highlight_mask=vis_mask,
+            )
+
         grid, vis_mask = self.gen_obs_grid()
 
         # Render the whole grid
@@ -666,38 +1106,17 @@ class MiniGridEnv(gym.Env):
         Render a non-paratial observation for visualization
         """
         # Compute which cells are visible to the agent
-        _, vis_mask = self.gen_obs_grid()
-
-        # Compute the world coordinates of the bottom-left corner
-        # of the agent's view area
-        f_vec = self.dir_vec
-        r_vec = self.right_vec
-        top_left = (
-            self.agent_pos
-            + f_vec * (self.agent_view_size - 1)
-            - r_vec * (self.agent_view_size // 2)
-        )
-
-        # Mask of which cells to highlight
-        highlight_mask = np.zeros(shape=(self.width, self.height), dtype=bool)
-
-        # For each cell in the visibility mask
-        for vis_j in range(0, self.agent_view_size):
-            for vis_i in range(0, self.agent_view_size):
-                # If this cell is not visible, don't highlight it
-                if not vis_mask[vis_i, vis_j]:
-                    continue
-
-                # Compute the world coordinates of this cell
-                abs_i, abs_j = top_left - (f_vec * vis_j) + (r_vec * vis_i)
+        _, vis_mask = self.gen_obs_encoding()
 
-                if abs_i < 0 or abs_i >= self.width:
-                    continue
-                if abs_j < 0 or abs_j >= self.height:
-                    continue
+        # Compute the world coordinates of the cells of the agent's view
+        dx, dy = view_offsets(self.agent_view_size)
+        xs = self.agent_pos[0] + dx[self.agent_dir]
+        ys = self.agent_pos[1] + dy[self.agent_dir]
 
-                # Mark this cell to be highlighted
-                highlight_mask[abs_i, abs_j] = True
+        # Mark the visible cells inside the grid to be highlighted
+        vis_mask = vis_mask & (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        highlight_mask = np.zeros(shape=(self.width, self.height), dtype=bool)
+        highlight_mask[xs[vis_mask], ys[vis_mask]] = True
 
         # Render the whole grid
         img = self.grid.render(
@@ -740,6 +1159,9 @@ class MiniGridEnv(gym.Env):
 
         if self.render_mode == "human":
             if self.window is None:
+                # Imported here as matplotlib is slow to import
+                from minigrid.utils.window import Window
+
                 self.window = Window("minigrid")
                 self.window.show(block=False)
             self.window.set_caption(self.mission)
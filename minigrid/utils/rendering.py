@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import math
+from functools import lru_cache
 
 import numpy as np
 
@@ -22,28 +23,57 @@ def downsample(img, factor):
     return img
 
 
+@lru_cache(maxsize=None)
+def pixel_coords(height: int, width: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Coordinates of the centers of the pixels of an image, normalized to
+    [0, 1], as two (height, width) arrays of x and y coordinates
+    """
+
+    xs = (np.arange(width) + 0.5) / width
+    ys = (np.arange(height) + 0.5) / height
+    xs, ys = np.meshgrid(xs, ys)
+
+    xs.flags.writeable = False
+    ys.flags.writeable = False
+    return xs, ys
+
+
 def fill_coords(img, fn, color):
     """
-    Fill pixels of an image with coordinates matching a filter function
+    Fill pixels of an image with coordinates matching a filter function.
+    The filter function is applied to the arrays of all the pixel
+    coordinates at once, filter functions only accepting scalar
+    coordinates are applied pixel by pixel.
     """
 
-    for y in range(img.shape[0]):
-        for x in range(img.shape[1]):
-            yf = (y + 0.5) / img.shape[0]
-            xf = (x + 0.5) / img.shape[1]
-            if fn(xf, yf):
-                img[y, x] = color
+    xs, ys = pixel_coords(img.shape[0], img.shape[1])
+    try:
+        mask = np.broadcast_to(fn(xs, ys), xs.shape)
+    except (TypeError, ValueError):
+        mask = None
+
+    if mask is None:
+        for y in range(img.shape[0]):
+            for x in range(img.shape[1]):
+                if fn(xs[y, x], ys[y, x]):
+                    img[y, x] = color
+    else:
+        img[mask] = color
 
     return img
 
 
 def rotate_fn(fin, cx, cy, theta):
+    cos = math.cos(-theta)
+    sin = math.sin(-theta)
+
     def fout(x, y):
         x = x - cx
         y = y - cy
 
-        x2 = cx + x * math.cos(-theta) - y * math.sin(-theta)
-        y2 = cy + y * math.cos(-theta) + x * math.sin(-theta)
+        x2 = cx + x * cos - y * sin
+        y2 = cy + y * cos + x * sin
 
         return fin(x2, y2)
 
@@ -64,19 +94,19 @@ def point_in_line(x0, y0, x1, y1, r):
 
     def fn(x, y):
         # Fast, early escape test
-        if x < xmin or x > xmax or y < ymin or y > ymax:
-            return False
+        in_box = (x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)
 
-        q = np.array([x, y])
-        pq = q - p0
+        pqx = x - p0[0]
+        pqy = y - p0[1]
 
         # Closest point on line
-        a = np.dot(pq, dir)
+        a = pqx * dir[0] + pqy * dir[1]
         a = np.clip(a, 0, dist)
-        p = p0 + a * dir
+        px = p0[0] + a * dir[0]
+        py = p0[1] + a * dir[1]
 
-        dist_to_line = np.linalg.norm(q - p)
-        return dist_to_line <= r
+        dist_to_line = np.sqrt((x - px) * (x - px) + (y - py) * (y - py))
+        return in_box & (dist_to_line <= r)
 
     return fn
 
@@ -90,7 +120,7 @@ def point_in_circle(cx, cy, r):
 
 def point_in_rect(xmin, xmax, ymin, ymax):
     def fn(x, y):
-        return x >= xmin and x <= xmax and y >= ymin and y <= ymax
+        return (x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)
 
     return fn
 
@@ -100,25 +130,29 @@ def point_in_triangle(a, b, c):
     b = np.array(b, dtype=np.float32)
     c = np.array(c, dtype=np.float32)
 
+    v0 = c - a
+    v1 = b - a
+
+    # Compute the dot products which don't depend on the point
+    dot00 = np.dot(v0, v0)
+    dot01 = np.dot(v0, v1)
+    dot11 = np.dot(v1, v1)
+    inv_denom = 1 / (dot00 * dot11 - dot01 * dot01)
+
     def fn(x, y):
-        v0 = c - a
-        v1 = b - a
-        v2 = np.array((x, y)) - a
+        v2x = x - a[0]
+        v2y = y - a[1]
 
         # Compute dot products
-        dot00 = np.dot(v0, v0)
-        dot01 = np.dot(v0, v1)
-        dot02 = np.dot(v0, v2)
-        dot11 = np.dot(v1, v1)
-        dot12 = np.dot(v1, v2)
+        dot02 = v0[0] * v2x + v0[1] * v2y
+        dot12 = v1[0] * v2x + v1[1] * v2y
 
         # Compute barycentric coordinates
-        inv_denom = 1 / (dot00 * dot11 - dot01 * dot01)
         u = (dot11 * dot02 - dot01 * dot12) * inv_denom
         v = (dot00 * dot12 - dot01 * dot02) * inv_denom
 
         # Check if point is in triangle
-        return (u >= 0) and (v >= 0) and (u + v) < 1
+        return (u >= 0) & (v >= 0) & ((u + v) < 1)
 
     return fn
 
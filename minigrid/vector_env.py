@@ -0,0 +1,603 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+import traceback
+from multiprocessing import shared_memory
+from typing import Callable, Iterable, Sequence
+
+import gymnasium as gym
+import numpy as np
+from gymnasium.vector.utils import CloudpickleWrapper
+
+from minigrid.core.constants import DIR_TO_VEC, OBJECT_TO_IDX, STATE_TO_IDX
+from minigrid.core.grid import (
+    EMPTY_ENCODING,
+    WALL_ENCODING,
+    compute_vis_masks,
+    see_behind_from_encoding,
+)
+from minigrid.core.world_object import (
+    Ball,
+    Box,
+    Door,
+    Floor,
+    Goal,
+    Key,
+    Lava,
+    Wall,
+    WorldObj,
+)
+from minigrid.minigrid_env import MiniGridEnv, view_offsets
+
+# Objects whose behavior is entirely described by their encoding
+SUPPORTED_OBJECTS = (Wall, Floor, Door, Key, Ball, Box, Goal, Lava)
+
+# MiniGridEnv methods which must not be overridden to be vectorized
+VECTORIZED_METHODS = ("step", "gen_obs", "gen_obs_grid", "gen_obs_encoding", "_reward")
+
+EMPTY = OBJECT_TO_IDX["empty"]
+DOOR = OBJECT_TO_IDX["door"]
+KEY = OBJECT_TO_IDX["key"]
+BOX = OBJECT_TO_IDX["box"]
+GOAL = OBJECT_TO_IDX["goal"]
+LAVA = OBJECT_TO_IDX["lava"]
+OPEN = STATE_TO_IDX["open"]
+CLOSED = STATE_TO_IDX["closed"]
+LOCKED = STATE_TO_IDX["locked"]
+
+DIR_VECS = np.array(DIR_TO_VEC)
+
+
+def _type_table(*types: str) -> np.ndarray:
+    table = np.zeros(256, dtype=bool)
+    table[[OBJECT_TO_IDX[t] for t in types]] = True
+    return table
+
+
+# Object types the agent can walk over, doors are handled by their state
+CAN_OVERLAP = _type_table("empty", "floor", "goal", "lava")
+
+# Object types the agent can pick up
+CAN_PICKUP = _type_table("key", "ball", "box")
+
+
+class MiniGridVecEnv(gym.vector.VectorEnv):
+    """
+    Vector environment stepping N MiniGrid environments at once.
+
+    The environments only generate the grids, on reset. The state of all
+    episodes is then held in stacked arrays: the encoding of the grids,
+    the encoding of the contents of boxes, the agent positions, directions
+    and carried objects. Actions are applied to all environments with a
+    few vectorized NumPy operations, with the same effects as
+    `MiniGridEnv.step`, and the observations are the same as the ones from
+    `MiniGridEnv.gen_obs`.
+
+    Environments finishing an episode are reset automatically, following
+    `gymnasium.vector.SyncVectorEnv`: the final observation and info are
+    returned in the infos under "final_observation" and "final_info".
+
+    Only environments using the default step and observation logic, and
+    whose grids only hold objects of the base classes in
+    `SUPPORTED_OBJECTS`, are supported. Wrappers of the environments are
+    not applied. The grids of the environments are not updated when
+    stepping, so they can't be used for rendering.
+    """
+
+    def __init__(self, env_fns: Iterable[Callable[[], gym.Env]]):
+        self.envs: list[MiniGridEnv] = [env_fn().unwrapped for env_fn in env_fns]
+        assert len(self.envs) > 0, "at least one environment is required"
+
+        env = self.envs[0]
+        for other in self.envs:
+            self._check_env(other)
+            if (
+                other.width,
+                other.height,
+                other.agent_view_size,
+                other.see_through_walls,
+            ) != (env.width, env.height, env.agent_view_size, env.see_through_walls):
+                raise ValueError(
+                    "All environments must have the same grid size, agent view size and see_through_walls"
+                )
+
+        super().__init__(len(self.envs), env.observation_space, env.action_space)
+
+        self.width = env.width
+        self.height = env.height
+        self.agent_view_size = env.agent_view_size
+        self.see_through_walls = env.see_through_walls
+        self.max_steps = np.array([env.max_steps for env in self.envs])
+
+        shape = (self.num_envs, self.width, self.height, 3)
+        self.grid = np.empty(shape, dtype=np.uint8)
+        self.contents = np.empty(shape, dtype=np.uint8)
+
+        self.agent_pos = np.zeros((self.num_envs, 2), dtype=np.int64)
+        self.agent_dir = np.zeros(self.num_envs, dtype=np.int64)
+        self.carrying = np.empty((self.num_envs, 3), dtype=np.uint8)
+        self.carrying_contents = np.empty((self.num_envs, 3), dtype=np.uint8)
+        self.step_count = np.zeros(self.num_envs, dtype=np.int64)
+        self.missions: list[str] = [env.mission for env in self.envs]
+
+        self._actions = None
+
+    @staticmethod
+    def _check_env(env: gym.Env):
+        if not isinstance(env, MiniGridEnv):
+            raise ValueError(f"Expected a MiniGridEnv, got: {type(env)}")
+        for name in VECTORIZED_METHODS:
+            if getattr(type(env), name) is not getattr(MiniGridEnv, name):
+                raise ValueError(
+                    f"{type(env).__name__} overrides MiniGridEnv.{name} and can't be vectorized"
+                )
+
+    def reset_wait(
+        self,
+        seed: int | Sequence[int | None] | None = None,
+        options: dict | None = None,
+    ):
+        if seed is None:
+            seed = [None] * self.num_envs
+        elif isinstance(seed, int):
+            seed = [seed + i for i in range(self.num_envs)]
+        assert len(seed) == self.num_envs
+
+        infos = {}
+        for i, (env, env_seed) in enumerate(zip(self.envs, seed)):
+            _, info = env.reset(seed=env_seed, options=options)
+            self._load(i)
+            infos = self._add_info(infos, info, i)
+
+        return self.gen_obs(np.arange(self.num_envs)), infos
+
+    def _load(self, i: int):
+        """
+        Copy the state of an environment which has just been reset
+        """
+
+        env = self.envs[i]
+        grid = env.grid
+
+        self.contents[i] = EMPTY_ENCODING
+        for k, v in enumerate(grid.grid):
+            if v is None:
+                continue
+            self._check_obj(v)
+            if v.contains is not None:
+                self._check_obj(v.contains)
+                if v.contains.contains is not None:
+                    raise ValueError("Nested containers can't be vectorized")
+                self.contents[i, k % grid.width, k // grid.width] = v.contains.encode()
+
+        self.grid[i] = grid.encode()
+        self.agent_pos[i] = env.agent_pos
+        self.agent_dir[i] = env.agent_dir
+        self.carrying[i] = EMPTY_ENCODING
+        self.carrying_contents[i] = EMPTY_ENCODING
+        self.step_count[i] = 0
+        self.missions[i] = env.mission
+
+    @staticmethod
+    def _check_obj(v: WorldObj):
+        if type(v) not in SUPPORTED_OBJECTS:
+            raise ValueError(f"{type(v).__name__} objects can't be vectorized")
+
+    def step_async(self, actions: np.ndarray):
+        self._actions = np.asarray(actions)
+
+    def step_wait(self):
+        actions = self._actions
+        if actions.shape != (self.num_envs,):
+            raise ValueError(f"Expected {self.num_envs} actions, got: {actions.shape}")
+        if np.any((actions < 0) | (actions >= len(MiniGridEnv.Actions))):
+            raise ValueError(f"Unknown action in: {actions}")
+
+        envs = np.arange(self.num_envs)
+        self.step_count += 1
+
+        # Get the position in front of the agents, and its contents
+        fwd_pos = self.agent_pos + DIR_VECS[self.agent_dir]
+        fwd_x, fwd_y = fwd_pos[:, 0], fwd_pos[:, 1]
+        fwd_cell = self.grid[envs, fwd_x, fwd_y]
+        fwd_type, fwd_color, fwd_state = fwd_cell.T
+        fwd_empty = fwd_type == EMPTY
+        fwd_door = fwd_type == DOOR
+        carrying = self.carrying[:, 0] != EMPTY
+
+        # Rotate left or right
+        turn = (actions == MiniGridEnv.Actions.right).astype(np.int64)
+        turn -= actions == MiniGridEnv.Actions.left
+        self.agent_dir = (self.agent_dir + turn) % 4
+
+        # Move forward
+        forward = actions == MiniGridEnv.Actions.forward
+        can_overlap = CAN_OVERLAP[fwd_type] | (fwd_door & (fwd_state == OPEN))
+        move = forward & can_overlap
+        self.agent_pos[move] = fwd_pos[move]
+
+        success = forward & (fwd_type == GOAL)
+        terminated = success | (forward & (fwd_type == LAVA))
+        rewards = np.zeros(self.num_envs, dtype=np.float64)
+        rewards[success] = 1 - 0.9 * (
+            self.step_count[success] / self.max_steps[success]
+        )
+
+        # Pick up an object
+        pickup = (
+            (actions == MiniGridEnv.Actions.pickup) & CAN_PICKUP[fwd_type] & ~carrying
+        )
+        e, x, y = envs[pickup], fwd_x[pickup], fwd_y[pickup]
+        self.carrying[pickup] = fwd_cell[pickup]
+        self.carrying_contents[pickup] = self.contents[e, x, y]
+        self.grid[e, x, y] = EMPTY_ENCODING
+        self.contents[e, x, y] = EMPTY_ENCODING
+
+        # Drop an object
+        drop = (actions == MiniGridEnv.Actions.drop) & fwd_empty & carrying
+        e, x, y = envs[drop], fwd_x[drop], fwd_y[drop]
+        self.grid[e, x, y] = self.carrying[drop]
+        self.contents[e, x, y] = self.carrying_contents[drop]
+        self.carrying[drop] = EMPTY_ENCODING
+        self.carrying_contents[drop] = EMPTY_ENCODING
+
+        # Toggle a door, locked doors need a key of the same color
+        toggle = actions == MiniGridEnv.Actions.toggle
+        has_key = (self.carrying[:, 0] == KEY) & (self.carrying[:, 1] == fwd_color)
+        toggle_door = toggle & fwd_door & ((fwd_state != LOCKED) | has_key)
+        self.grid[
+            envs[toggle_door], fwd_x[toggle_door], fwd_y[toggle_door], 2
+        ] = np.where(fwd_state[toggle_door] == OPEN, CLOSED, OPEN)
+
+        # Toggle a box, replacing it by its contents
+        toggle_box = toggle & (fwd_type == BOX)
+        e, x, y = envs[toggle_box], fwd_x[toggle_box], fwd_y[toggle_box]
+        self.grid[e, x, y] = self.contents[e, x, y]
+        self.contents[e, x, y] = EMPTY_ENCODING
+
+        truncated = self.step_count >= self.max_steps
+
+        obs = self.gen_obs(envs)
+        infos = {}
+
+        # Reset the environments whose episode is over
+        done = np.flatnonzero(terminated | truncated)
+        if len(done) > 0:
+            final_obs = [self._single_obs(obs, i) for i in done]
+            for i in done:
+                _, info = self.envs[i].reset()
+                self._load(i)
+                infos = self._add_info(infos, info, i)
+
+            reset_obs = self.gen_obs(done)
+            obs["image"][done] = reset_obs["image"]
+            obs["direction"][done] = reset_obs["direction"]
+            obs["mission"] = tuple(self.missions)
+
+            for i, single_obs in zip(done, final_obs):
+                infos = self._add_info(
+                    infos, {"final_observation": single_obs, "final_info": {}}, i
+                )
+
+        return obs, rewards, terminated, truncated, infos
+
+    def gen_obs(self, envs: np.ndarray) -> dict:
+        """
+        Generate the observations of the given environments, as
+        `MiniGridEnv.gen_obs` does for a single environment
+        """
+
+        sz = self.agent_view_size
+        dx, dy = view_offsets(sz)
+        agent_dir = self.agent_dir[envs]
+        xs = self.agent_pos[envs, 0, None, None] + dx[agent_dir]
+        ys = self.agent_pos[envs, 1, None, None] + dy[agent_dir]
+
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        image = self.grid[
+            envs[:, None, None],
+            np.clip(xs, 0, self.width - 1),
+            np.clip(ys, 0, self.height - 1),
+        ]
+        image[~inside] = WALL_ENCODING
+
+        agent_pos = (sz // 2, sz - 1)
+        if not self.see_through_walls:
+            vis_mask = compute_vis_masks(see_behind_from_encoding(image), agent_pos)
+        else:
+            vis_mask = np.ones(shape=image.shape[:3], dtype=bool)
+
+        # Make it so the agents see what they are carrying
+        image[:, agent_pos[0], agent_pos[1]] = self.carrying[envs]
+
+        image[~vis_mask] = 0
+
+        return {
+            "image": image,
+            "direction": agent_dir,
+            "mission": tuple(self.missions[i] for i in envs),
+        }
+
+    @staticmethod
+    def _single_obs(obs: dict, i: int) -> dict:
+        return {
+            "image": obs["image"][i].copy(),
+            "direction": int(obs["direction"][i]),
+            "mission": obs["mission"][i],
+        }
+
+    def close_extras(self, **kwargs):
+        for env in self.envs:
+            env.close()
+
+
+class SharedMemoryVecEnv(gym.vector.VectorEnv):
+    """
+    Vector environment running MiniGrid environments in worker processes.
+
+    Each worker steps a chunk of the environments, resetting them when
+    their episode is over, and writes the observation images and
+    directions into a ring of preallocated buffers in shared memory, along
+    with the rewards and episode ends. Actions are also passed through
+    shared memory, so that the pipes to the workers only carry a command,
+    and back the missions which have changed and the non-empty infos.
+
+    With `copy=False`, the returned images and directions are views on the
+    ring buffers, which remain valid for `ring_size - 1` further steps.
+    """
+
+    def __init__(
+        self,
+        env_fns: Sequence[Callable[[], gym.Env]],
+        num_workers: int | None = None,
+        ring_size: int = 2,
+        copy: bool = True,
+        context: str | None = None,
+        daemon: bool = True,
+    ):
+        assert len(env_fns) > 0, "at least one environment is required"
+        assert ring_size >= 1
+
+        dummy_env = env_fns[0]()
+        observation_space = dummy_env.observation_space
+        action_space = dummy_env.action_space
+        dummy_env.close()
+        del dummy_env
+
+        image_space = observation_space["image"]
+        assert image_space.dtype == np.uint8, "observation images must be uint8"
+
+        super().__init__(len(env_fns), observation_space, action_space)
+
+        self.ring_size = ring_size
+        self.copy = copy
+
+        # Layout of the arrays in shared memory, as name: (shape, dtype)
+        n = self.num_envs
+        self._layout = {
+            "image": ((ring_size, n) + image_space.shape, np.uint8),
+            "direction": ((ring_size, n), np.int64),
+            "action": ((n,), np.int64),
+            "reward": ((n,), np.float64),
+            "terminated": ((n,), np.bool_),
+            "truncated": ((n,), np.bool_),
+            "final_image": ((n,) + image_space.shape, np.uint8),
+            "final_direction": ((n,), np.int64),
+        }
+        size = sum(
+            int(np.prod(shape)) * np.dtype(dtype).itemsize
+            for shape, dtype in self._layout.values()
+        )
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._arrays = _shared_arrays(self._shm, self._layout)
+
+        self.missions: list[str | None] = [None] * n
+        self._slot = 0
+
+        num_workers = min(n, num_workers or os.cpu_count() or 1)
+        chunks = np.array_split(np.arange(n), num_workers)
+
+        ctx = mp.get_context(context)
+        self.parent_pipes, self.processes = [], []
+        for chunk in chunks:
+            parent_pipe, child_pipe = ctx.Pipe()
+            process = ctx.Process(
+                target=_shared_memory_worker,
+                name=f"Worker<{type(self).__name__}>-{chunk[0]}",
+                args=(
+                    [CloudpickleWrapper(env_fns[i]) for i in chunk],
+                    chunk.tolist(),
+                    child_pipe,
+                    parent_pipe,
+                    self._shm.name,
+                    self._layout,
+                ),
+            )
+            process.daemon = daemon
+            process.start()
+            child_pipe.close()
+            self.parent_pipes.append(parent_pipe)
+            self.processes.append(process)
+
+    def reset_async(
+        self,
+        seed: int | Sequence[int | None] | None = None,
+        options: dict | None = None,
+    ):
+        if seed is None:
+            seed = [None] * self.num_envs
+        elif isinstance(seed, int):
+            seed = [seed + i for i in range(self.num_envs)]
+        assert len(seed) == self.num_envs
+
+        self._slot = (self._slot + 1) % self.ring_size
+        for pipe in self.parent_pipes:
+            pipe.send(("reset", (self._slot, seed, options)))
+
+    def reset_wait(self, seed=None, options=None):
+        infos = {}
+        for i, mission, _, info in self._receive():
+            self.missions[i] = mission
+            infos = self._add_info(infos, info, i)
+
+        return self._observations(), infos
+
+    def step_async(self, actions: np.ndarray):
+        self._arrays["action"][:] = actions
+
+        self._slot = (self._slot + 1) % self.ring_size
+        for pipe in self.parent_pipes:
+            pipe.send(("step", self._slot))
+
+    def step_wait(self):
+        arrays = self._arrays
+        infos = {}
+        for i, mission, final_mission, info in self._receive():
+            if arrays["terminated"][i] or arrays["truncated"][i]:
+                info["final_observation"] = {
+                    "image": arrays["final_image"][i].copy(),
+                    "direction": int(arrays["final_direction"][i]),
+                    "mission": final_mission or self.missions[i],
+                }
+            if mission is not None:
+                self.missions[i] = mission
+            infos = self._add_info(infos, info, i)
+
+        return (
+            self._observations(),
+            arrays["reward"].copy(),
+            arrays["terminated"].copy(),
+            arrays["truncated"].copy(),
+            infos,
+        )
+
+    def _receive(self) -> list[tuple[int, str | None, str | None, dict]]:
+        """
+        Wait for all the workers, and gather the updates they sent
+        """
+
+        updates, errors = [], []
+        for pipe in self.parent_pipes:
+            result, success = pipe.recv()
+            if success:
+                updates.extend(result)
+            else:
+                errors.append(result)
+
+        if errors:
+            raise RuntimeError("Error in worker process:\n" + "\n".join(errors))
+
+        return updates
+
+    def _observations(self) -> dict:
+        image = self._arrays["image"][self._slot]
+        direction = self._arrays["direction"][self._slot]
+        if self.copy:
+            image, direction = image.copy(), direction.copy()
+
+        return {"image": image, "direction": direction, "mission": tuple(self.missions)}
+
+    def close_extras(self, timeout=None, terminate=False, **kwargs):
+        for pipe in self.parent_pipes:
+            try:
+                pipe.send(("close", None))
+            except (BrokenPipeError, OSError):
+                # The worker already exited
+                pass
+            pipe.close()
+        for process in self.processes:
+            if terminate:
+                process.terminate()
+            process.join(timeout)
+
+        # Release the views on the shared memory before closing it
+        self._arrays = None
+        self._shm.close()
+        self._shm.unlink()
+
+
+def _shared_arrays(
+    shm: shared_memory.SharedMemory, layout: dict
+) -> dict[str, np.ndarray]:
+    """
+    Create views on a shared memory block, for arrays laid out one after the other
+    """
+
+    arrays, offset = {}, 0
+    for name, (shape, dtype) in layout.items():
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+        offset += arrays[name].nbytes
+    return arrays
+
+
+def _shared_memory_worker(env_fns, env_indices, pipe, parent_pipe, shm_name, layout):
+    parent_pipe.close()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    arrays = _shared_arrays(shm, layout)
+    envs = [env_fn() for env_fn in env_fns]
+    missions = [None] * len(envs)
+
+    def write_obs(arrays, k, i, slot, obs):
+        arrays["image"][slot, i] = obs["image"]
+        arrays["direction"][slot, i] = obs["direction"]
+
+        # Only send the mission when it changes
+        if obs["mission"] != missions[k]:
+            missions[k] = obs["mission"]
+            return obs["mission"]
+        return None
+
+    try:
+        while True:
+            command, data = pipe.recv()
+
+            if command == "reset":
+                slot, seed, options = data
+                updates = []
+                for k, (i, env) in enumerate(zip(env_indices, envs)):
+                    obs, info = env.reset(seed=seed[i], options=options)
+                    missions[k] = None
+                    updates.append((i, write_obs(arrays, k, i, slot, obs), None, info))
+                pipe.send((updates, True))
+
+            elif command == "step":
+                slot = data
+                updates = []
+                for k, (i, env) in enumerate(zip(env_indices, envs)):
+                    obs, reward, terminated, truncated, info = env.step(
+                        int(arrays["action"][i])
+                    )
+                    arrays["reward"][i] = reward
+                    arrays["terminated"][i] = terminated
+                    arrays["truncated"][i] = truncated
+
+                    final_mission = None
+                    if terminated or truncated:
+                        arrays["final_image"][i] = obs["image"]
+                        arrays["final_direction"][i] = obs["direction"]
+                        if obs["mission"] != missions[k]:
+                            final_mission = obs["mission"]
+                        final_info = info
+                        obs, info = env.reset()
+                        info["final_info"] = final_info
+
+                    mission = write_obs(arrays, k, i, slot, obs)
+                    if mission is not None or final_mission is not None or info:
+                        updates.append((i, mission, final_mission, info))
+                pipe.send((updates, True))
+
+            elif command == "close":
+                break
+
+            else:
+                raise RuntimeError(f"Received unknown command `{command}`")
+
+    except (KeyboardInterrupt, Exception):
+        pipe.send((traceback.format_exc(), False))
+
+    finally:
+        for env in envs:
+            env.close()
+        del arrays
+        shm.close()
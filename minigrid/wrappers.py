@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import math
 import operator
+from collections import OrderedDict
 from functools import reduce
 
 import gymnasium as gym
@@ -34,31 +35,67 @@ class ReseedWrapper(Wrapper):
         return self.env.step(action)
 
 
-class ActionBonus(gym.Wrapper):
+# Exploration bonus 1/sqrt(count) by visit count, 0 for a count of 0
+BONUS_TABLE = np.zeros(4096)
+BONUS_TABLE[1:] = 1 / np.sqrt(np.arange(1, len(BONUS_TABLE)))
+
+
+def exploration_bonus(counts: np.ndarray) -> np.ndarray:
     """
-    Wrapper which adds an exploration bonus.
-    This is a reward to encourage exploration of less
-    visited (state,action) pairs.
+    Exploration bonus 1/sqrt(count) of an array of visit counts, looked up
+    in BONUS_TABLE for the counts it covers
     """
 
-    def __init__(self, env):
+    bonus = BONUS_TABLE[np.minimum(counts, len(BONUS_TABLE) - 1)]
+    large = counts >= len(BONUS_TABLE)
+    if large.any():
+        bonus[large] = 1 / np.sqrt(counts[large])
+    return bonus
+
+
+class _CountBonus(Wrapper):
+    """
+    Base of the wrappers adding an exploration bonus of 1/sqrt(count) to the
+    reward, where count is the number of visits of a key computed after each
+    step.
+
+    The counts are kept in a dict by key() by default. With
+    `array_counts=True` they are kept in an int32 array of shape
+    counts_shape(), indexed by index(), which can be updated in batches from
+    vector environments, snapshotted and merged across workers. At each
+    reset, the counts are multiplied by `decay` and rounded down, 1 keeps
+    them across episodes and 0 resets them.
+    """
+
+    def __init__(self, env, array_counts=False, decay=1.0):
         super().__init__(env)
+        assert 0 <= decay <= 1, "decay must be in [0, 1]"
+
+        self.array_counts = array_counts
+        self.decay = decay
         self.counts = {}
+        if array_counts:
+            self.counts = np.zeros(self.counts_shape(), dtype=np.int32)
 
-    def step(self, action):
-        obs, reward, terminated, truncated, info = self.env.step(action)
+    def counts_shape(self) -> tuple[int, ...]:
+        raise NotImplementedError
 
-        env = self.unwrapped
-        tup = (tuple(env.agent_pos), env.agent_dir, action)
+    def key(self, action) -> tuple:
+        raise NotImplementedError
+
+    def index(self, action) -> tuple[int, ...]:
+        raise NotImplementedError
 
-        # Get the count for this (s,a) pair
-        pre_count = 0
-        if tup in self.counts:
-            pre_count = self.counts[tup]
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
 
-        # Update the count for this (s,a) pair
-        new_count = pre_count + 1
-        self.counts[tup] = new_count
+        if self.array_counts:
+            key = self.index(action)
+            new_count = int(self.counts[key]) + 1
+        else:
+            key = self.key(action)
+            new_count = self.counts.get(key, 0) + 1
+        self.counts[key] = new_count
 
         bonus = 1 / math.sqrt(new_count)
         reward += bonus
@@ -66,43 +103,134 @@ class ActionBonus(gym.Wrapper):
         return obs, reward, terminated, truncated, info
 
     def reset(self, **kwargs):
+        if self.decay == 0:
+            self.reset_counts()
+        elif self.decay < 1:
+            if self.array_counts:
+                self.counts[:] = self.counts * self.decay
+            else:
+                decayed = ((k, int(c * self.decay)) for k, c in self.counts.items())
+                self.counts = {k: c for k, c in decayed if c > 0}
+
         return self.env.reset(**kwargs)
 
+    def reset_counts(self):
+        """
+        Forget all visits
+        """
+
+        if self.array_counts:
+            self.counts[:] = 0
+        else:
+            self.counts = {}
+
+    def _update_batch(self, index: tuple[np.ndarray, ...]) -> np.ndarray:
+        """
+        Count the visits of a batch of keys, given as arrays of indices, in
+        order, and return their exploration bonuses
+        """
+
+        if not self.array_counts:
+            raise ValueError("batched updates require array_counts=True")
+
+        flat = np.ravel_multi_index(index, self.counts.shape)
+        counts = self.counts.reshape(-1)
+
+        # Keys repeated in the batch count the visits before them
+        order = np.argsort(flat, kind="stable")
+        sorted_flat = flat[order]
+        positions = np.arange(len(flat))
+        first = np.r_[True, sorted_flat[1:] != sorted_flat[:-1]]
+        rank = positions - np.maximum.accumulate(np.where(first, positions, 0))
+
+        new_counts = np.empty(len(flat), dtype=np.int64)
+        new_counts[order] = counts[sorted_flat] + rank + 1
+        np.add.at(counts, flat, 1)
+
+        return exploration_bonus(new_counts)
+
+    def snapshot(self) -> np.ndarray:
+        """
+        Copy of the visit counts, to be merged into the counts of other workers
+        """
+
+        if not self.array_counts:
+            raise ValueError("snapshots require array_counts=True")
+        return self.counts.copy()
 
-class StateBonus(Wrapper):
+    def merge(self, *snapshots: np.ndarray):
+        """
+        Add the visit counts of snapshots taken from other workers
+        """
+
+        if not self.array_counts:
+            raise ValueError("merging counts requires array_counts=True")
+        for counts in snapshots:
+            self.counts += counts
+
+
+class ActionBonus(_CountBonus):
     """
-    Adds an exploration bonus based on which positions
-    are visited on the grid.
+    Wrapper which adds an exploration bonus.
+    This is a reward to encourage exploration of less
+    visited (state,action) pairs.
+
+    With `array_counts=True`, the counts are indexed by
+    (x, y, direction, action).
     """
 
-    def __init__(self, env):
-        super().__init__(env)
-        self.counts = {}
+    def counts_shape(self):
+        env = self.unwrapped
+        return env.width, env.height, 4, self.env.action_space.n
 
-    def step(self, action):
-        obs, reward, terminated, truncated, info = self.env.step(action)
+    def key(self, action):
+        env = self.unwrapped
+        return tuple(env.agent_pos), env.agent_dir, action
 
-        # Tuple based on which we index the counts
-        # We use the position after an update
+    def index(self, action):
         env = self.unwrapped
-        tup = tuple(env.agent_pos)
+        return (*env.agent_pos, env.agent_dir, action)
 
-        # Get the count for this key
-        pre_count = 0
-        if tup in self.counts:
-            pre_count = self.counts[tup]
+    def update_batch(self, agent_pos, agent_dir, actions):
+        """
+        Count the visits of the positions and directions reached by the
+        agents of a vector environment with the given actions, and return
+        their exploration bonuses
+        """
 
-        # Update the count for this key
-        new_count = pre_count + 1
-        self.counts[tup] = new_count
+        agent_pos = np.asarray(agent_pos)
+        return self._update_batch(
+            (agent_pos[:, 0], agent_pos[:, 1], agent_dir, actions)
+        )
 
-        bonus = 1 / math.sqrt(new_count)
-        reward += bonus
 
-        return obs, reward, terminated, truncated, info
+class StateBonus(_CountBonus):
+    """
+    Adds an exploration bonus based on which positions
+    are visited on the grid.
 
-    def reset(self, **kwargs):
-        return self.env.reset(**kwargs)
+    With `array_counts=True`, the counts are indexed by (x, y).
+    """
+
+    def counts_shape(self):
+        env = self.unwrapped
+        return env.width, env.height
+
+    def key(self, action):
+        # We use the position after an update
+        return tuple(self.unwrapped.agent_pos)
+
+    def index(self, action):
+        return self.key(action)
+
+    def update_batch(self, agent_pos):
+        """
+        Count the visits of the positions reached by the agents of a vector
+        environment, and return their exploration bonuses
+        """
+
+        agent_pos = np.asarray(agent_pos)
+        return self._update_batch((agent_pos[:, 0], agent_pos[:, 1]))
 
 
 class ImgObsWrapper(ObservationWrapper):
@@ -117,6 +245,28 @@ class ImgObsWrapper(ObservationWrapper):
     def observation(self, obs):
         return obs["image"]
 
+    def observation_batch(self, obs, envs=None):
+        return obs["image"]
+
+
+def _one_hot_table():
+    num_types, num_colors = len(OBJECT_TO_IDX), len(COLOR_TO_IDX)
+    num_states = len(STATE_TO_IDX)
+    num_bits = num_types + num_colors + num_states
+
+    table = np.zeros((num_types, num_colors, num_states, num_bits), dtype=np.uint8)
+    for i in range(num_types):
+        table[i, :, :, i] = 1
+    for i in range(num_colors):
+        table[:, i, :, num_types + i] = 1
+    for i in range(num_states):
+        table[:, :, i, num_types + num_colors + i] = 1
+    return table
+
+
+# One-hot bits of each (type, color, state) cell encoding
+ONE_HOT_TABLE = _one_hot_table()
+
 
 class OneHotPartialObsWrapper(ObservationWrapper):
     """
@@ -141,21 +291,25 @@ class OneHotPartialObsWrapper(ObservationWrapper):
             {**self.observation_space.spaces, "image": new_image_space}
         )
 
-    def observation(self, obs):
-        img = obs["image"]
-        out = np.zeros(self.observation_space.spaces["image"].shape, dtype="uint8")
+    def observation(self, obs, out=None):
+        return {**obs, "image": self.one_hot(obs["image"], out)}
 
-        for i in range(img.shape[0]):
-            for j in range(img.shape[1]):
-                type = img[i, j, 0]
-                color = img[i, j, 1]
-                state = img[i, j, 2]
+    def observation_batch(self, obs, envs=None, out=None):
+        return self.observation(obs, out)
 
-                out[i, j, type] = 1
-                out[i, j, len(OBJECT_TO_IDX) + color] = 1
-                out[i, j, len(OBJECT_TO_IDX) + len(COLOR_TO_IDX) + state] = 1
+    @staticmethod
+    def one_hot(image, out=None):
+        """
+        One-hot encoding of the cells of an encoded image, which may have
+        leading batch dimensions. The bits of each (type, color, state)
+        triple are gathered from a lookup table, into `out` if given.
+        """
 
-        return {**obs, "image": out}
+        code = np.ravel_multi_index(
+            (image[..., 0], image[..., 1], image[..., 2]), ONE_HOT_TABLE.shape[:3]
+        )
+        table = ONE_HOT_TABLE.reshape(-1, ONE_HOT_TABLE.shape[3])
+        return np.take(table, code, axis=0, out=out)
 
 
 class PlaceCellsObsWrapper(ObservationWrapper):
@@ -307,20 +461,43 @@ class FullyObsWrapper(ObservationWrapper):
 
         return {**obs, "image": full_grid}
 
+    def observation_batch(self, obs, envs=None):
+        envs = _unwrapped_envs(self, envs)
+        full_grids = np.stack([env.grid.encode() for env in envs])
+        agent_pos = np.array([env.agent_pos for env in envs])
+        full_grids[np.arange(len(envs)), agent_pos[:, 0], agent_pos[:, 1]] = np.array(
+            [
+                (OBJECT_TO_IDX["agent"], COLOR_TO_IDX["red"], env.agent_dir)
+                for env in envs
+            ]
+        )
+
+        return {**obs, "image": full_grids}
+
 
 class DictObservationSpaceWrapper(ObservationWrapper):
     """
     Transforms the observation space (that has a textual component) to a fully numerical observation space,
     where the textual instructions are replaced by arrays representing the indices of each word in a fixed vocabulary.
 
+    Missions are returned as fixed-length int64 arrays, padded with 0. Recent
+    missions are kept in a LRU cache, the returned arrays are read-only.
+
     This wrapper is not applicable to BabyAI environments, given that these have their own language component.
     """
 
-    def __init__(self, env, max_words_in_mission=50, word_dict=None):
+    # Number of tokenized missions kept in the cache of encode_mission()
+    mission_cache_size: int = 128
+
+    def __init__(
+        self, env, max_words_in_mission=50, word_dict=None, precompute_vocab=False
+    ):
         """
         max_words_in_mission is the length of the array to represent a mission, value 0 for missing words
         word_dict is a dictionary of words to use (keys=words, values=indices from 1 to < max_words_in_mission),
                   if None, use the Minigrid language
+        precompute_vocab builds the offset index of each word once, missions are then tokenized
+                  with a single dict lookup per word and later changes to word_dict are ignored
         """
         super().__init__(env)
 
@@ -330,6 +507,14 @@ class DictObservationSpaceWrapper(ObservationWrapper):
         self.max_words_in_mission = max_words_in_mission
         self.word_dict = word_dict
 
+        # Indices of the words offset by 1, with precompute_vocab
+        self._word_indices: dict[str, int] | None = None
+        if precompute_vocab:
+            self._word_indices = {word: i + 1 for word, i in word_dict.items()}
+
+        # Tokenized missions, least recently used first
+        self._mission_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+
         image_observation_space = spaces.Box(
             low=0,
             high=255,
@@ -410,37 +595,88 @@ class DictObservationSpaceWrapper(ObservationWrapper):
         """
         Convert a string to a list of indices.
         """
-        indices = []
         # adding space before and after commas
-        string = string.replace(",", " , ")
-        for word in string.split():
-            if word in self.word_dict.keys():
+        words = string.replace(",", " , ").split()
+        if self._word_indices is not None and offset == 1:
+            try:
+                return [self._word_indices[word] for word in words]
+            except KeyError as e:
+                raise ValueError(f"Unknown word: {e.args[0]}") from None
+
+        indices = []
+        for word in words:
+            if word in self.word_dict:
                 indices.append(self.word_dict[word] + offset)
             else:
                 raise ValueError(f"Unknown word: {word}")
         return indices
 
+    def encode_mission(self, mission):
+        """
+        Indices of the words of a mission string, padded with 0 to
+        max_words_in_mission. Recent missions are kept in a LRU cache, the
+        returned arrays are read-only.
+        """
+
+        encoded = self._mission_cache.get(mission)
+        if encoded is None:
+            indices = self.string_to_indices(mission)
+            assert len(indices) < self.max_words_in_mission
+
+            encoded = np.zeros(self.max_words_in_mission, dtype=np.int64)
+            encoded[: len(indices)] = indices
+            encoded.flags.writeable = False
+
+            self._mission_cache[mission] = encoded
+            if len(self._mission_cache) > self.mission_cache_size:
+                self._mission_cache.popitem(last=False)
+        else:
+            self._mission_cache.move_to_end(mission)
+        return encoded
+
     def observation(self, obs):
-        obs["mission"] = self.string_to_indices(obs["mission"])
-        assert len(obs["mission"]) < self.max_words_in_mission
-        obs["mission"] += [0] * (self.max_words_in_mission - len(obs["mission"]))
+        obs["mission"] = self.encode_mission(obs["mission"])
 
         return obs
 
+    def observation_batch(self, obs, envs=None):
+        missions = np.stack([self.encode_mission(m) for m in obs["mission"]])
+
+        return {**obs, "mission": missions}
+
+
+# Characters allowed in missions by FlatObsWrapper, in the order of their
+# one-hot encoding
+MISSION_CHARS = "abcdefghijklmnopqrstuvwxyz ,"
+
+# Translation table from character codes to their index in the one-hot
+# encoding, 255 for the characters not allowed
+MISSION_CHAR_TABLE = bytes(
+    MISSION_CHARS.index(chr(code)) if chr(code) in MISSION_CHARS else 255
+    for code in range(256)
+)
+
 
 class FlatObsWrapper(ObservationWrapper):
     """
     Encode mission strings using a one-hot scheme,
     and combine these with observed images into one flat array.
 
+    With `copy=False`, the observations are written into a buffer owned by
+    the wrapper, which is overwritten by the next observation.
+
     This wrapper is not applicable to BabyAI environments, given that these have their own language component.
     """
 
-    def __init__(self, env, maxStrLen=96):
+    # Number of encoded missions kept in the cache of encode_mission()
+    mission_cache_size: int = 128
+
+    def __init__(self, env, maxStrLen=96, copy=True):
         super().__init__(env)
 
         self.maxStrLen = maxStrLen
         self.numCharCodes = 28
+        self.copy = copy
 
         imgSpace = env.observation_space.spaces["image"]
         imgSize = reduce(operator.mul, imgSpace.shape, 1)
@@ -452,43 +688,76 @@ class FlatObsWrapper(ObservationWrapper):
             dtype="uint8",
         )
 
-        self.cachedStr: str = None
+        # Buffer the observations are written into with copy=False
+        self._buffer = None
+        if not copy:
+            self._buffer = np.empty(self.observation_space.shape, dtype=np.uint8)
+
+        # Encoded missions, least recently used first
+        self._mission_cache: OrderedDict[str, np.ndarray] = OrderedDict()
+
+    def observation(self, obs, out=None):
+        if out is None and not self.copy:
+            out = self._buffer
+        if out is None:
+            out = np.empty(
+                self.observation_space.shape, dtype=self.observation_space.dtype
+            )
 
-    def observation(self, obs):
         image = obs["image"]
-        mission = obs["mission"]
+        image_size = image.size
+        out[:image_size] = image.reshape(-1)
+        out[image_size:] = self.encode_mission(obs["mission"]).reshape(-1)
 
-        # Cache the last-encoded mission string
-        if mission != self.cachedStr:
-            assert (
-                len(mission) <= self.maxStrLen
-            ), f"mission string too long ({len(mission)} chars)"
-            mission = mission.lower()
+        return out
 
-            strArray = np.zeros(
-                shape=(self.maxStrLen, self.numCharCodes), dtype="float32"
-            )
+    def observation_batch(self, obs, envs=None):
+        images = obs["image"].reshape(len(obs["image"]), -1)
+        out = np.empty((len(images),) + self.observation_space.shape, dtype=np.uint8)
+        image_size = images.shape[1]
+        out[:, :image_size] = images
+        for i, mission in enumerate(obs["mission"]):
+            out[i, image_size:] = self.encode_mission(mission).reshape(-1)
 
-            for idx, ch in enumerate(mission):
-                if ch >= "a" and ch <= "z":
-                    chNo = ord(ch) - ord("a")
-                elif ch == " ":
-                    chNo = ord("z") - ord("a") + 1
-                elif ch == ",":
-                    chNo = ord("z") - ord("a") + 2
-                else:
-                    raise ValueError(
-                        f"Character {ch} is not available in mission string."
-                    )
-                assert chNo < self.numCharCodes, "%s : %d" % (ch, chNo)
-                strArray[idx, chNo] = 1
-
-            self.cachedStr = mission
-            self.cachedArray = strArray
-
-        obs = np.concatenate((image.flatten(), self.cachedArray.flatten()))
+        return out
 
-        return obs
+    def encode_mission(self, mission):
+        """
+        One-hot encoding of the characters of a mission string, of shape
+        (maxStrLen, numCharCodes). Recent missions are kept in a LRU cache,
+        the returned arrays are read-only.
+        """
+
+        encoded = self._mission_cache.get(mission)
+        if encoded is None:
+            encoded = self._encode_mission(mission)
+            self._mission_cache[mission] = encoded
+            if len(self._mission_cache) > self.mission_cache_size:
+                self._mission_cache.popitem(last=False)
+        else:
+            self._mission_cache.move_to_end(mission)
+        return encoded
+
+    def _encode_mission(self, mission):
+        assert (
+            len(mission) <= self.maxStrLen
+        ), f"mission string too long ({len(mission)} chars)"
+        mission = mission.lower()
+
+        # Characters are translated to their index by their code
+        try:
+            chars = mission.encode("latin-1").translate(MISSION_CHAR_TABLE)
+        except UnicodeEncodeError:
+            chars = None
+        if chars is None or 255 in chars:
+            ch = next(ch for ch in mission if ch not in MISSION_CHARS)
+            raise ValueError(f"Character {ch} is not available in mission string.")
+
+        strArray = np.zeros(shape=(self.maxStrLen, self.numCharCodes), dtype=np.uint8)
+        strArray[np.arange(len(chars)), np.frombuffer(chars, dtype=np.uint8)] = 1
+        strArray.flags.writeable = False
+
+        return strArray
 
 
 class ViewSizeWrapper(Wrapper):
@@ -518,13 +787,19 @@ class ViewSizeWrapper(Wrapper):
     def observation(self, obs):
         env = self.unwrapped
 
-        grid, vis_mask = env.gen_obs_grid(self.agent_view_size)
-
         # Encode the partially observable view into a numpy array
-        image = grid.encode(vis_mask)
+        image, _ = env.gen_obs_encoding(self.agent_view_size)
 
         return {**obs, "image": image}
 
+    def observation_batch(self, obs, envs=None):
+        envs = _unwrapped_envs(self, envs)
+        images = np.stack(
+            [env.gen_obs_encoding(self.agent_view_size)[0] for env in envs]
+        )
+
+        return {**obs, "image": images}
+
 
 class DirectionObsWrapper(ObservationWrapper):
     """
@@ -592,3 +867,60 @@ class SymbolicObsWrapper(ObservationWrapper):
         grid[agent_pos[0], agent_pos[1], 2] = OBJECT_TO_IDX["agent"]
         obs["image"] = grid
         return obs
+
+    def observation_batch(self, obs, envs=None):
+        envs = _unwrapped_envs(self, envs)
+        w, h = self.width, self.height
+
+        # Object types are read from the encodings, in the order of the cells
+        # of the grids as observation() does, empty cells are -1
+        types = np.stack(
+            [env.grid.encode()[:, :, 0].T.reshape(w, h) for env in envs]
+        ).astype(int)
+        types[types == OBJECT_TO_IDX["empty"]] = -1
+        agent_pos = np.array([env.agent_pos for env in envs])
+        types[np.arange(len(envs)), agent_pos[:, 0], agent_pos[:, 1]] = OBJECT_TO_IDX[
+            "agent"
+        ]
+
+        grid = np.empty((len(envs), w, h, 3), dtype=int)
+        grid[..., :2] = np.moveaxis(np.mgrid[:w, :h], 0, -1)
+        grid[..., 2] = types
+        return {**obs, "image": grid}
+
+
+def observation_batch(env: gym.Env, obs: dict, envs=None):
+    """
+    Apply the observation wrappers of `env` to a batch of observations of
+    environments wrapped in the same way, e.g. the observations of a vector
+    environment. The observations are stacked along a first axis, and the
+    missions are a sequence of strings. Each wrapper transforms the whole
+    batch at once, from the innermost one to the outermost one.
+
+    Wrappers computing their observations from the environment state
+    (FullyObsWrapper, ViewSizeWrapper, SymbolicObsWrapper) need `envs`, the
+    environments the observations come from.
+    """
+
+    wrappers = []
+    while isinstance(env, Wrapper):
+        wrappers.append(env)
+        env = env.env
+
+    for wrapper in reversed(wrappers):
+        if hasattr(wrapper, "observation_batch"):
+            obs = wrapper.observation_batch(obs, envs)
+        elif isinstance(wrapper, ObservationWrapper):
+            raise ValueError(
+                f"{type(wrapper).__name__} can't transform batches of observations"
+            )
+
+    return obs
+
+
+def _unwrapped_envs(wrapper, envs):
+    if envs is None:
+        raise ValueError(
+            f"{type(wrapper).__name__} needs the environments to transform a batch of observations"
+        )
+    return [env.unwrapped for env in envs]
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import pickle
+import subprocess
+import sys
 import warnings
 
 import gymnasium as gym
@@ -9,8 +11,14 @@ import pytest
 from gymnasium.envs.registration import EnvSpec
 from gymnasium.utils.env_checker import check_env, data_equivalence
 
+from minigrid.core import roomgrid
 from minigrid.core.grid import Grid
 from minigrid.core.mission import MissionSpace
+from minigrid.core.world_object import Ball, Door, Key
+from minigrid.envs import donutLavaLong, fakelava
+from minigrid.envs.babyai.core.level_bank import LevelBank
+from minigrid.envs.babyai.core.verifier import _obj_descs, instr_nodes
+from minigrid.minigrid_env import MiniGridEnv
 from tests.utils import all_testing_env_specs, assert_equals
 
 CHECK_ENV_IGNORE_WARNINGS = [
@@ -303,3 +311,341 @@ def test_mission_space():
 
     assert mission_space.contains("get the green key and the green key.")
     assert mission_space.contains("go fetch the red ball and the green key.")
+
+
+def test_mission_space_cache(monkeypatch):
+    monkeypatch.setattr(MissionSpace, "contains_cache_size", 2)
+    mission_space = MissionSpace(
+        mission_func=lambda color, obj_type: f"Get the {color} {obj_type}.",
+        ordered_placeholders=[["green", "red"], ["ball", "key"]],
+    )
+    missions = ["Get the red key.", "Get the key red.", "Get the green ball."]
+
+    for mission in missions * 2:
+        assert mission_space.contains(mission) == mission_space._contains(mission)
+    assert list(mission_space._contains_cache) == missions[1:]
+
+    # Recently checked strings are kept
+    assert not mission_space.contains(missions[1])
+    assert mission_space.contains(missions[0])
+    assert list(mission_space._contains_cache) == [missions[1], missions[0]]
+
+
+@pytest.mark.parametrize(
+    "env_id",
+    [
+        "MiniGrid-DoorKey-8x8-v0",
+        "MiniGrid-LavaCrossingS9N2-v0",
+        "MiniGrid-KeyCorridorS3R3-v0",
+        "MiniGrid-RedBlueDoors-6x6-v0",
+        "BabyAI-Pickup-v0",
+    ],
+)
+@pytest.mark.parametrize("see_through_walls", [False, True])
+def test_gen_obs_encoding(env_id, see_through_walls):
+    """Check that the gathered agent view matches the one built from gen_obs_grid."""
+    env = gym.make(env_id).unwrapped
+    env.see_through_walls = see_through_walls
+    env.reset(seed=SEED)
+    env.action_space.seed(SEED)
+
+    for _ in range(NUM_STEPS):
+        for agent_view_size in [3, 5, 7, 9]:
+            grid, vis_mask = env.gen_obs_grid(agent_view_size)
+            image, fast_vis_mask = env.gen_obs_encoding(agent_view_size)
+            np.testing.assert_array_equal(grid.encode(vis_mask), image)
+            np.testing.assert_array_equal(vis_mask, fast_vis_mask)
+
+        _, _, terminated, truncated, _ = env.step(env.action_space.sample())
+        if terminated or truncated:
+            env.reset()
+
+
+@pytest.mark.parametrize(
+    "env_id",
+    [
+        "MiniGrid-DoorKey-8x8-v0",
+        "MiniGrid-KeyCorridorS3R3-v0",
+        "MiniGrid-Dynamic-Obstacles-8x8-v0",
+        "MiniGrid-FakeLava-5x5-3x4-v0",
+    ],
+)
+def test_pov_render(env_id):
+    env = gym.make(env_id, disable_env_checker=True).unwrapped
+    env.reset(seed=0)
+
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        _, _, terminated, truncated, _ = env.step(rng.integers(0, 3))
+        if terminated or truncated:
+            env.reset()
+
+        # Render the view grid tile by tile
+        grid, vis_mask = env.gen_obs_grid()
+        agent_pos = (grid.width // 2, grid.height - 1)
+        expected = np.zeros((grid.height * 8, grid.width * 8, 3), dtype=np.uint8)
+        for j in range(grid.height):
+            for i in range(grid.width):
+                rows, cols = slice(j * 8, (j + 1) * 8), slice(i * 8, (i + 1) * 8)
+                expected[rows, cols] = Grid.render_tile(
+                    grid.get(i, j),
+                    agent_dir=3 if (i, j) == agent_pos else None,
+                    highlight=vis_mask[i, j],
+                    tile_size=8,
+                )
+
+        np.testing.assert_array_equal(
+            env.get_frame(tile_size=8, agent_pov=True), expected
+        )
+
+
+def test_lazy_imports():
+    code = (
+        "import sys, gymnasium as gym, minigrid; "
+        "gym.make('MiniGrid-Empty-5x5-v0'); "
+        "print(sorted(m for m in sys.modules if m.startswith(('minigrid.envs', 'matplotlib'))))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+
+    # Only the module of the environment which was made is imported
+    assert output.strip() == "['minigrid.envs', 'minigrid.envs.empty']"
+
+
+def test_lazy_submodules():
+    import minigrid
+    from minigrid import wrappers
+    from minigrid.core import roomgrid
+
+    # Submodules are still available as attributes of the package
+    assert minigrid.roomgrid is roomgrid
+    assert minigrid.wrappers is wrappers
+    with pytest.raises(AttributeError):
+        minigrid.not_a_submodule
+
+
+def _rollout(env, actions):
+    transitions = []
+    for action in actions:
+        obs, reward, terminated, truncated, _ = env.step(action)
+        direction = int(obs["direction"])
+        transitions.append((obs["image"], direction, reward, terminated, truncated))
+        if terminated or truncated:
+            break
+    return tuple(transitions)
+
+
+@pytest.mark.parametrize(
+    "env_id",
+    [
+        "MiniGrid-DoorKey-8x8-v0",
+        "MiniGrid-KeyCorridorS3R3-v0",
+        "MiniGrid-Dynamic-Obstacles-8x8-v0",
+        "MiniGrid-Fetch-8x8-N3-v0",
+        "BabyAI-PutNextLocal-v0",
+        "BabyAI-SynthSeq-v0",
+    ],
+)
+def test_get_set_state(env_id):
+    env = gym.make(env_id, disable_env_checker=True).unwrapped
+    env.reset(seed=SEED)
+
+    rng = np.random.default_rng(SEED)
+    for _ in range(10):
+        for action in rng.integers(0, env.action_space.n, 20):
+            _, _, terminated, truncated, _ = env.step(action)
+            if terminated or truncated:
+                env.reset()
+
+        state = env.get_state()
+        assert state.dtype == env.state_dtype
+
+        actions = rng.integers(0, env.action_space.n, 20)
+        expected = _rollout(env, actions)
+
+        env.set_state(state.tobytes())
+        assert env.get_state().tobytes() == state.tobytes()
+        transitions = _rollout(env, actions)
+        assert len(transitions) == len(expected)
+        assert_equals(transitions, expected)
+
+        env.set_state(state)
+
+
+@pytest.mark.parametrize(
+    "env_id",
+    [
+        "MiniGrid-DoorKey-16x16-v0",
+        "MiniGrid-Lava-Maze-neg05-v8",
+        "MiniGrid-FakeLava-5x5-3x4-v0",
+        "BabyAI-PutNextLocal-v0",
+    ],
+)
+def test_free_cell_placement(env_id):
+    env = gym.make(env_id, disable_env_checker=True, free_cell_placement=True).unwrapped
+    other_env = gym.make(env_id, disable_env_checker=True, free_cell_placement=True)
+    for seed in range(10):
+        assert_equals(env.reset(seed=seed), other_env.reset(seed=seed))
+
+    # Fill the grid, avoiding the cells on the left
+    env.reset(seed=SEED)
+    num_free = int(env.grid.free_mask().sum()) - 1
+    reject_fn = lambda env, pos: pos[0] == 1  # noqa: E731
+    num_rejected = sum(
+        env.grid.get(1, j) is None and (1, j) != tuple(env.agent_pos)
+        for j in range(env.height)
+    )
+    for _ in range(num_free - num_rejected):
+        pos = env.place_obj(Ball(), reject_fn=reject_fn)
+        assert pos[0] != 1 and pos != tuple(env.agent_pos)
+
+    with pytest.raises(RecursionError):
+        env.place_obj(Ball(), reject_fn=reject_fn)
+
+
+@pytest.mark.parametrize(
+    "env_id",
+    [
+        "MiniGrid-FakeLava-Target-5x5-4x4-v0",
+        "MiniGrid-FakeLava-5x5-3x4-v0",
+        "MiniGrid-DonutLava-Long-v1",
+        "BabyAI-GoToLocal-v0",
+    ],
+)
+def test_vectorized_reject_fn(env_id):
+    env = gym.make(env_id, disable_env_checker=True, free_cell_placement=True).unwrapped
+    env.reset(seed=SEED)
+
+    filters = [roomgrid.reject_next_to, fakelava.reject_nontarget_rooms]
+    filters += [fakelava.reject_nonmarked_rooms, donutLavaLong.reject_lava_rooms]
+    if not hasattr(env, "goalpos"):
+        filters.remove(fakelava.reject_nontarget_rooms)
+    if not hasattr(env, "roomsize"):
+        filters.remove(fakelava.reject_nonmarked_rooms)
+
+    for reject_fn in filters:
+        assert reject_fn.vectorized
+
+        # The mask matches the scalar calls
+        xs, ys = np.indices((env.width, env.height))
+        mask = reject_fn(env, (xs, ys))
+        for x in range(env.width):
+            for y in range(env.height):
+                assert mask[x, y] == reject_fn(env, (x, y))
+
+        for _ in range(20):
+            if not (env.grid.free_mask() & ~mask).any():
+                break
+            pos = env.place_obj(Ball(), reject_fn=reject_fn)
+            assert not mask[pos]
+
+
+class StaticDoorKeyEnv(MiniGridEnv):
+    """Room with a static door and key, and a randomly placed agent"""
+
+    def __init__(self, **kwargs):
+        mission_space = MissionSpace(mission_func=lambda: "open the door")
+        super().__init__(
+            mission_space=mission_space, grid_size=6, max_steps=50, **kwargs
+        )
+
+    def _gen_static_grid(self, width, height):
+        self.grid = Grid(width, height)
+        self.grid.wall_rect(0, 0, width, height)
+        self.grid.set(3, 1, Key("yellow"))
+        self.grid.set(4, 2, Door("yellow"))
+
+    def _gen_grid(self, width, height):
+        self.place_agent()
+        self.mission = "open the door"
+
+
+@pytest.mark.parametrize("array_grid", [False, True])
+def test_static_grid(array_grid):
+    env = StaticDoorKeyEnv(array_grid=array_grid)
+    env.reset(seed=SEED)
+    encoding = env.grid.encode()
+
+    # Objects changed during an episode are restored on reset
+    env.grid.get(4, 2).is_open = True
+    env.carrying = env.grid.get(3, 1)
+    env.grid.set(3, 1, None)
+    env.reset()
+    assert np.array_equal(env.grid.encode(), encoding)
+    assert env.grid.get(3, 1) is not env.carrying
+    assert not env.grid.get(4, 2).is_open
+
+
+@pytest.mark.parametrize(
+    "env_id",
+    [
+        "MiniGrid-Lava-Maze-neg05-v8",
+        "MiniGrid-FakeLava-5x5-3x4-v0",
+        "MiniGrid-DonutLava-Long-v1",
+        "MiniGrid-DonutRoom-16x16-v0",
+        "MiniGrid-LRoom-16x16-v0",
+    ],
+)
+def test_static_grid_envs(env_id):
+    env = gym.make(env_id, disable_env_checker=True).unwrapped
+    for seed in range(5):
+        obs, _ = env.reset(seed=seed)
+        other_env = gym.make(env_id, disable_env_checker=True).unwrapped
+        assert_equals(obs, other_env.reset(seed=seed)[0])
+        assert env.grid is not env._static_grid
+
+
+@pytest.mark.parametrize(
+    "env_id",
+    ["BabyAI-BossLevel-v0", "BabyAI-PutNextS5N2Carrying-v0", "BabyAI-SynthLoc-v0"],
+)
+@pytest.mark.parametrize("array_grid", [False, True])
+def test_level_bank(env_id, array_grid, tmp_path):
+    path = str(tmp_path / "levels.npy")
+    bank = LevelBank.generate(env_id, range(8), path, num_workers=2, chunk_size=3)
+    assert len(bank) == 8 and 3 in bank and 8 not in bank
+
+    env = gym.make(env_id, disable_env_checker=True, array_grid=array_grid).unwrapped
+    bank_env = gym.make(
+        env_id, disable_env_checker=True, array_grid=array_grid, level_bank=path
+    ).unwrapped
+
+    rng = np.random.default_rng(SEED)
+    for seed in [5, 0, 8, 3, None]:
+        obs, _ = env.reset(seed=seed)
+        bank_obs, _ = bank_env.reset(seed=seed)
+        np.testing.assert_array_equal(obs["image"], bank_obs["image"])
+        assert obs["direction"] == bank_obs["direction"]
+        assert obs["mission"] == bank_obs["mission"]
+        assert env.max_steps == bank_env.max_steps
+
+        actions = rng.integers(0, env.action_space.n, 50)
+        assert_equals(_rollout(env, actions), _rollout(bank_env, actions))
+
+    with pytest.raises(ValueError):
+        gym.make("BabyAI-GoToLocal-v0", disable_env_checker=True, level_bank=path)
+
+
+@pytest.mark.parametrize(
+    "env_id",
+    ["BabyAI-BossLevel-v0", "BabyAI-PutNextLocal-v0", "BabyAI-SynthSeq-v0"],
+)
+def test_verifier_updates(env_id):
+    env = gym.make(env_id, disable_env_checker=True).unwrapped
+    env.reset(seed=SEED)
+
+    rng = np.random.default_rng(SEED)
+    for action in rng.integers(0, env.action_space.n, 1000):
+        _, _, terminated, truncated, _ = env.step(action)
+
+        # Positions updated incrementally are those of a full update
+        if action == env.actions.drop:
+            _, action_instrs = instr_nodes(env.instrs)
+            poss = [desc.obj_poss for desc in _obj_descs(action_instrs)]
+            for instr in action_instrs:
+                instr.update_objs_poss()
+            assert poss == [desc.obj_poss for desc in _obj_descs(action_instrs)]
+
+        if terminated or truncated:
+            env.reset()
@@ -0,0 +1,446 @@
+from __future__ import annotations
+
+import gymnasium as gym
+import numpy as np
+import pytest
+
+from minigrid.core.grid import (
+    ArrayGrid,
+    Grid,
+    TileCache,
+    compute_vis_mask,
+    compute_vis_masks,
+    flood_fill,
+    zobrist_hash,
+    zobrist_key,
+)
+from minigrid.core.world_object import (
+    Ball,
+    Box,
+    Door,
+    FloorCustom,
+    Gates,
+    Goal,
+    Goal_invisible,
+    Key,
+    Lava,
+    Wall,
+    WallCustom,
+)
+from tests.utils import assert_equals
+
+ARRAY_GRID_ENV_IDS = [
+    "MiniGrid-DoorKey-8x8-v0",
+    "MiniGrid-FourRooms-v0",
+    "MiniGrid-KeyCorridorS3R3-v0",
+    "MiniGrid-LavaCrossingS9N2-v0",
+    "MiniGrid-Dynamic-Obstacles-8x8-v0",
+    "BabyAI-GoToDoor-v0",
+]
+
+
+def _random_grid(seed, width=9, height=7):
+    rng = np.random.default_rng(seed)
+    grid = Grid(width, height)
+    grid.wall_rect(0, 0, width, height)
+    for _ in range(12):
+        i, j = rng.integers(1, width - 1), rng.integers(1, height - 1)
+        kind = rng.integers(4)
+        if kind == 0:
+            grid.set(i, j, Wall())
+        elif kind == 1:
+            grid.set(i, j, Ball("red"))
+        elif kind == 2:
+            grid.set(i, j, Key("yellow"))
+        else:
+            grid.set(i, j, Door("blue", is_open=bool(rng.integers(2))))
+    return grid
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_array_grid_matches_grid(seed):
+    grid = _random_grid(seed)
+    array_grid = ArrayGrid.from_grid(grid)
+
+    assert np.array_equal(grid.encode(), array_grid.encode())
+    for args in [(-2, -3, 7, 7), (3, 1, 7, 7), (5, 4, 5, 5)]:
+        assert np.array_equal(
+            grid.slice(*args).encode(), array_grid.slice(*args).encode()
+        )
+
+    rotated, array_rotated = grid, array_grid
+    for _ in range(4):
+        rotated, array_rotated = rotated.rotate_left(), array_rotated.rotate_left()
+        assert np.array_equal(rotated.encode(), array_rotated.encode())
+
+    view, array_view = grid.slice(1, 0, 7, 7), array_grid.slice(1, 0, 7, 7)
+    assert np.array_equal(view.process_vis((3, 6)), array_view.process_vis((3, 6)))
+    assert np.array_equal(view.encode(), array_view.encode())
+
+
+def test_array_grid_lazy_objects():
+    grid = ArrayGrid(5, 5)
+    grid.wall_rect(0, 0, 5, 5)
+    assert not grid.objs
+
+    wall = grid.get(0, 0)
+    assert isinstance(wall, Wall)
+    assert grid.get(0, 0) is wall
+
+    door = Door("red")
+    grid.set(2, 2, door)
+    assert grid.get(2, 2) is door
+    door.is_open = True
+    assert grid.encode()[2, 2, 2] == 0
+    assert ("red", "door") in grid
+    assert ("blue", "door") not in grid
+
+
+@pytest.mark.parametrize("env_id", ARRAY_GRID_ENV_IDS)
+def test_array_grid_env_rollout(env_id):
+    env = gym.make(env_id, disable_env_checker=True)
+    array_env = gym.make(env_id, disable_env_checker=True, array_grid=True)
+
+    assert_equals(env.reset(seed=0), array_env.reset(seed=0))
+    assert isinstance(array_env.grid, ArrayGrid)
+
+    env.action_space.seed(0)
+    for _ in range(100):
+        action = env.action_space.sample()
+        obs, *rest = env.step(action)
+        array_obs, *array_rest = array_env.step(action)
+        assert_equals(obs, array_obs)
+        assert rest[:3] == array_rest[:3]
+        if rest[1] or rest[2]:
+            assert_equals(env.reset(), array_env.reset())
+
+    assert np.array_equal(env.get_frame(), array_env.get_frame())
+
+
+def test_grid_encoding_cache():
+    grid = _random_grid(0)
+    first = grid.encode()
+
+    door = Door("green")
+    grid.set(4, 3, door)
+    grid.set(1, 1, None)
+    grid.set(2, 1, Ball("purple"))
+    door.is_open = True
+
+    fresh = Grid(grid.width, grid.height)
+    for i in range(grid.width):
+        for j in range(grid.height):
+            fresh.set(i, j, grid.get(i, j))
+
+    assert not np.array_equal(first, grid.encode())
+    assert np.array_equal(fresh.encode(), grid.encode())
+
+    vis_mask = np.random.default_rng(0).random((grid.width, grid.height)) < 0.5
+    expected = fresh.encode()
+    expected[~vis_mask] = 0
+    assert np.array_equal(grid.encode(vis_mask), expected)
+
+
+def _reference_vis_mask(see_behind, agent_pos):
+    """Cell by cell propagation, as originally done by Grid.process_vis"""
+    width, height = see_behind.shape
+    mask = np.zeros(shape=(width, height), dtype=bool)
+    mask[agent_pos] = True
+
+    for j in reversed(range(0, height)):
+        for i in range(0, width - 1):
+            if not mask[i, j]:
+                continue
+            if not see_behind[i, j] and not (i, j) == agent_pos:
+                continue
+            mask[i + 1, j] = True
+            if j > 0:
+                mask[i + 1, j - 1] = True
+                mask[i, j - 1] = True
+
+        for i in reversed(range(1, width)):
+            if not mask[i, j]:
+                continue
+            if not see_behind[i, j] and not (i, j) == agent_pos:
+                continue
+            mask[i - 1, j] = True
+            if j > 0:
+                mask[i - 1, j - 1] = True
+                mask[i, j - 1] = True
+
+    return mask
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_compute_vis_mask(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(200):
+        width, height = rng.integers(3, 70), rng.integers(3, 12)
+        see_behind = rng.random((width, height)) < rng.random()
+        agent_pos = (int(rng.integers(width)), int(rng.integers(height)))
+
+        expected = _reference_vis_mask(see_behind, agent_pos)
+        np.testing.assert_array_equal(compute_vis_mask(see_behind, agent_pos), expected)
+
+    see_behind = rng.random((32, 7, 7)) < 0.7
+    masks = compute_vis_masks(see_behind, (3, 6))
+    for view, mask in zip(see_behind, masks):
+        np.testing.assert_array_equal(mask, _reference_vis_mask(view, (3, 6)))
+
+
+def _reference_render(grid, tile_size, agent_pos, agent_dir, highlight_mask):
+    """Tile by tile rendering, as originally done by Grid.render"""
+    img = np.zeros((grid.height * tile_size, grid.width * tile_size, 3), dtype=np.uint8)
+    for j in range(grid.height):
+        for i in range(grid.width):
+            agent_here = np.array_equal(agent_pos, (i, j))
+            tile_img = Grid.draw_tile(
+                grid.get(i, j),
+                agent_dir=agent_dir if agent_here else None,
+                highlight=highlight_mask[i, j],
+                tile_size=tile_size,
+            )
+            rows = slice(j * tile_size, (j + 1) * tile_size)
+            cols = slice(i * tile_size, (i + 1) * tile_size)
+            img[rows, cols] = tile_img
+    return img
+
+
+@pytest.mark.parametrize("grid_cls", [Grid, ArrayGrid])
+def test_render_tile_atlas(grid_cls):
+    grid = _random_grid(0)
+    if grid_cls is ArrayGrid:
+        grid = ArrayGrid.from_grid(grid)
+    grid.set(1, 1, Box("grey"))
+    grid.set(2, 1, Door("red", is_locked=True))
+    grid.set(3, 1, Lava())
+    grid.set(4, 1, Goal())
+    grid.set(1, 5, WallCustom("grey", np.array([20, 0, 0])))
+    grid.set(2, 5, FloorCustom(np.array([40, 60, 80])))
+    grid.set(3, 5, Gates("purple"))
+    grid.set(4, 5, Goal_invisible())
+    grid.set(5, 5, None)
+
+    highlight_mask = np.random.default_rng(0).random((grid.width, grid.height)) < 0.5
+    for agent_dir in range(4):
+        # Custom objects are drawn through the tile cache
+        Grid.tile_cache.clear()
+        img = grid.render(8, (5, 5), agent_dir, highlight_mask)
+        expected = _reference_render(grid, 8, (5, 5), agent_dir, highlight_mask)
+        np.testing.assert_array_equal(img, expected)
+
+
+def test_tile_cache(monkeypatch):
+    monkeypatch.setattr(Grid, "tile_cache", TileCache(max_size=4))
+
+    walls = [WallCustom("grey", np.array([10 * i, 0, 0])) for i in range(6)]
+    tiles = [Grid.render_tile(wall, tile_size=8) for wall in walls]
+
+    # Walls with different colors don't share their tiles
+    assert not np.array_equal(tiles[0], tiles[1])
+    assert Grid.tile_cache.stats() == {
+        "size": 4,
+        "hits": 0,
+        "misses": 6,
+        "evictions": 2,
+    }
+
+    # The least recently used tiles were evicted
+    assert Grid.render_tile(walls[5], tile_size=8) is tiles[5]
+    assert Grid.render_tile(walls[0], tile_size=8) is not tiles[0]
+    assert Grid.tile_cache.stats() == {
+        "size": 4,
+        "hits": 1,
+        "misses": 7,
+        "evictions": 3,
+    }
+
+    # Gates are encoded as open doors, but drawn differently
+    gates = Grid.render_tile(Gates("blue"), tile_size=8)
+    door = Grid.render_tile(Door("blue", is_open=True), tile_size=8)
+    assert not np.array_equal(gates, door)
+
+    floors = [FloorCustom(np.array([40, 50, 60])), FloorCustom(np.array([60, 50, 40]))]
+    assert floors[0].encode() == floors[1].encode()
+    assert not np.array_equal(
+        Grid.render_tile(floors[0], tile_size=8),
+        Grid.render_tile(floors[1], tile_size=8),
+    )
+
+
+def test_prewarm_tiles(monkeypatch):
+    monkeypatch.setattr(Grid, "tile_cache", TileCache())
+    monkeypatch.setattr(Grid, "tile_atlases", {})
+
+    grid = _random_grid(0)
+    grid.set(1, 1, WallCustom("grey", np.array([0, 20, 0])))
+    Grid.prewarm_tiles(grid.grid, tile_size=8)
+
+    misses = Grid.tile_cache.misses
+    num_rendered = Grid.tile_atlas(8).rendered.sum()
+    highlight_mask = np.random.default_rng(0).random((grid.width, grid.height)) < 0.5
+    grid.render(8, (-1, -1), highlight_mask=highlight_mask)
+
+    assert Grid.tile_cache.misses == misses
+    assert Grid.tile_atlas(8).rendered.sum() == num_rendered
+
+
+@pytest.mark.parametrize("env_id", ARRAY_GRID_ENV_IDS)
+@pytest.mark.parametrize("array_grid", [False, True])
+def test_zobrist_hash(env_id, array_grid):
+    env = gym.make(env_id, disable_env_checker=True, array_grid=array_grid).unwrapped
+    env.reset(seed=0)
+    hashes = {}
+
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        _, _, terminated, truncated, _ = env.step(rng.integers(0, 6))
+        if terminated or truncated:
+            env.reset()
+
+        # The incrementally updated hash matches the one of the encoding
+        encoding = env.grid.encode()
+        assert env.grid.zobrist_hash() == zobrist_hash(encoding)
+
+        key = (encoding.tobytes(), tuple(env.agent_pos), int(env.agent_dir))
+        if env.carrying is None:
+            assert hashes.setdefault(key, env.hash()) == env.hash()
+
+    assert env.hash(8) == env.hash()[:8]
+    with pytest.raises(ValueError):
+        env.hash(32)
+
+
+def test_zobrist_keys():
+    grid = _random_grid(0)
+    encoding = grid.encode()
+
+    expected = 0
+    for i in range(grid.width):
+        for j in range(grid.height):
+            if tuple(encoding[i, j]) != (1, 0, 0):
+                expected ^= zobrist_key(i, j, encoding[i, j])
+    assert grid.zobrist_hash() == zobrist_hash(encoding) == expected
+
+    # Moving an object back and forth restores the hash
+    ball = grid.get(1, 1) or Ball("red")
+    grid.set(1, 1, None)
+    empty_hash = grid.zobrist_hash()
+    grid.set(1, 1, ball)
+    assert grid.zobrist_hash() != empty_hash
+    grid.set(1, 1, None)
+    assert grid.zobrist_hash() == empty_hash
+
+
+def _scan_objs(grid, type=None, color=None):
+    return [
+        ((i, j), grid.get(i, j))
+        for i in range(grid.width)
+        for j in range(grid.height)
+        if grid.get(i, j) is not None
+        and type in (None, grid.get(i, j).type)
+        and color in (None, grid.get(i, j).color)
+    ]
+
+
+@pytest.mark.parametrize("grid_cls", [Grid, ArrayGrid])
+def test_find_objs(grid_cls):
+    grid = _random_grid(0)
+    if grid_cls is ArrayGrid:
+        grid = ArrayGrid.from_grid(grid)
+    queries = [(None, None), ("ball", None), (None, "blue"), ("door", "blue")]
+
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        for type, color in queries:
+            assert grid.find_objs(type, color) == _scan_objs(grid, type, color)
+
+        # Objects being moved around, picked up and dropped
+        i, j = rng.integers(1, grid.width - 1), rng.integers(1, grid.height - 1)
+        obj = [None, Ball("blue"), Key("yellow"), Box("red")][rng.integers(4)]
+        grid.set(i, j, obj)
+
+    found = grid.find_objs(None, None, top=(2, 1), size=(3, 4))
+    expected = [
+        (pos, v) for pos, v in _scan_objs(grid) if 2 <= pos[0] < 5 and 1 <= pos[1] < 5
+    ]
+    assert found == expected
+
+
+def test_find_objs_recolored():
+    grid = Grid(5, 5)
+    ball = Ball("red")
+    grid.set(1, 1, ball)
+    assert grid.find_objs("ball") == [((1, 1), ball)]
+
+    # Objects changing color in place after being indexed
+    ball.color = "blue"
+    assert grid.find_objs("ball", "blue") == [((1, 1), ball)]
+    assert grid.find_objs("ball", "red") == []
+
+    ball.color = "green"
+    grid.set(1, 1, None)
+    assert grid.find_objs() == []
+
+    grid.set(2, 3, ball)
+    ball.color = "yellow"
+    grid.set(2, 3, Key("yellow"))
+    assert grid.find_objs("ball") == []
+    assert [pos for pos, _ in grid.find_objs(color="yellow")] == [(2, 3)]
+
+
+def test_find_objs_custom_floor():
+    grid = Grid(5, 5)
+    floor = FloorCustom(np.array([40, 50, 60]))
+    grid.set(1, 2, floor)
+    grid.set(3, 3, Ball("red"))
+
+    # Floors with RGB colors are found by type, but not by color name
+    assert grid.find_objs("floor") == [((1, 2), floor)]
+    assert grid.find_objs(color="red") == [((3, 3), grid.get(3, 3))]
+    floor.color = np.array([60, 50, 40])
+    assert grid.find_objs("floor") == [((1, 2), floor)]
+    grid.set(1, 2, None)
+    assert grid.find_objs("floor") == []
+
+
+def _search_reachable(crossable, start):
+    reached = np.zeros_like(crossable)
+    stack = [start]
+    while stack:
+        i, j = stack.pop()
+        if not (0 <= i < crossable.shape[0] and 0 <= j < crossable.shape[1]):
+            continue
+        if reached[i, j]:
+            continue
+        reached[i, j] = True
+        if crossable[i, j]:
+            stack.extend([(i + 1, j), (i - 1, j), (i, j + 1), (i, j - 1)])
+    return reached
+
+
+@pytest.mark.parametrize("shape", [(1, 1), (5, 9), (22, 22), (40, 3)])
+def test_flood_fill(shape):
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        crossable = rng.random(shape) < 0.7
+        start = tuple(rng.integers(0, shape))
+        np.testing.assert_array_equal(
+            flood_fill(crossable, start), _search_reachable(crossable, start)
+        )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_reachable_mask(seed):
+    grid = _random_grid(seed)
+    crossable = [
+        [grid.get(i, j) is None or grid.get(i, j).type == "door" for j in range(7)]
+        for i in range(9)
+    ]
+    reached = grid.reachable_mask((4, 3))
+    np.testing.assert_array_equal(
+        reached, _search_reachable(np.array(crossable), (4, 3))
+    )
+    np.testing.assert_array_equal(
+        ArrayGrid.from_grid(grid).reachable_mask((4, 3)), reached
+    )
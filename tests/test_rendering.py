@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import pytest
+
+from minigrid.utils.rendering import (
+    fill_coords,
+    point_in_circle,
+    point_in_line,
+    point_in_rect,
+    point_in_triangle,
+    rotate_fn,
+)
+
+SHAPES = {
+    "rect": point_in_rect(0.12, 0.88, 0.2, 0.56),
+    "circle": point_in_circle(0.56, 0.28, 0.19),
+    "line": point_in_line(0.1, 0.3, 0.3, 0.4, r=0.03),
+    "triangle": point_in_triangle((0.12, 0.19), (0.87, 0.50), (0.12, 0.81)),
+    "rotated": rotate_fn(
+        point_in_triangle((0.12, 0.19), (0.87, 0.50), (0.12, 0.81)),
+        cx=0.5,
+        cy=0.5,
+        theta=0.5 * math.pi * 3,
+    ),
+}
+
+
+def _fill_pixel_by_pixel(img, fn, color):
+    for y in range(img.shape[0]):
+        for x in range(img.shape[1]):
+            if fn((x + 0.5) / img.shape[1], (y + 0.5) / img.shape[0]):
+                img[y, x] = color
+    return img
+
+
+@pytest.mark.parametrize("shape", SHAPES)
+@pytest.mark.parametrize("size", [(24, 24), (96, 96), (33, 17)])
+def test_fill_coords(shape, size):
+    fn = SHAPES[shape]
+    img = fill_coords(np.zeros(size + (3,), dtype=np.uint8), fn, (255, 0, 0))
+    expected = _fill_pixel_by_pixel(
+        np.zeros(size + (3,), dtype=np.uint8), fn, (255, 0, 0)
+    )
+
+    np.testing.assert_array_equal(img, expected)
+    assert img.any()
+
+
+def test_fill_coords_scalar_fn():
+    # Filter functions written for scalar coordinates are still supported
+    def fn(x, y):
+        return x < 0.5 and y < 0.25
+
+    img = fill_coords(np.zeros((32, 32, 3), dtype=np.uint8), fn, (0, 255, 0))
+    expected = _fill_pixel_by_pixel(
+        np.zeros((32, 32, 3), dtype=np.uint8), fn, (0, 255, 0)
+    )
+    np.testing.assert_array_equal(img, expected)
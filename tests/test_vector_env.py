@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import gymnasium as gym
+import numpy as np
+import pytest
+
+from minigrid.core.grid import Grid
+from minigrid.core.mission import MissionSpace
+from minigrid.core.world_object import Ball, Box, Door, Key
+from minigrid.minigrid_env import MiniGridEnv
+from minigrid.vector_env import MiniGridVecEnv, SharedMemoryVecEnv
+from tests.utils import assert_equals
+
+VEC_ENV_IDS = [
+    "MiniGrid-DoorKey-8x8-v0",
+    "MiniGrid-LavaCrossingS9N2-v0",
+    "MiniGrid-LockedRoom-v0",
+    "MiniGrid-MultiRoom-N4-S5-v0",
+    "MiniGrid-Playground-v0",
+    "MiniGrid-Empty-Random-5x5-v0",
+]
+
+
+class BoxEnv(MiniGridEnv):
+    """Small room with boxes holding a key and a ball, and a locked door"""
+
+    def __init__(self, **kwargs):
+        mission_space = MissionSpace(mission_func=lambda: "open the boxes")
+        super().__init__(
+            mission_space=mission_space, grid_size=5, max_steps=50, **kwargs
+        )
+
+    def _gen_grid(self, width, height):
+        self.grid = Grid(width, height)
+        self.grid.wall_rect(0, 0, width, height)
+        self.grid.set(1, 1, Box("green", Key("red")))
+        self.grid.set(3, 1, Box("purple", Ball("blue")))
+        self.grid.set(3, 3, Door("red", is_locked=True))
+        self.grid.set(1, 3, Box("yellow"))
+        self.agent_pos = (2, 1 + self._rand_int(0, 3))
+        self.agent_dir = self._rand_int(0, 4)
+        self.mission = "open the boxes"
+
+
+def _check_rollout(env_fn, num_envs=4, num_steps=300):
+    vec_env = MiniGridVecEnv([env_fn] * num_envs)
+    envs = [env_fn().unwrapped for _ in range(num_envs)]
+
+    vec_obs, _ = vec_env.reset(seed=0)
+    obs = [env.reset(seed=i)[0] for i, env in enumerate(envs)]
+
+    rng = np.random.default_rng(0)
+    for _ in range(num_steps):
+        for i in range(num_envs):
+            np.testing.assert_array_equal(vec_obs["image"][i], obs[i]["image"])
+            assert vec_obs["direction"][i] == obs[i]["direction"]
+            assert vec_obs["mission"][i] == obs[i]["mission"]
+
+        actions = rng.integers(0, len(MiniGridEnv.Actions), num_envs)
+        vec_obs, rewards, terminated, truncated, infos = vec_env.step(actions)
+        for i, env in enumerate(envs):
+            obs[i], reward, term, trunc, _ = env.step(actions[i])
+            assert (reward, term, trunc) == (rewards[i], terminated[i], truncated[i])
+            if term or trunc:
+                final_obs = infos["final_observation"][i]
+                np.testing.assert_array_equal(final_obs["image"], obs[i]["image"])
+                obs[i], _ = env.reset()
+
+    vec_env.close()
+
+
+@pytest.mark.parametrize("env_id", VEC_ENV_IDS)
+def test_vec_env_matches_env(env_id):
+    _check_rollout(lambda: gym.make(env_id, disable_env_checker=True))
+
+
+@pytest.mark.parametrize("see_through_walls", [False, True])
+def test_vec_env_boxes(see_through_walls):
+    _check_rollout(lambda: BoxEnv(see_through_walls=see_through_walls), num_steps=500)
+
+
+def test_vec_env_spaces():
+    vec_env = MiniGridVecEnv(
+        [lambda: gym.make("MiniGrid-Empty-5x5-v0", disable_env_checker=True)] * 3
+    )
+    obs, _ = vec_env.reset(seed=0)
+    assert obs["image"].shape == (3, 7, 7, 3)
+    assert obs["image"] in vec_env.observation_space["image"]
+    assert vec_env.action_space.shape == (3,)
+
+
+def test_vec_env_unsupported():
+    with pytest.raises(ValueError):
+        MiniGridVecEnv(
+            [
+                lambda: gym.make(
+                    "MiniGrid-Dynamic-Obstacles-8x8-v0", disable_env_checker=True
+                )
+            ]
+        )
+
+
+@pytest.mark.parametrize(
+    "env_id", ["MiniGrid-DoorKey-5x5-v0", "MiniGrid-Dynamic-Obstacles-5x5-v0"]
+)
+def test_shared_memory_vec_env(env_id):
+    env_fns = [lambda: gym.make(env_id, disable_env_checker=True)] * 4
+    vec_env = SharedMemoryVecEnv(env_fns, num_workers=2)
+    sync_env = gym.vector.SyncVectorEnv(env_fns)
+
+    obs, _ = vec_env.reset(seed=0)
+    sync_obs, _ = sync_env.reset(seed=0)
+    assert_equals({k: obs[k] for k in sync_obs}, dict(sync_obs))
+
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        actions = rng.integers(0, len(MiniGridEnv.Actions), 4)
+        obs, *rest, infos = vec_env.step(actions)
+        sync_obs, *sync_rest, sync_infos = sync_env.step(actions)
+        assert_equals({k: obs[k] for k in sync_obs}, dict(sync_obs))
+        assert_equals(tuple(rest), tuple(sync_rest))
+
+        assert ("final_observation" in infos) == ("final_observation" in sync_infos)
+        if "final_observation" in infos:
+            done = sync_infos["_final_observation"]
+            np.testing.assert_array_equal(infos["_final_observation"], done)
+            for final_obs, sync_final_obs in zip(
+                infos["final_observation"][done], sync_infos["final_observation"][done]
+            ):
+                assert_equals(final_obs, sync_final_obs)
+
+    vec_env.close()
+    sync_env.close()
+
+
+def test_shared_memory_vec_env_ring():
+    env_fns = [lambda: gym.make("MiniGrid-Empty-5x5-v0", disable_env_checker=True)] * 2
+    vec_env = SharedMemoryVecEnv(env_fns, num_workers=1, ring_size=2, copy=False)
+
+    obs, _ = vec_env.reset(seed=0)
+    image = obs["image"].copy()
+    next_obs, *_ = vec_env.step(np.array([1, 1]))
+
+    # The previous observation is still valid after one step
+    np.testing.assert_array_equal(obs["image"], image)
+    assert not np.shares_memory(obs["image"], next_obs["image"])
+
+    vec_env.close()
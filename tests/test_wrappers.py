@@ -7,8 +7,10 @@ import numpy as np
 import pytest
 
 from minigrid.core.actions import Actions
+from minigrid.core.constants import COLOR_TO_IDX, OBJECT_TO_IDX
 from minigrid.envs import EmptyEnv
 from minigrid.wrappers import (
+    MISSION_CHARS,
     ActionBonus,
     DictObservationSpaceWrapper,
     FlatObsWrapper,
@@ -19,7 +21,9 @@ from minigrid.wrappers import (
     RGBImgObsWrapper,
     RGBImgPartialObsWrapper,
     StateBonus,
+    SymbolicObsWrapper,
     ViewSizeWrapper,
+    observation_batch,
 )
 from tests.utils import all_testing_env_specs, assert_equals, minigrid_testing_env_specs
 
@@ -127,6 +131,73 @@ def test_action_bonus_wrapper(env_id):
     assert expected_bonus_reward == wrapped_rew
 
 
+@pytest.mark.parametrize("wrapper", [ActionBonus, StateBonus])
+def test_bonus_array_counts(wrapper):
+    env = wrapper(gym.make("MiniGrid-Empty-8x8-v0"))
+    array_env = wrapper(gym.make("MiniGrid-Empty-8x8-v0"), array_counts=True)
+    assert array_env.counts.dtype == np.int32
+    assert array_env.counts.shape[:2] == (8, 8)
+
+    rng = np.random.default_rng(0)
+    for seed in range(3):
+        env.reset(seed=seed)
+        array_env.reset(seed=seed)
+        for action in rng.integers(0, 3, 50):
+            _, reward, *_ = env.step(action)
+            _, array_reward, *_ = array_env.step(action)
+            assert reward == array_reward
+    assert sum(env.counts.values()) == array_env.counts.sum() == 150
+
+    # Snapshots are merged by adding the counts
+    snapshot = array_env.snapshot()
+    array_env.merge(snapshot, snapshot)
+    np.testing.assert_array_equal(array_env.counts, 3 * snapshot)
+
+    # Counts are halved at each reset, or forgotten
+    array_env.decay = 0.5
+    array_env.reset()
+    np.testing.assert_array_equal(array_env.counts, 3 * snapshot // 2)
+    array_env.decay = 0
+    array_env.reset()
+    assert not array_env.counts.any()
+
+    env.decay = 0.5
+    counts = dict(env.counts)
+    env.reset()
+    assert env.counts == {k: c // 2 for k, c in counts.items() if c > 1}
+
+    with pytest.raises(ValueError):
+        env.snapshot()
+
+
+def test_bonus_update_batch():
+    env = ActionBonus(gym.make("MiniGrid-Empty-8x8-v0"), array_counts=True)
+    env.reset(seed=0)
+    rng = np.random.default_rng(0)
+    agent_pos = rng.integers(1, 4, (64, 2))
+    agent_dir = rng.integers(0, 4, 64)
+    actions = rng.integers(0, 3, 64)
+
+    # Repeated keys in a batch count as visits in order
+    counts = {}
+    expected = []
+    for pos, agent_dir_, action in zip(agent_pos, agent_dir, actions):
+        key = (*pos, agent_dir_, action)
+        counts[key] = counts.get(key, 0) + 1
+        expected.append(1 / math.sqrt(counts[key]))
+
+    np.testing.assert_array_equal(
+        env.update_batch(agent_pos, agent_dir, actions), expected
+    )
+    for key, count in counts.items():
+        assert env.counts[key] == count
+
+    env = StateBonus(gym.make("MiniGrid-Empty-8x8-v0"), array_counts=True)
+    env.reset(seed=0)
+    bonus = env.update_batch(np.array([[1, 1], [2, 1], [1, 1]]))
+    np.testing.assert_array_equal(bonus, [1, 1, 1 / math.sqrt(2)])
+
+
 @pytest.mark.parametrize(
     "env_spec",
     minigrid_testing_env_specs,
@@ -144,6 +215,33 @@ def test_dict_observation_space_wrapper(env_spec):
     env.close()
 
 
+@pytest.mark.parametrize("precompute_vocab", [False, True])
+def test_dict_observation_space_cache(monkeypatch, precompute_vocab):
+    monkeypatch.setattr(DictObservationSpaceWrapper, "mission_cache_size", 2)
+    env = DictObservationSpaceWrapper(
+        gym.make("MiniGrid-Fetch-8x8-N3-v0"), precompute_vocab=precompute_vocab
+    )
+    obs, _ = env.reset(seed=0)
+    mission = env.unwrapped.mission
+    indices = env.string_to_indices(mission)
+    assert obs["mission"].dtype == np.int64 and obs in env.observation_space
+    assert obs["mission"].tolist() == indices + [0] * (50 - len(indices))
+    assert env.string_to_indices("go to, the key", offset=0) == [
+        env.word_dict[word] for word in ["go", "to", ",", "the", "key"]
+    ]
+
+    # Missions are cached across steps and episodes
+    next_obs, *_ = env.step(0)
+    assert next_obs["mission"] is obs["mission"]
+    for seed in range(1, 10):
+        env.reset(seed=seed)
+        assert len(env._mission_cache) <= 2
+        assert env.unwrapped.mission in env._mission_cache
+
+    with pytest.raises(ValueError):
+        env.encode_mission("go to the dragon")
+
+
 @pytest.mark.parametrize(
     "wrapper",
     [
@@ -250,3 +348,130 @@ def test_agent_sees_method(wrapper):
     assert (obs1["size"] == [5, 5]).all()
     for key in obs2:
         assert np.array_equal(obs1[key], obs2[key])
+
+
+def _one_hot_cells(image):
+    # One-hot encoding of the cells, bit by bit
+    num_types, num_colors = len(OBJECT_TO_IDX), len(COLOR_TO_IDX)
+    out = np.zeros(image.shape[:2] + (num_types + num_colors + 3,), dtype=np.uint8)
+    for i in range(image.shape[0]):
+        for j in range(image.shape[1]):
+            type, color, state = image[i, j]
+            out[i, j, type] = 1
+            out[i, j, num_types + color] = 1
+            out[i, j, num_types + num_colors + state] = 1
+    return out
+
+
+@pytest.mark.parametrize(
+    "env_id", ["MiniGrid-KeyCorridorS3R3-v0", "MiniGrid-DoorKey-8x8-v0"]
+)
+def test_one_hot_partial_obs_wrapper(env_id):
+    env = OneHotPartialObsWrapper(gym.make(env_id))
+    obs, _ = env.reset(seed=0)
+    images = []
+    for action in np.random.default_rng(0).integers(0, 7, NUM_STEPS):
+        obs, *_ = env.step(action)
+        images.append(env.unwrapped.gen_obs()["image"])
+        np.testing.assert_array_equal(obs["image"], _one_hot_cells(images[-1]))
+        assert obs["image"] in env.observation_space["image"]
+
+    # Batched, into a given buffer
+    out = np.empty((len(images),) + env.observation_space["image"].shape, np.uint8)
+    batch_obs = env.observation_batch({"image": np.stack(images)}, out=out)
+    assert batch_obs["image"] is out
+    for image, one_hot in zip(images, out):
+        np.testing.assert_array_equal(one_hot, _one_hot_cells(image))
+
+
+def _observation(env, obs):
+    # Apply the observation wrappers one by one, innermost first
+    wrappers = []
+    while isinstance(env, gym.Wrapper):
+        wrappers.append(env)
+        env = env.env
+    for wrapper in reversed(wrappers):
+        if hasattr(wrapper, "observation_batch"):
+            obs = wrapper.observation(obs)
+    return obs
+
+
+@pytest.mark.parametrize(
+    "wrappers",
+    [
+        [ImgObsWrapper],
+        [OneHotPartialObsWrapper, ImgObsWrapper],
+        [FullyObsWrapper, ImgObsWrapper],
+        [FlatObsWrapper],
+        [SymbolicObsWrapper],
+        [ViewSizeWrapper, DictObservationSpaceWrapper],
+    ],
+    ids=lambda wrappers: "-".join(wrapper.__name__ for wrapper in wrappers),
+)
+def test_observation_batch(wrappers):
+    envs = []
+    for _ in range(3):
+        env = gym.make("MiniGrid-KeyCorridorS3R3-v0")
+        for wrapper in wrappers:
+            env = wrapper(env)
+        envs.append(env)
+
+    rng = np.random.default_rng(0)
+    for seed, env in enumerate(envs):
+        env.reset(seed=seed)
+    for _ in range(20):
+        for env in envs:
+            env.step(rng.integers(0, 7))
+
+        obs = [env.unwrapped.gen_obs() for env in envs]
+        expected = [_observation(env, dict(o)) for env, o in zip(envs, obs)]
+        batch_obs = {
+            "image": np.stack([o["image"] for o in obs]),
+            "direction": np.array([o["direction"] for o in obs]),
+            "mission": tuple(o["mission"] for o in obs),
+        }
+        wrapped_obs = observation_batch(envs[0], batch_obs, envs)
+
+        for i, single_obs in enumerate(expected):
+            if isinstance(single_obs, dict):
+                for key, value in single_obs.items():
+                    np.testing.assert_array_equal(wrapped_obs[key][i], value)
+            else:
+                np.testing.assert_array_equal(wrapped_obs[i], single_obs)
+
+    # The environments are needed to build observations from their state
+    if {FullyObsWrapper, SymbolicObsWrapper, ViewSizeWrapper} & set(wrappers):
+        with pytest.raises(ValueError):
+            observation_batch(envs[0], batch_obs)
+
+
+def test_flat_obs_wrapper(monkeypatch):
+    monkeypatch.setattr(FlatObsWrapper, "mission_cache_size", 2)
+    env = FlatObsWrapper(gym.make("MiniGrid-Fetch-8x8-N3-v0"))
+    obs, _ = env.reset(seed=0)
+    assert obs.dtype == np.uint8 and obs in env.observation_space
+
+    image = env.unwrapped.gen_obs()["image"]
+    mission = env.unwrapped.mission
+    image_size = image.size
+    np.testing.assert_array_equal(obs[:image_size], image.flatten())
+    chars = obs[image_size:].reshape(env.maxStrLen, env.numCharCodes)
+    for i, ch in enumerate(mission):
+        assert chars[i, MISSION_CHARS.index(ch)] == 1
+    assert chars.sum() == len(mission)
+
+    # Missions are cached across episodes
+    for seed in range(1, 10):
+        obs, _ = env.reset(seed=seed)
+        assert len(env._mission_cache) <= 2
+        assert env.unwrapped.mission in env._mission_cache
+        assert_equals(env.encode_mission(mission), chars)
+
+    with pytest.raises(ValueError):
+        env.encode_mission("go to the door!")
+
+    # Observations written into the buffer of the wrapper
+    env = FlatObsWrapper(gym.make("MiniGrid-Fetch-8x8-N3-v0"), copy=False)
+    obs, _ = env.reset(seed=0)
+    next_obs, *_ = env.step(0)
+    assert next_obs is obs